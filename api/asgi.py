@@ -2,6 +2,8 @@
 ASGI config for api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it (e.g. ``uvicorn api.asgi:application``) for the SSE change feed at
+/api/v1/changes/stream/; under WSGI that stream is buffered, not pushed.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
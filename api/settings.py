@@ -6,6 +6,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -37,9 +38,14 @@ INSTALLED_APPS = [
 
 # --- Middleware ---
 MIDDLEWARE = [
+    # First, so its total covers the rest; drops out unless REQUEST_TIMING is on.
+    "core.middleware.TimingMiddleware",
+    # Drops out unless DATABASE_REPLICA_URLS is set.
+    "core.middleware.ReplicaRoutingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # WhiteNoise, made async-capable so it does not force ASGI requests into threads.
+    "core.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -67,15 +73,56 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "api.wsgi.application"
+# Serve the read endpoints from core.async_views. Turn on only when running
+# under ASGI (uvicorn api.asgi:application); under WSGI every async view
+# would need its own event loop.
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "False") == "True"
 
 # --- Database (Neon/Render) ---
+# Without DATABASE_URL a SQLite file is used, but only with DEBUG on (local
+# runs, `manage.py test`): a deploy that lost the variable must not come up
+# on an empty local database. SSL is only required for real database servers.
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    if not DEBUG:
+        raise ImproperlyConfigured("DATABASE_URL must be set when DEBUG is off.")
+    DATABASE_URL = f"sqlite:///{BASE_DIR / 'db.sqlite3'}"
 DATABASES = {
-    "default": dj_database_url.config(
-        default=os.getenv("DATABASE_URL"),
+    "default": dj_database_url.parse(
+        DATABASE_URL,
         conn_max_age=600,
-        ssl_require=True,
+        ssl_require=not DATABASE_URL.startswith("sqlite"),
     )
 }
+# Read replicas, comma-separated; they become "replica_1", "replica_2", ...
+# GET/HEAD/OPTIONS requests read from one of them (core.db_router). Writes,
+# other requests, and a client's reads for REPLICA_STICKY_SECONDS after its
+# last write stay on "default". Locally, a second SQLite file works as a replica.
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+for _n, _url in enumerate(DATABASE_REPLICA_URLS, 1):
+    DATABASES[f"replica_{_n}"] = {
+        **dj_database_url.parse(_url, conn_max_age=600, ssl_require=not _url.startswith("sqlite")),
+        # Tests only create "default"; replicas point at it.
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+# --- Cache ---
+# Role and token-version caches expire after their TTLs; with REDIS_URL (needs
+# the `redis` package) invalidations reach every worker at once. Catalog table
+# stamps live in the database, so the per-process default is always coherent.
+REDIS_URL = os.getenv("REDIS_URL")
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}
+        if REDIS_URL else
+        {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+# Seconds a serialized hub/SKU list stays cached (entries are keyed by table
+# version, so writes never serve stale data).
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "3600"))
 
 # --- CORS ---
 BASE_FRONTENDS = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -112,13 +159,93 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # --- DRF + JWT ---
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.JWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # orjson-backed when the package is installed, stock JSON otherwise.
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     # Versioning
     "DEFAULT_VERSIONING_CLASS": "rest_framework.versioning.NamespaceVersioning",
     "DEFAULT_VERSION": "v1",
     "ALLOWED_VERSIONS": ["v1"],
 }
+
+SIMPLE_JWT = {
+    "TOKEN_OBTAIN_SERIALIZER": "core.serializers.ClaimsTokenObtainPairSerializer",
+}
+
+# --- Roles ---
+# Seconds a user's role set stays in the cache. Membership changes drop the
+# entry immediately in this process; other processes see them within the TTL.
+ROLE_CACHE_TTL = int(os.getenv("ROLE_CACHE_TTL", "300"))
+# Put a "roles" claim in issued tokens and trust it for authorization.
+# Role changes then only reach a user when they next log in.
+ROLES_IN_TOKEN = os.getenv("ROLES_IN_TOKEN", "False") == "True"
+
+# Build request.user from token claims instead of loading auth_user on every
+# request. Tokens issued before this was turned on still hit the database.
+JWT_STATELESS_AUTH = os.getenv("JWT_STATELESS_AUTH", "False") == "True"
+# Seconds a user's token version is cached; a revocation takes effect in
+# other processes within this window.
+TOKEN_VERSION_CACHE_TTL = int(os.getenv("TOKEN_VERSION_CACHE_TTL", "60"))
+
+# --- Inventory ---
+# "conditional": one guarded UPDATE ... RETURNING per adjustment (default).
+# "locking": SELECT ... FOR UPDATE, check in Python, then save.
+INVENTORY_ADJUST_STRATEGY = os.getenv("INVENTORY_ADJUST_STRATEGY", "conditional")
+# As-of queries replay logs from this many seconds before the checkpoint, to
+# cover writes that were uncommitted while the snapshot was being read.
+INVENTORY_SNAPSHOT_MARGIN = int(os.getenv("INVENTORY_SNAPSHOT_MARGIN", "300"))
+# inventory/by-hub/?since_version= hands out a high-water mark this many
+# seconds behind now; it must exceed the longest inventory write transaction
+# (see core.views._sync_version), or clients can miss that transaction's rows.
+INVENTORY_SYNC_LAG = float(os.getenv("INVENTORY_SYNC_LAG", "5"))
+# Per-process LRU of barcode -> SKU id lookups used by inventory/scan/.
+BARCODE_CACHE_SIZE = int(os.getenv("BARCODE_CACHE_SIZE", "50000"))
+# Seconds between checks of the sku table stamp that invalidates that LRU.
+BARCODE_STAMP_TTL = float(os.getenv("BARCODE_STAMP_TTL", "5"))
+# Rows fetched (and written to the response) per chunk by the log exports.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Change feed (changes/, changes/stream/): longest long-poll hold, how often
+# a held request re-checks, how long an id gap may stay open before it is
+# treated as a rolled-back write, and how long one SSE connection lasts.
+# A long-poll holds a sync worker for its whole wait; see ASYNC_READ_VIEWS.
+CHANGES_MAX_WAIT = int(os.getenv("CHANGES_MAX_WAIT", "25"))
+CHANGES_POLL_INTERVAL = float(os.getenv("CHANGES_POLL_INTERVAL", "0.5"))
+CHANGES_GAP_GRACE = int(os.getenv("CHANGES_GAP_GRACE", "5"))
+CHANGES_STREAM_SECONDS = int(os.getenv("CHANGES_STREAM_SECONDS", "300"))
+
+# Seconds an Idempotency-Key response is replayed for; expired keys are
+# removed by `manage.py purge_idempotency_keys`.
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", str(24 * 3600)))
+
+# --- Admin ---
+# Changelists count at most this many rows exactly; beyond it PostgreSQL
+# reports the planner's estimate and other backends stop counting.
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv("ADMIN_EXACT_COUNT_LIMIT", "10000"))
+
+# --- Request timing / metrics ---
+# Server-Timing header, one JSON log line per request on "core.timing", and
+# the per-endpoint quantiles served at /api/v1/metrics/.
+REQUEST_TIMING = os.getenv("REQUEST_TIMING", "False") == "True"
+# Requests running more queries than this are logged at WARNING (N+1 hunting).
+REQUEST_TIMING_QUERY_WARN = int(os.getenv("REQUEST_TIMING_QUERY_WARN", "50"))
+# Samples per endpoint behind the p50/p95/p99 figures, per process.
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1024"))
+# Static bearer token for the Prometheus scraper; admins can use their JWT.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core.timing": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
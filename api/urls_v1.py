@@ -1,4 +1,5 @@
 # api/urls_v1.py
+from django.conf import settings
 from django.urls import path
 from django.http import JsonResponse
 from rest_framework.decorators import api_view, permission_classes
@@ -6,13 +7,24 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.schemas import get_schema_view
 
+from core import async_views
+from core.roles import get_roles
 from core.views import (
+    analytics_movements,
     skus,
     sku_detail,
     inventory_adjust,
+    inventory_adjust_batch,
+    inventory_as_of,
     inventory_by_hub,
+    inventory_changes,
+    inventory_changes_stream,
     hubs,
     inventory_logs,
+    inventory_logs_export,
+    inventory_scan,
+    inventory_transfer,
+    metrics_view,
 )
 
 app_name = "v1"
@@ -25,7 +37,7 @@ def ping(_req):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def me(request):
-    roles = list(request.user.groups.values_list("name", flat=True))
+    roles = sorted(get_roles(request.user))
     return JsonResponse({"user": request.user.username, "roles": roles})
 
 schema_view = get_schema_view(
@@ -36,9 +48,20 @@ schema_view = get_schema_view(
     permission_classes=[AllowAny],
 )
 
+if settings.ASYNC_READ_VIEWS:
+    # ASGI deployments: the read-heavy routes run on the event loop.
+    ping = async_views.ping
+    me = async_views.me
+    hubs = async_views.hubs
+    skus = async_views.skus
+    inventory_by_hub = async_views.inventory_by_hub
+    inventory_logs = async_views.inventory_logs
+    inventory_changes = async_views.inventory_changes
+
 urlpatterns = [
     path("ping/", ping, name="ping"),
     path("schema/", schema_view, name="schema"),
+    path("metrics/", metrics_view, name="metrics"),
 
     # Auth
     path("auth/login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
@@ -52,8 +75,18 @@ urlpatterns = [
 
     # Inventory
     path("inventory/by-hub/<int:hub_id>/", inventory_by_hub, name="inventory_by_hub"),
+    path("inventory/by-hub/<int:hub_id>/as-of/", inventory_as_of, name="inventory_as_of"),
     path("inventory/adjust/", inventory_adjust, name="inventory_adjust"),
+    path("inventory/adjust/batch/", inventory_adjust_batch, name="inventory_adjust_batch"),
+    path("inventory/scan/", inventory_scan, name="inventory_scan"),
+    path("inventory/transfer/", inventory_transfer, name="inventory_transfer"),
+    path("changes/", inventory_changes, name="inventory_changes"),
+    path("changes/stream/", inventory_changes_stream, name="inventory_changes_stream"),
 
     # Logs
     path("logs/", inventory_logs, name="inventory_logs"),
+    path("logs/export/", inventory_logs_export, name="inventory_logs_export"),
+
+    # Analytics
+    path("analytics/movements/", analytics_movements, name="analytics_movements"),
 ]
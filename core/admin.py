@@ -1,6 +1,167 @@
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
 from .models import Hub, SKU, Inventory, InventoryLog
 
+
+# -----------------------------
+# Large-table helpers
+# -----------------------------
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that never runs a full ``COUNT(*)`` over a big
+    table. On PostgreSQL the planner's row estimate for the filtered query is
+    used once it exceeds ``ADMIN_EXACT_COUNT_LIMIT``. Elsewhere the count
+    stops at that limit. Smaller results are counted exactly.
+
+    An estimate can fall short of the real row count. From its last page on,
+    one probe query checks for rows past the requested page; if there are
+    any, the page is served and the count grows to offer the next one.
+    """
+    estimated = False
+
+    @cached_property
+    def count(self):
+        qs = self.object_list.order_by()
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        if connection.vendor == "postgresql":
+            estimate = _planner_rows(qs)
+            if estimate > limit:
+                self.estimated = True
+                return estimate
+            return qs.count()
+        count = qs[:limit + 1].count()
+        self.estimated = count > limit
+        return count
+
+    def validate_number(self, number):
+        try:
+            number = super().validate_number(number)
+        except EmptyPage:
+            number = int(number)
+            if not self.estimated or number < 1 or not self._has_rows_from((number - 1) * self.per_page):
+                raise
+        if self.estimated and number >= self.num_pages and self._has_rows_from(number * self.per_page):
+            self.count = number * self.per_page + 1
+            self.__dict__.pop("num_pages", None)
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+        # Not cut off at an estimated count: the last page may hold more rows.
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+    def _has_rows_from(self, offset):
+        return self.object_list[offset:offset + 1].exists()
+
+
+def _planner_rows(qs) -> int:
+    sql, params = qs.query.sql_with_params()
+    with connection.cursor() as cur:
+        cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class InputFilter(admin.SimpleListFilter):
+    """A text box instead of a dropdown built from a whole related table."""
+    template = "admin/core/input_filter.html"
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            "parameter_name": self.parameter_name,
+            "value": self.value(),
+            "params": [(k, v) for k, v in changelist.params.items() if k != self.parameter_name],
+        }
+
+
+class SKUCodeFilter(InputFilter):
+    title = "SKU code"
+    parameter_name = "sku_code"
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(sku__in=SKU.objects.filter(sku_code=self.value().strip()).values("pk"))
+
+
+class ActorFilter(InputFilter):
+    title = "actor username"
+    parameter_name = "actor"
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(actor__username=self.value().strip())
+
+
+class CreatedFilter(admin.SimpleListFilter):
+    """Fixed ranges; unlike ``date_hierarchy`` it needs no DISTINCT-dates query."""
+    title = "created"
+    parameter_name = "created"
+    RANGES = {"today": 0, "7d": 6, "30d": 29, "365d": 364}
+
+    def lookups(self, request, model_admin):
+        return [("today", "Today"), ("7d", "Past 7 days"), ("30d", "Past 30 days"), ("365d", "Past year")]
+
+    def queryset(self, request, queryset):
+        days = self.RANGES.get(self.value())
+        if days is not None:
+            start = timezone.localdate() - timedelta(days=days)
+            return queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for tables with millions of rows: estimated counts,
+    no second unfiltered count, no facet counts, and prefix-only search on
+    indexed code columns (``code_search``) instead of ``icontains`` scans.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    code_search = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term or not self.code_search:
+            return super().get_search_results(request, queryset, search_term)
+        match = None
+        for field, subquery in self.code_search:
+            q = Q(**{f"{field}__in": subquery(term)})
+            match = q if match is None else match | q
+        return queryset.filter(match), False
+
+
+def _sku_prefix(term):
+    # Case-insensitive, like ?q= on the API; sku_code_upper_like_idx serves it on PostgreSQL.
+    return SKU.objects.filter(sku_code__istartswith=term).values("pk")
+
+
+def _hub_code(term):
+    return Hub.objects.filter(code=term).values("pk")
+
+
+# -----------------------------
+# Admins
+# -----------------------------
 @admin.register(Hub)
 class HubAdmin(admin.ModelAdmin):
     list_display = ("code", "name", "city", "country", "active", "created_at")
@@ -14,17 +175,26 @@ class SKUAdmin(admin.ModelAdmin):
     list_filter = ("active", "color", "size")
     search_fields = ("sku_code", "name", "barcode", "color", "size")
     ordering = ("sku_code",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(Inventory)
-class InventoryAdmin(admin.ModelAdmin):
-    list_display = ("hub", "sku", "quantity")
-    list_filter = ("hub",)
-    search_fields = ("hub__code", "sku__sku_code", "sku__name")
+class InventoryAdmin(LargeTableAdmin):
+    list_display = ("hub", "sku", "quantity", "updated_at")
+    list_filter = ("hub", SKUCodeFilter)
+    list_select_related = ("hub", "sku")
+    search_fields = ("=hub__code", "^sku__sku_code")
+    code_search = (("sku", _sku_prefix), ("hub", _hub_code))
+    autocomplete_fields = ("hub", "sku")
+    readonly_fields = ("version", "updated_at")
 
 @admin.register(InventoryLog)
-class InventoryLogAdmin(admin.ModelAdmin):
+class InventoryLogAdmin(LargeTableAdmin):
     list_display = ("created_at", "hub", "sku", "direction", "delta", "before_qty", "after_qty", "actor")
-    list_filter = ("hub", "direction", "actor")
-    search_fields = ("hub__code", "sku__sku_code", "sku__name", "note")
-    date_hierarchy = "created_at"
+    list_filter = (CreatedFilter, "hub", "direction", SKUCodeFilter, ActorFilter)
+    list_select_related = ("hub", "sku", "actor")
+    search_fields = ("=hub__code", "^sku__sku_code")
+    code_search = (("sku", _sku_prefix), ("hub", _hub_code))
+    autocomplete_fields = ("hub", "sku")
+    raw_id_fields = ("actor",)
     ordering = ("-created_at",)
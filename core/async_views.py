@@ -0,0 +1,194 @@
+# core/async_views.py
+"""
+Async versions of the read-heavy endpoints, for ASGI deployments.
+
+api/urls_v1.py routes ping/, me/, hubs/, skus/, inventory/by-hub/<id>/,
+logs/ and changes/ here when ``ASYNC_READ_VIEWS`` is on. The views use the async ORM
+(``aget``, ``async for``) and ``JWTAuthentication.aauthenticate``, and they
+share query building, filters and pagination with core.views, so they
+return the same JSON and headers. DRF has no async views, so these are plain
+Django views. They render with the same orjson renderer and skip DRF's
+content negotiation (always JSON).
+
+Writes are not served here. POST skus/ is handed to the sync DRF view.
+Under WSGI, keep the setting off; Django would otherwise run every one of
+these views in a fresh event loop.
+"""
+import asyncio
+from functools import wraps
+from time import monotonic
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework.exceptions import APIException
+
+from . import changes, views
+from .authentication import JWTAuthentication
+from .catalog_cache import acached_list_response
+from .models import Hub, SKU
+from .pagination import InvalidCursor, apaginate, is_paged, next_page_headers, parse_limit, set_next_headers
+from .renderers import FastJSONRenderer
+from .roles import aget_roles
+from .serializers import HubSerializer, SKUSerializer, inventory_log_values, inventory_values
+
+_render = FastJSONRenderer().render
+
+
+def _json(data, status=200):
+    return HttpResponse(_render(data), status=status, content_type="application/json")
+
+
+def _detail(message, status):
+    return _json({"detail": message}, status)
+
+
+def authenticated(view):
+    """``IsAuthenticated`` with ``JWTAuthentication``, answered like DRF would (401 + WWW-Authenticate)."""
+    auth_class = JWTAuthentication()
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            auth = await auth_class.aauthenticate(request)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+            resp, auth = _json(data, exc.status_code), None
+        else:
+            resp = None if auth else _detail("Authentication credentials were not provided.", 401)
+        if resp is not None:
+            resp["WWW-Authenticate"] = auth_class.authenticate_header(request)
+            return resp
+        request.user, request.auth = auth
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+# -----------------------------
+# Service
+# -----------------------------
+@require_GET
+async def ping(request):
+    return _json({"ok": True, "service": "tribestock-api", "version": "v1"})
+
+
+@require_GET
+@authenticated
+async def me(request):
+    roles = sorted(await aget_roles(request.user))
+    return _json({"user": request.user.username, "roles": roles})
+
+
+# -----------------------------
+# Catalog
+# -----------------------------
+@require_GET
+@authenticated
+async def hubs(request):
+    async def build():
+        rows = [hub async for hub in Hub.objects.order_by("code", "name")]
+        return HubSerializer(rows, many=True).data, {}
+
+    return await acached_list_response(request, ["hub"], build)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+async def skus(request):
+    if request.method == "POST":
+        return await sync_to_async(views.skus)(request)
+    return await _skus_list(request)
+
+
+@authenticated
+async def _skus_list(request):
+    try:
+        fields = views._parse_fields(request, SKUSerializer.Meta.fields)
+        qs = SKU.objects.filter(views._sku_filters(request)).order_by("sku_code")
+    except views.BadParam as exc:
+        return _detail(str(exc), 400)
+
+    async def build():
+        if is_paged(request):
+            limit = parse_limit(request, default=100, maximum=1000)
+            rows, next_cursor = await apaginate(qs, request, ("sku_code",), (str,), limit)
+        else:
+            rows, next_cursor = [sku async for sku in qs], None
+        data = SKUSerializer(rows, many=True, fields=fields).data
+        return data, next_page_headers(request, next_cursor)
+
+    try:
+        return await acached_list_response(request, ["sku"], build)
+    except InvalidCursor as exc:
+        return _detail(str(exc), 400)
+
+
+# -----------------------------
+# Inventory
+# -----------------------------
+@require_GET
+@authenticated
+async def inventory_by_hub(request, hub_id: int):
+    try:
+        since, names, rows = views._by_hub_rows(request, hub_id)
+    except views.BadParam as exc:
+        return _detail(str(exc), 400)
+    sync_version = await sync_to_async(views._sync_version)(hub_id, since or 0)
+    next_cursor = None
+    if is_paged(request):
+        limit = parse_limit(request, default=100, maximum=1000)
+        try:
+            rows, next_cursor = await apaginate(
+                rows, request, views.BY_HUB_KEYS, (str, int), limit, key=lambda r: r[-2:],
+            )
+        except InvalidCursor as exc:
+            return _detail(str(exc), 400)
+    else:
+        rows = [row async for row in rows]
+
+    resp = _json(inventory_values.to_dicts(names, rows))
+    resp["X-Inventory-Version"] = sync_version
+    return set_next_headers(resp, request, next_cursor)
+
+
+@require_GET
+@authenticated
+async def inventory_logs(request):
+    names, rows = views._log_rows(request)
+    limit = parse_limit(request, default=50, maximum=200)
+    try:
+        rows, next_cursor = await apaginate(
+            rows, request, views.LOG_KEYS, views.LOG_KEY_TYPES, limit, descending=True, key=lambda r: r[-2:],
+        )
+    except InvalidCursor as exc:
+        return _detail(str(exc), 400)
+    return set_next_headers(_json(inventory_log_values.to_dicts(names, rows)), request, next_cursor)
+
+
+# -----------------------------
+# Change feed
+# -----------------------------
+@require_GET
+@authenticated
+async def inventory_changes(request):
+    """changes/ with the long-poll held on the event loop instead of a worker thread."""
+    try:
+        since_id, hub_id = views._parse_changes_params(request.GET)
+        wait = views._parse_wait(request.GET)
+    except views.BadParam as exc:
+        return _detail(str(exc), 400)
+    if since_id is None:
+        return _json({"changes": [], "last_id": await sync_to_async(changes.head_id)()})
+
+    limit = parse_limit(request, default=500, maximum=1000)
+    fetch = sync_to_async(changes.fetch)
+    deadline = monotonic() + wait
+    while True:
+        rows, last_id = await fetch(since_id, hub_id, limit)
+        if rows or last_id != since_id or monotonic() >= deadline:
+            break
+        await asyncio.sleep(settings.CHANGES_POLL_INTERVAL)
+    return _json({"changes": rows, "last_id": last_id})
@@ -0,0 +1,170 @@
+# core/authentication.py
+"""
+JWT authentication.
+
+``JWTAuthentication`` checks the token-version (``tv``) claim against the
+user's current ``UserTokenVersion``, cached for ``TOKEN_VERSION_CACHE_TTL``
+seconds, so ``revoke_tokens`` invalidates everything issued before it. A
+deleted user counts as revoked.
+
+With ``JWT_STATELESS_AUTH`` on, a token that carries the identity claims
+added by ``ClaimsTokenObtainPairSerializer`` is turned into a ``ClaimsUser``
+without loading the ``auth_user`` row. Views that need the real model use
+``DatabaseJWTAuthentication`` via ``@authentication_classes``, or read
+``request.user.db_user``.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication as BaseJWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import UserTokenVersion
+
+TOKEN_VERSION_CLAIM = "tv"
+# Cached in place of a version for deleted users; no token carries it, so
+# their stateless tokens are rejected like revoked ones.
+DELETED_USER = -1
+IDENTITY_CLAIMS = ("username", "is_superuser", "roles")
+
+
+def _version_cache_key(user_id) -> str:
+    return f"token-version:{user_id}"
+
+
+def _version_query(user_id):
+    # One row per existing user: the stored version, or None if it was never bumped.
+    stored = UserTokenVersion.objects.filter(user_id=OuterRef("pk")).values("version")
+    return get_user_model().objects.filter(pk=user_id).values_list(Subquery(stored), flat=True)
+
+
+def _version(found) -> int:
+    if not found:
+        return DELETED_USER
+    return found[0] or 0
+
+
+def stored_token_version(user_id) -> int:
+    """
+    ``current_token_version`` read from the database. New tokens are stamped
+    with it: another process may still have the pre-revoke version cached.
+    """
+    return _version(list(_version_query(user_id)))
+
+
+def current_token_version(user_id) -> int:
+    """The user's token version; ``DELETED_USER`` if the user no longer exists."""
+    key = _version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = stored_token_version(user_id)
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TTL)
+    return version
+
+
+async def acurrent_token_version(user_id) -> int:
+    key = _version_cache_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = _version([v async for v in _version_query(user_id)])
+        await cache.aset(key, version, settings.TOKEN_VERSION_CACHE_TTL)
+    return version
+
+
+def forget_token_version(user_id) -> None:
+    """
+    Drop the cached version once the current transaction commits (at once
+    outside one). Dropped earlier, a concurrent request could cache the old
+    version again for the whole TTL.
+    """
+    key = _version_cache_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def revoke_tokens(user_id) -> int:
+    """Invalidate all outstanding tokens of ``user_id``; returns the new version."""
+    row, created = UserTokenVersion.objects.get_or_create(user_id=user_id, defaults={"version": 1})
+    if not created:
+        UserTokenVersion.objects.filter(pk=row.pk).update(version=F("version") + 1)
+        row.refresh_from_db()
+    forget_token_version(user_id)
+    return row.version
+
+
+class ClaimsUser(TokenUser):
+    """Request user built from token claims: id, username, is_superuser, roles."""
+
+    def __init__(self, token):
+        super().__init__(token)
+        self._roles = frozenset(token.get("roles", ()))
+
+    @cached_property
+    def db_user(self):
+        return get_user_model().objects.get(**{api_settings.USER_ID_FIELD: self.id})
+
+
+class JWTAuthentication(BaseJWTAuthentication):
+    # None follows settings.JWT_STATELESS_AUTH; subclasses pin it.
+    stateless = None
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None and validated_token.get(TOKEN_VERSION_CLAIM, 0) != current_token_version(user_id):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        stateless = settings.JWT_STATELESS_AUTH if self.stateless is None else self.stateless
+        if stateless and all(c in validated_token for c in IDENTITY_CLAIMS):
+            return ClaimsUser(validated_token)
+
+        user = super().get_user(validated_token)
+        if settings.ROLES_IN_TOKEN and "roles" in validated_token:
+            user._roles = frozenset(validated_token["roles"])
+        return user
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views: the same checks, with async ORM lookups."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != await acurrent_token_version(user_id):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        stateless = settings.JWT_STATELESS_AUTH if self.stateless is None else self.stateless
+        if stateless and all(c in validated_token for c in IDENTITY_CLAIMS):
+            return ClaimsUser(validated_token)
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        if settings.ROLES_IN_TOKEN and "roles" in validated_token:
+            user._roles = frozenset(validated_token["roles"])
+        return user
+
+
+class DatabaseJWTAuthentication(JWTAuthentication):
+    """Always loads the user row; for endpoints that need the full model."""
+    stateless = False
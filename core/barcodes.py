@@ -0,0 +1,79 @@
+# core/barcodes.py
+"""
+Barcode -> SKU id lookups for ``inventory/scan/``.
+
+Barcodes that resolve to exactly one SKU are kept in a per-process LRU of
+``BARCODE_CACHE_SIZE`` entries. A hit costs no query; a miss is one
+indexed ``SKU.barcode`` query.
+
+The LRU is dropped when the ``sku`` table stamp from ``core.catalog_cache``
+changes; every SKU save/delete and ``import_skus`` replaces it. The stamp
+is read at most once per ``BARCODE_STAMP_TTL`` seconds, so another process
+can serve a changed barcode from its LRU for up to that long. In the
+process that saved the SKU, the post_save/post_delete signal clears the
+LRU as soon as the transaction commits.
+
+"Not found" and "ambiguous" are not cached. A write that skips the stamp
+(a raw ``UPDATE``) could otherwise keep a new barcode unknown until the
+next stamp change, and scans of junk barcodes would evict real entries.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .catalog_cache import table_version
+from .models import SKU
+
+AMBIGUOUS = -1
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_stamp = None
+_checked = None  # time.monotonic() of the last stamp read
+
+
+def _check_stamp():
+    """Re-read the sku table stamp if it is due, dropping the LRU when it changed."""
+    global _stamp, _checked
+    now = time.monotonic()
+    with _lock:
+        if _checked is not None and now - _checked < settings.BARCODE_STAMP_TTL:
+            return
+    stamp = table_version("sku")[0]
+    with _lock:
+        if stamp != _stamp:
+            _entries.clear()
+            _stamp = stamp
+        _checked = now
+
+
+def lookup(barcode: str):
+    """The SKU id for ``barcode``; None if unknown, ``AMBIGUOUS`` if shared by several SKUs."""
+    _check_stamp()
+    with _lock:
+        if barcode in _entries:
+            _entries.move_to_end(barcode)
+            return _entries[barcode]
+        stamp = _stamp
+
+    ids = list(SKU.objects.filter(barcode=barcode).values_list("pk", flat=True)[:2])
+    sku_id = ids[0] if len(ids) == 1 else (AMBIGUOUS if ids else None)
+
+    if sku_id is None or sku_id == AMBIGUOUS:
+        return sku_id
+    with _lock:
+        # Skip it if the LRU was dropped while we queried.
+        if stamp is not None and stamp == _stamp:
+            _entries[barcode] = sku_id
+            if len(_entries) > settings.BARCODE_CACHE_SIZE:
+                _entries.popitem(last=False)
+    return sku_id
+
+
+def clear():
+    global _stamp, _checked
+    with _lock:
+        _entries.clear()
+        _stamp = _checked = None
@@ -0,0 +1,123 @@
+# core/catalog_cache.py
+"""
+Version stamps and cached payloads for slowly changing tables (hubs, SKUs).
+
+Each table has a random stamp in the ``TableVersion`` table. Every write
+replaces it in the same transaction: post_save/post_delete signals do it
+through ``bump_table_version``, and bulk writers such as ``import_skus``
+call it directly. Because the stamps live in the database, every worker
+process and management command sees the same ones. List views derive a
+strong ETag from the stamps and the request URL. A matching
+``If-None-Match``/``If-Modified-Since`` gets a 304. Any other request with an
+unchanged table is served from the payload cached under that ETag, at the
+cost of one primary-key query for the stamps. Stamps are read and payloads
+built on the primary database, since a lagging replica could otherwise be
+cached under the new stamp.
+
+Payloads sit in the default cache. A per-process cache (no ``REDIS_URL``)
+only costs extra cache misses; it can never serve a stale payload.
+"""
+import hashlib
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from . import db_router
+from .models import TableVersion
+from .renderers import FastJSONRenderer
+
+
+def table_versions(tables):
+    """``{table: (stamp, modified_at)}`` for ``tables``, with ``modified_at`` in Unix seconds."""
+    with db_router.primary():
+        rows = TableVersion.objects.filter(table__in=tables).values_list("table", "stamp", "modified_at")
+        found = {table: (stamp, int(modified.timestamp())) for table, stamp, modified in rows}
+        missing = [t for t in tables if t not in found]
+        if missing:
+            # First use of a table; a concurrent first use may have won.
+            now = timezone.now()
+            TableVersion.objects.bulk_create(
+                [TableVersion(table=t, stamp=uuid.uuid4().hex, modified_at=now) for t in missing],
+                ignore_conflicts=True,
+            )
+            return table_versions(tables)
+    return found
+
+
+def table_version(table: str):
+    """Returns ``(stamp, modified_at)`` for ``table``."""
+    return table_versions([table])[table]
+
+
+def bump_table_version(*tables: str) -> None:
+    """Give ``tables`` a new stamp; it commits (or rolls back) with the current transaction."""
+    now = timezone.now()
+    TableVersion.objects.bulk_create(
+        [TableVersion(table=t, stamp=uuid.uuid4().hex, modified_at=now) for t in tables],
+        update_conflicts=True, unique_fields=["table"], update_fields=["stamp", "modified_at"],
+    )
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    return header.strip() == "*" or etag in (t.strip() for t in header.split(","))
+
+
+def cached_list_response(request, tables, build):
+    """
+    Serve a read-only list whose content depends only on ``tables`` and the
+    request URL. On a cache miss ``build`` returns ``(data, headers)``;
+    ``headers`` (e.g. pagination links) are cached alongside the data.
+    """
+    key, headers, not_modified = _conditional(request, tables)
+    if not_modified:
+        return Response(status=304, headers=headers)
+    cached = cache.get(key)
+    if cached is None:
+        with db_router.primary():
+            cached = build()
+        cache.set(key, cached, settings.CATALOG_CACHE_TTL)
+    data, extra = cached
+    return Response(data, status=200, headers={**headers, **extra})
+
+
+async def acached_list_response(request, tables, abuild):
+    """``cached_list_response`` for async views; ``abuild`` is a coroutine function."""
+    key, headers, not_modified = await sync_to_async(_conditional)(request, tables)
+    if not_modified:
+        return HttpResponse(status=304, headers=headers)
+    cached = await cache.aget(key)
+    if cached is None:
+        with db_router.primary():
+            cached = await abuild()
+        await cache.aset(key, cached, settings.CATALOG_CACHE_TTL)
+    data, extra = cached
+    return HttpResponse(
+        FastJSONRenderer().render(data), content_type="application/json", headers={**headers, **extra},
+    )
+
+
+def _conditional(request, tables):
+    """Returns ``(payload cache key, validator headers, whether the client copy is current)``."""
+    versions = table_versions(tables)
+    stamps = [versions[t] for t in tables]
+    digest = hashlib.sha1(
+        "|".join([request.get_full_path(), *(s for s, _ in stamps)]).encode()
+    ).hexdigest()
+    etag = f'"{digest}"'
+    modified = max(m for _, m in stamps)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(modified),
+        "Cache-Control": "private, no-cache",
+    }
+
+    inm = request.headers.get("If-None-Match")
+    ims = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+    not_modified = (inm and _etag_matches(inm, etag)) or (not inm and ims is not None and ims >= modified)
+    return f"list-payload:{digest}", headers, bool(not_modified)
@@ -0,0 +1,104 @@
+# core/db_router.py
+"""
+Read-replica routing.
+
+``DATABASE_REPLICA_URLS`` adds ``replica_1``, ``replica_2``, ... next to
+``default``. ``ReplicaRoutingMiddleware`` picks one replica for each
+GET/HEAD/OPTIONS request, and ``ReplicaRouter`` sends that request's reads
+there. Everything else goes to ``default``: writes, reads in POST/PUT/PATCH/
+DELETE requests (``inventory_adjust`` and the other write views), management
+commands, and code wrapped in ``primary()``.
+
+The middleware resets the routing when the view returns, so a streamed
+body that queries while it is being sent must bind the alias itself:
+take ``read_alias()`` in the view and pass it to ``QuerySet.using()``.
+Migrations only run on ``default``; replicas get the schema by
+replication.
+
+To let a client read its own writes, each successful write response carries
+a ``primary_until`` cookie and an ``X-Primary-Until`` header with a Unix
+time ``REPLICA_STICKY_SECONDS`` ahead. Until then, requests that send either
+one back also read from ``default``.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+STICKY_COOKIE = "primary_until"
+STICKY_HEADER = "X-Primary-Until"
+
+_read_db = ContextVar("read_db", default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica_")]
+
+
+def read_alias():
+    """The alias reads in the current context go to."""
+    return _read_db.get() or "default"
+
+
+def use_replica(alias):
+    """Route reads in the current context to ``alias`` (None: ``default``); returns a reset token."""
+    return _read_db.set(alias)
+
+
+def reset(token):
+    _read_db.reset(token)
+
+
+@contextmanager
+def primary():
+    """Read from ``default`` inside the block, e.g. to fill a cache shared with later requests."""
+    token = _read_db.set(None)
+    try:
+        yield
+    finally:
+        _read_db.reset(token)
+
+
+def choose_replica(request, replicas):
+    """A random replica for a safe request outside its sticky window, else None."""
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        return None
+    until = request.headers.get(STICKY_HEADER) or request.COOKIES.get(STICKY_COOKIE)
+    try:
+        # A value further ahead than one window is ignored, so a client
+        # cannot pin itself to the primary.
+        if until and 0 < float(until) - time.time() <= settings.REPLICA_STICKY_SECONDS:
+            return None
+    except ValueError:
+        pass
+    return random.choice(replicas)
+
+
+def mark_sticky(request, response):
+    """Flag a successful write so the client's next reads go to ``default``."""
+    if request.method in ("GET", "HEAD", "OPTIONS") or response.status_code >= 400:
+        return response
+    seconds = settings.REPLICA_STICKY_SECONDS
+    until = str(int(time.time()) + seconds)
+    response[STICKY_HEADER] = until
+    response.set_cookie(STICKY_COOKIE, until, max_age=seconds, httponly=True, samesite="Lax")
+    return response
+
+
+class ReplicaRouter:
+    """Reads go where the current request was routed; writes always go to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == "default"
@@ -0,0 +1,105 @@
+# core/exports.py
+"""
+Streaming InventoryLog exports (CSV / NDJSON).
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` so the
+database hands them over in chunks (a server-side cursor on PostgreSQL)
+and no model instances are built. Each chunk is formatted and yielded as
+one bytes block, so memory stays flat regardless of the export size and
+the first bytes go out as soon as the first chunk is read.
+
+Columns and value formats match ``GET logs/``. The writers take a
+``to_dicts(names, rows)`` formatter, so other reports (reconcile_inventory)
+can stream their own rows through them.
+"""
+import csv
+import io
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import InventoryLog
+from .renderers import FastJSONRenderer
+from .serializers import inventory_log_values
+
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def parse_bound(raw, end_of_day=False):
+    """
+    ISO datetime, or an ISO date meaning the start of that day (the end of
+    it when ``end_of_day``), in local time. Raises ValueError.
+    """
+    d = parse_date(raw)
+    if d is not None:
+        if end_of_day:
+            dt = datetime.combine(d + timedelta(days=1), time.min) - timedelta(microseconds=1)
+        else:
+            dt = datetime.combine(d, time.min)
+    else:
+        dt = parse_datetime(raw)
+        if dt is None:
+            raise ValueError(f"{raw!r} is not an ISO date or datetime")
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def log_rows(hub_id=None, sku_id=None, start=None, end=None, using=None):
+    """
+    ``(names, iterator)`` over InventoryLog rows, oldest first, with
+    ``start <= created_at <= end``. The rows are read while the response
+    streams, after request routing has ended, so a view passes its read
+    alias as ``using``.
+    """
+    qs = InventoryLog.objects.using(using).order_by("created_at", "id")
+    if hub_id:
+        qs = qs.filter(hub_id=hub_id)
+    if sku_id:
+        qs = qs.filter(sku_id=sku_id)
+    if start:
+        qs = qs.filter(created_at__gte=start)
+    if end:
+        qs = qs.filter(created_at__lte=end)
+    names, rows = inventory_log_values.values_list(qs)
+    return names, rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def _chunks(names, rows, to_dicts):
+    while True:
+        block = list(islice(rows, settings.EXPORT_CHUNK_SIZE))
+        if not block:
+            return
+        yield to_dicts(names, block)
+
+
+def iter_csv(names, rows, to_dicts=inventory_log_values.to_dicts):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=names, restval="", extrasaction="ignore")
+    writer.writeheader()
+    for block in _chunks(names, rows, to_dicts):
+        writer.writerows(block)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def iter_ndjson(names, rows, to_dicts=inventory_log_values.to_dicts):
+    dumps = FastJSONRenderer().render
+    for block in _chunks(names, rows, to_dicts):
+        yield b"".join(dumps(row) + b"\n" for row in block)
+
+
+STREAMERS = {
+    "csv": iter_csv,
+    "ndjson": iter_ndjson,
+}
@@ -0,0 +1,96 @@
+# core/idempotency.py
+"""
+``Idempotency-Key`` support for write endpoints.
+
+The first request with a given key runs the view and stores its response in
+the same transaction as the view's writes. A retry with the same key and
+body gets the stored response back from one indexed lookup, without running
+the view again. Reusing a key for a different body is rejected.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def _request_hash(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, separators=(",", ":"), default=str)
+    raw = f"{request.method} {request.path}\n{body}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _stored(user_id, key):
+    return IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+
+
+def _replay(stored, request_hash):
+    if stored.request_hash != request_hash:
+        return Response(
+            {"detail": f"{HEADER} was already used with a different request"},
+            status=422,
+        )
+    return Response(stored.response_body, status=stored.response_status, headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent(view):
+    """
+    Decorate a DRF function view (below ``@api_view``/``@permission_classes``).
+    Requests without the header, or from anonymous users, pass straight through.
+    Responses with status >= 500 are not stored so the client can retry them.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"detail": f"{HEADER} is too long"}, status=400)
+
+        request_hash = _request_hash(request)
+        now = timezone.now()
+        stored = _stored(request.user.pk, key)
+        if stored is not None and stored.expires_at > now:
+            return _replay(stored, request_hash)
+
+        with transaction.atomic():
+            if stored is not None:
+                stored.delete()
+
+            response = view(request, *args, **kwargs)
+            if response.status_code >= 500:
+                return response
+
+            try:
+                with transaction.atomic():
+                    IdempotencyKey.objects.create(
+                        key=key,
+                        user_id=request.user.pk,
+                        request_hash=request_hash,
+                        response_status=response.status_code,
+                        response_body=getattr(response, "data", None),
+                        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                    )
+            except IntegrityError:
+                # A concurrent request with the same key committed first: drop
+                # our writes, then answer with what it stored once we are out
+                # of the rolled-back block.
+                transaction.set_rollback(True)
+            else:
+                return response
+
+        stored = _stored(request.user.pk, key)
+        if stored is None:
+            return Response({"detail": f"A request with this {HEADER} is still in progress"}, status=409)
+        return _replay(stored, request_hash)
+
+    return wrapper
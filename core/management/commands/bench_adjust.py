@@ -0,0 +1,113 @@
+import json
+import logging
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from core.models import Hub, SKU, Inventory
+from core.metrics import quantile
+from core.stock import ADJUST_STRATEGIES
+
+BENCH_HUB = "BENCH-HUB"
+BENCH_SKU = "BENCH-HOT-SKU"
+BENCH_USER = "bench-adjust"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark POST inventory/adjust/ on a single hot (hub, sku) pair with concurrent "
+        "writers, comparing INVENTORY_ADJUST_STRATEGY values. Creates and removes its own "
+        "BENCH-* hub/SKU rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent writers (default 8).")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per writer (default 200).")
+        parser.add_argument(
+            "--strategy", action="append", choices=sorted(ADJUST_STRATEGIES),
+            help="Strategy to run; repeat to compare. Default: all.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def _worker(self, user, hub_id, sku_id, n, latencies, errors):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            for i in range(n):
+                # Alternate IN/OUT so stock never runs out and every request writes.
+                body = {"hub_id": hub_id, "sku_id": sku_id, "action": "IN" if i % 2 == 0 else "OUT", "quantity": 1}
+                t0 = time.perf_counter()
+                try:
+                    resp = client.post("/api/v1/inventory/adjust/", body, format="json")
+                    ok = resp.status_code == 200
+                except Exception:
+                    ok = False
+                latencies.append(time.perf_counter() - t0)
+                if not ok:
+                    errors.append(1)
+        finally:
+            connection.close()
+
+    def _run(self, strategy, user, hub, sku, threads, n):
+        latencies, errors = [], []
+        with override_settings(INVENTORY_ADJUST_STRATEGY=strategy):
+            workers = [
+                threading.Thread(target=self._worker, args=(user, hub.pk, sku.pk, n, latencies, errors))
+                for _ in range(threads)
+            ]
+            started = time.perf_counter()
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            elapsed = time.perf_counter() - started
+        latencies.sort()
+        total = threads * n
+        return {
+            "strategy": strategy,
+            "vendor": connection.vendor,
+            "threads": threads,
+            "requests": total,
+            "errors": len(errors),
+            "seconds": round(elapsed, 3),
+            "req_per_sec": round(total / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(quantile(latencies, 0.5) * 1000, 2),
+            "p99_ms": round(quantile(latencies, 0.99) * 1000, 2),
+        }
+
+    def handle(self, *args, **opts):
+        if opts["threads"] < 1 or opts["requests"] < 1:
+            raise CommandError("--threads and --requests must be positive")
+        strategies = opts["strategy"] or sorted(ADJUST_STRATEGIES)
+
+        user, _ = get_user_model().objects.get_or_create(username=BENCH_USER)
+        hub, _ = Hub.objects.get_or_create(code=BENCH_HUB, defaults={"name": "Benchmark hub"})
+        sku, _ = SKU.objects.get_or_create(sku_code=BENCH_SKU, defaults={"name": "Benchmark hot SKU"})
+        results = []
+        # Failed requests are counted below; keep django.request from dumping a traceback for each.
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            for strategy in strategies:
+                Inventory.objects.update_or_create(hub=hub, sku=sku, defaults={"quantity": 1000})
+                results.append(self._run(strategy, user, hub, sku, opts["threads"], opts["requests"]))
+        finally:
+            request_logger.setLevel(level)
+            hub.delete()
+            sku.delete()
+            user.delete()
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for r in results:
+            self.stdout.write(
+                f"{r['strategy']:<12} {r['req_per_sec']:>9} req/s  p50 {r['p50_ms']} ms  "
+                f"p99 {r['p99_ms']} ms  errors {r['errors']}/{r['requests']} ({r['vendor']}, {r['threads']} threads)"
+            )
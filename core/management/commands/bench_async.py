@@ -0,0 +1,295 @@
+import asyncio
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory
+
+from core import async_views, views
+from core.metrics import quantile
+from core.models import Hub
+from core.serializers import ClaimsTokenObtainPairSerializer
+
+BENCH_USER = "bench-async"
+SERVERS = ("wsgi", "asgi")
+
+
+def _paths(hub_id):
+    return [
+        "/api/v1/ping/",
+        "/api/v1/me/",
+        "/api/v1/hubs/",
+        "/api/v1/skus/?limit=100",
+        f"/api/v1/inventory/by-hub/{hub_id}/?limit=100",
+        "/api/v1/logs/?limit=50",
+    ]
+
+
+def _tree_rss_kb(pid):
+    """Resident memory of ``pid`` and its children (Linux /proc), in KiB."""
+    total, pending = 0, [pid]
+    while pending:
+        p = pending.pop()
+        try:
+            with open(f"/proc/{p}/status") as fh:
+                total += next(int(line.split()[1]) for line in fh if line.startswith("VmRSS:"))
+            with open(f"/proc/{p}/task/{p}/children") as fh:
+                pending.extend(int(c) for c in fh.read().split())
+        except (OSError, StopIteration):
+            continue
+    return total
+
+
+class _RSSSampler(threading.Thread):
+    def __init__(self, pid, interval=0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.stop = threading.Event()
+        self.peak = 0
+
+    def run(self):
+        while not self.stop.is_set():
+            self.peak = max(self.peak, _tree_rss_kb(self.pid))
+            self.stop.wait(self.interval)
+
+
+class _Server:
+    """A local gunicorn (WSGI) or uvicorn (ASGI) process on a free port."""
+
+    COMMANDS = {
+        "wsgi": lambda port, workers, threads: [
+            "gunicorn", "api.wsgi:application", "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers), "--threads", str(threads), "--log-level", "warning",
+        ],
+        "asgi": lambda port, workers, threads: [
+            "uvicorn", "api.asgi:application", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+    }
+
+    def __init__(self, kind, workers, threads):
+        self.port = self._free_port()
+        argv = self.COMMANDS[kind](self.port, workers, threads)
+        if shutil.which(argv[0]) is None:
+            raise CommandError(f"{argv[0]} is not installed; needed for --server {kind}")
+        env = {**os.environ, "ASYNC_READ_VIEWS": "True" if kind == "asgi" else "False"}
+        self.proc = subprocess.Popen(argv, env=env, start_new_session=True)
+        self.url = f"http://127.0.0.1:{self.port}"
+
+    @staticmethod
+    def _free_port():
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise CommandError(f"server exited with code {self.proc.returncode}")
+            try:
+                with urllib.request.urlopen(self.url + "/api/v1/ping/", timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError("server did not become ready")
+
+    def close(self):
+        os.killpg(self.proc.pid, signal.SIGTERM)
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync (WSGI, gunicorn) and async (ASGI, uvicorn + ASYNC_READ_VIEWS) read endpoints "
+        "under concurrent load: ping/, me/, hubs/, skus/, inventory/by-hub/ and logs/. Reports requests/s, "
+        "p50/p99 and server memory per concurrent connection. --server starts local servers (the "
+        "binaries must be installed); --url targets a running one; --in-process calls the views "
+        "directly (threads vs. one event loop) when neither server is available."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", action="append", choices=SERVERS,
+                            help="Start and benchmark this server; repeat for both (default: both).")
+        parser.add_argument("--url", help="Benchmark a server that is already running, e.g. http://127.0.0.1:8000.")
+        parser.add_argument("--pid", type=int, help="With --url: server PID to sample memory from.")
+        parser.add_argument("--in-process", action="store_true",
+                            help="No server: sync views on a thread pool vs. async views on one event loop.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Concurrent connections (default 50).")
+        parser.add_argument("--requests", type=int, default=2000, help="Total requests per run (default 2000).")
+        parser.add_argument("--workers", type=int, default=1, help="Server worker processes (default 1).")
+        parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker (default 8).")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def handle(self, *args, **opts):
+        if opts["concurrency"] < 1 or opts["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be positive")
+        hub_id = Hub.objects.order_by("pk").values_list("pk", flat=True).first()
+        if hub_id is None:
+            raise CommandError("No hubs; run seed_demo or seed_scale first")
+        user, _ = get_user_model().objects.get_or_create(username=BENCH_USER)
+        token = str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+
+        results = []
+        if opts["in_process"]:
+            results.append(self._in_process_sync(hub_id, token, opts))
+            results.append(asyncio.run(self._in_process_async(hub_id, token, opts)))
+        elif opts["url"]:
+            results.append(self._http_run(opts["url"], opts["url"], _paths(hub_id), token, opts, opts["pid"]))
+        else:
+            for kind in opts["server"] or SERVERS:
+                server = _Server(kind, opts["workers"], opts["threads"])
+                try:
+                    server.wait_ready()
+                    results.append(self._http_run(kind, server.url, _paths(hub_id), token, opts, server.proc.pid))
+                finally:
+                    server.close()
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for r in results:
+            if r.get("rss_peak_mb") is not None:
+                mem = (f", rss {r['rss_idle_mb']:.0f} -> {r['rss_peak_mb']:.0f} MB "
+                       f"({r['kb_per_connection']:.0f} KB/connection)")
+            elif "py_alloc_peak_kb_per_connection" in r:
+                mem = f", {r['py_alloc_peak_kb_per_connection']:.0f} KB Python allocations/connection"
+            else:
+                mem = ""
+            self.stdout.write(
+                f"{r['label']}: {r['requests']} requests, {r['errors']} errors, {r['rps']:.0f} req/s, "
+                f"p50 {r['p50_ms']:.1f} ms, p99 {r['p99_ms']:.1f} ms{mem}"
+            )
+
+    # -----------------------------
+    # Runs
+    # -----------------------------
+    def _summary(self, label, latencies, errors, elapsed, concurrency, rss_idle=None, rss_peak=None):
+        latencies.sort()
+        result = {
+            "label": label,
+            "concurrency": concurrency,
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": quantile(latencies, 0.5) * 1000,
+            "p99_ms": quantile(latencies, 0.99) * 1000,
+        }
+        if rss_peak is not None:
+            result["rss_idle_mb"] = rss_idle / 1024
+            result["rss_peak_mb"] = rss_peak / 1024
+            result["kb_per_connection"] = max(0, rss_peak - rss_idle) / concurrency
+        return result
+
+    def _http_run(self, label, base_url, paths, token, opts, pid=None):
+        headers = {"Authorization": f"Bearer {token}"}
+        n, concurrency = opts["requests"], opts["concurrency"]
+
+        def one(i):
+            req = urllib.request.Request(base_url.rstrip("/") + paths[i % len(paths)], headers=headers)
+            t0 = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=60) as resp:
+                    resp.read()
+                    ok = resp.status == 200
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - t0, ok
+
+        for i in range(len(paths)):  # warm caches and lazy imports
+            one(i)
+        sampler, rss_idle = None, None
+        if pid:
+            rss_idle = _tree_rss_kb(pid)
+            sampler = _RSSSampler(pid)
+            sampler.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(one, range(n)))
+        elapsed = time.perf_counter() - started
+        if sampler:
+            sampler.stop.set()
+            sampler.join()
+        latencies = [t for t, _ in outcomes]
+        errors = sum(1 for _, ok in outcomes if not ok)
+        return self._summary(label, latencies, errors, elapsed, concurrency,
+                             rss_idle, sampler.peak if sampler else None)
+
+    def _in_process_sync(self, hub_id, token, opts):
+        factory = RequestFactory()
+        routes = self._routes(hub_id, sync=True)
+
+        def one(i):
+            view, path, args = routes[i % len(routes)]
+            request = factory.get(path, HTTP_AUTHORIZATION=f"Bearer {token}")
+            t0 = time.perf_counter()
+            try:
+                resp = view(request, *args)
+                resp.render()
+                return time.perf_counter() - t0, resp.status_code == 200
+            finally:
+                connection.close()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts["concurrency"]) as pool:
+            outcomes = list(pool.map(one, range(opts["requests"])))
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result = self._summary("in-process sync (threads)", [t for t, _ in outcomes],
+                               sum(1 for _, ok in outcomes if not ok), elapsed, opts["concurrency"])
+        result["py_alloc_peak_kb_per_connection"] = peak / 1024 / opts["concurrency"]
+        return result
+
+    async def _in_process_async(self, hub_id, token, opts):
+        factory = AsyncRequestFactory()
+        routes = self._routes(hub_id, sync=False)
+        queue = list(range(opts["requests"]))
+        latencies, errors = [], 0
+
+        async def worker():
+            nonlocal errors
+            while queue:
+                view, path, args = routes[queue.pop() % len(routes)]
+                request = factory.get(path, headers={"authorization": f"Bearer {token}"})
+                t0 = time.perf_counter()
+                resp = await view(request, *args)
+                latencies.append(time.perf_counter() - t0)
+                errors += resp.status_code != 200
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(opts["concurrency"])))
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result = self._summary("in-process async (event loop)", latencies, errors, elapsed, opts["concurrency"])
+        result["py_alloc_peak_kb_per_connection"] = peak / 1024 / opts["concurrency"]
+        return result
+
+    def _routes(self, hub_id, sync):
+        # ping/ and me/ live in api/urls_v1.py and are left out of the in-process run.
+        module = views if sync else async_views
+        return [
+            (module.hubs, "/api/v1/hubs/", ()),
+            (module.skus, "/api/v1/skus/?limit=100", ()),
+            (module.inventory_by_hub, f"/api/v1/inventory/by-hub/{hub_id}/?limit=100", (hub_id,)),
+            (module.inventory_logs, "/api/v1/logs/?limit=50", ()),
+        ]
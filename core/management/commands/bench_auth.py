@@ -0,0 +1,89 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from core.models import Hub, SKU, Inventory
+from core.serializers import ClaimsTokenObtainPairSerializer
+
+BENCH_HUB = "BENCH-AUTH-HUB"
+BENCH_SKU = "BENCH-AUTH-SKU"
+BENCH_USER = "bench-auth"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare database-backed and stateless JWT authentication: SQL queries per request "
+        "and latency on GET hubs/ and POST inventory/adjust/, using a real Bearer token."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300, help="Requests per endpoint and mode (default 300).")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def _measure(self, client, call, n):
+        latencies, queries = [], 0
+        for _ in range(n):
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                resp = call(client)
+                latencies.append(time.perf_counter() - t0)
+            if resp.status_code != 200:
+                raise CommandError(f"Unexpected status {resp.status_code}: {resp.content[:200]!r}")
+            queries += len(ctx)
+        latencies.sort()
+        return {
+            "queries_per_request": round(queries / n, 2),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+            "mean_ms": round(sum(latencies) / n * 1000, 3),
+        }
+
+    def handle(self, *args, **opts):
+        n = opts["requests"]
+        if n < 1:
+            raise CommandError("--requests must be positive")
+
+        user, _ = get_user_model().objects.get_or_create(username=BENCH_USER)
+        hub, _ = Hub.objects.get_or_create(code=BENCH_HUB, defaults={"name": "Benchmark hub"})
+        sku, _ = SKU.objects.get_or_create(sku_code=BENCH_SKU, defaults={"name": "Benchmark SKU"})
+        Inventory.objects.update_or_create(hub=hub, sku=sku, defaults={"quantity": 0})
+
+        endpoints = {
+            "GET hubs/": lambda c: c.get("/api/v1/hubs/"),
+            "POST inventory/adjust/": lambda c: c.post(
+                "/api/v1/inventory/adjust/",
+                {"hub_id": hub.pk, "sku_id": sku.pk, "action": "IN", "quantity": 1},
+                format="json",
+            ),
+        }
+        results = []
+        try:
+            # Identity claims are only stamped while stateless auth is on.
+            with override_settings(JWT_STATELESS_AUTH=True):
+                token = str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            for stateless in (False, True):
+                with override_settings(JWT_STATELESS_AUTH=stateless):
+                    for name, call in endpoints.items():
+                        call(client)  # warm caches
+                        row = {"auth": "stateless" if stateless else "database", "endpoint": name}
+                        row.update(self._measure(client, call, n))
+                        results.append(row)
+        finally:
+            hub.delete()
+            sku.delete()
+            user.delete()
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for r in results:
+            self.stdout.write(
+                f"{r['auth']:<10} {r['endpoint']:<24} {r['queries_per_request']:>5} queries/req  "
+                f"p50 {r['p50_ms']} ms  mean {r['mean_ms']} ms"
+            )
@@ -0,0 +1,310 @@
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from core.models import Hub, SKU, Inventory
+from core.metrics import quantile
+from core.serializers import ClaimsTokenObtainPairSerializer
+from core.stock import ADJUST_STRATEGIES, version_bump
+
+BENCH_PREFIX = "BENCH-INV"
+BENCH_USER = "bench-inventory"
+OPS = ("adjust", "by_hub", "logs")
+
+
+def _parse_mix(raw):
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPS:
+            raise CommandError(f"--mix: unknown operation {name!r} (expected {', '.join(OPS)})")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f"--mix: weight of {name} must be a number")
+    if not mix or sum(mix.values()) <= 0:
+        raise CommandError("--mix needs at least one positive weight")
+    return mix
+
+
+class _TestClientTransport:
+    """Calls the views in-process through the DRF test client."""
+
+    def __init__(self, user):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def __call__(self, method, path, body=None):
+        if method == "POST":
+            resp = self.client.post(path, body, format="json")
+        else:
+            resp = self.client.get(path)
+        detail = resp.json().get("detail", "") if resp.status_code == 400 else ""
+        return resp.status_code, detail
+
+    def close(self):
+        connection.close()
+
+
+class _HTTPTransport:
+    """Calls a running server (``--url``) with a bearer token."""
+
+    def __init__(self, base_url, token):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+    def __call__(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers=self.headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                resp.read()
+                return resp.status, ""
+        except urllib.error.HTTPError as exc:
+            detail = ""
+            if exc.code == 400:
+                try:
+                    detail = json.loads(exc.read()).get("detail", "")
+                except ValueError:
+                    pass
+            return exc.code, detail
+
+    def close(self):
+        pass
+
+
+class _LockSampler(threading.Thread):
+    """PostgreSQL only: samples ungranted entries in pg_locks while the run lasts."""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stop = threading.Event()
+        self.samples = 0
+        self.waiting_samples = 0
+        self.max_waiting = 0
+
+    def run(self):
+        try:
+            with connection.cursor() as cur:
+                while not self.stop.is_set():
+                    cur.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+                    waiting = cur.fetchone()[0]
+                    self.samples += 1
+                    self.waiting_samples += bool(waiting)
+                    self.max_waiting = max(self.max_waiting, waiting)
+                    self.stop.wait(self.interval)
+        finally:
+            connection.close()
+
+    def report(self):
+        return {
+            "samples": self.samples,
+            "pct_samples_waiting": round(100 * self.waiting_samples / self.samples, 1) if self.samples else 0.0,
+            "max_waiting": self.max_waiting,
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent load mix of inventory/adjust/, inventory/by-hub/ and logs/ over hot and cold "
+        "(hub, sku) keys. Reports throughput, p50/p99 per operation, lock waits (pg_locks samples on "
+        "PostgreSQL) and 'Insufficient stock' rejections. Runs in-process through the test client, "
+        "or against a running server with --url. Creates and removes its own BENCH-INV-* rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent workers (default 8).")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per worker (default 200).")
+        parser.add_argument("--mix", default="adjust=70,by_hub=20,logs=10",
+                            help="Operation weights (default adjust=70,by_hub=20,logs=10).")
+        parser.add_argument("--hubs", type=int, default=2, help="Benchmark hubs (default 2).")
+        parser.add_argument("--skus", type=int, default=200, help="Benchmark SKUs per hub (default 200).")
+        parser.add_argument("--hot-keys", type=int, default=4, help="Hot (hub, sku) pairs (default 4).")
+        parser.add_argument("--hot-ratio", type=float, default=0.8,
+                            help="Share of adjustments that hit a hot pair (default 0.8).")
+        parser.add_argument("--stock", type=int, default=50, help="Starting quantity per pair (default 50).")
+        parser.add_argument(
+            "--strategy", action="append", choices=sorted(ADJUST_STRATEGIES),
+            help="INVENTORY_ADJUST_STRATEGY to run in-process; repeat to compare. Default: all.",
+        )
+        parser.add_argument("--url", help="Base URL of a running server (e.g. http://127.0.0.1:8000).")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed (default 1).")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    # -----------------------------
+    # Fixture
+    # -----------------------------
+    def _seed(self, n_hubs, n_skus, stock):
+        hubs = Hub.objects.bulk_create(
+            [Hub(code=f"{BENCH_PREFIX}-H{i}", name=f"Benchmark hub {i}") for i in range(n_hubs)]
+        )
+        skus = SKU.objects.bulk_create(
+            [SKU(sku_code=f"{BENCH_PREFIX}-{i:06d}", name=f"Bench SKU {i:06d}") for i in range(n_skus)]
+        )
+        if any(h.pk is None for h in hubs) or any(s.pk is None for s in skus):
+            hubs = list(Hub.objects.filter(code__startswith=f"{BENCH_PREFIX}-"))
+            skus = list(SKU.objects.filter(sku_code__startswith=f"{BENCH_PREFIX}-"))
+        Inventory.objects.bulk_create(
+            [Inventory(hub=h, sku=s, quantity=stock) for h in hubs for s in skus], batch_size=5000
+        )
+        return [h.pk for h in hubs], [s.pk for s in skus]
+
+    def _reset_stock(self, hub_ids, stock):
+        Inventory.objects.filter(hub_id__in=hub_ids).update(quantity=stock, **version_bump())
+
+    def _cleanup(self):
+        Hub.objects.filter(code__startswith=f"{BENCH_PREFIX}-").delete()
+        SKU.objects.filter(sku_code__startswith=f"{BENCH_PREFIX}-").delete()
+
+    # -----------------------------
+    # Run
+    # -----------------------------
+    def _worker(self, idx, transport, plan, opts, results):
+        rng = random.Random(opts["seed"] * 1000 + idx)
+        ops, weights = zip(*plan["mix"].items())
+        hot, pairs, hub_ids = plan["hot"], plan["pairs"], plan["hub_ids"]
+        try:
+            for _ in range(opts["requests"]):
+                op = rng.choices(ops, weights)[0]
+                if op == "adjust":
+                    hub_id, sku_id = rng.choice(hot) if rng.random() < opts["hot_ratio"] else rng.choice(pairs)
+                    body = {"hub_id": hub_id, "sku_id": sku_id,
+                            "action": rng.choice(("IN", "OUT")), "quantity": rng.randint(1, 5)}
+                    call = ("POST", "/api/v1/inventory/adjust/", body)
+                elif op == "by_hub":
+                    call = ("GET", f"/api/v1/inventory/by-hub/{rng.choice(hub_ids)}/?limit=100", None)
+                else:
+                    call = ("GET", f"/api/v1/logs/?hub_id={rng.choice(hub_ids)}&limit=50", None)
+
+                t0 = time.perf_counter()
+                try:
+                    status, detail = transport(*call)
+                except Exception:
+                    status, detail = 0, ""
+                results.append((op, time.perf_counter() - t0, status, detail))
+        finally:
+            transport.close()
+
+    def _run(self, label, make_transport, plan, opts):
+        results = []
+        sampler = _LockSampler() if connection.vendor == "postgresql" and not opts["url"] else None
+        workers = [
+            threading.Thread(target=self._worker, args=(i, make_transport(), plan, opts, results))
+            for i in range(opts["threads"])
+        ]
+        if sampler:
+            sampler.start()
+        started = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - started
+        if sampler:
+            sampler.stop.set()
+            sampler.join()
+
+        per_op = {}
+        for op in OPS:
+            rows = [r for r in results if r[0] == op]
+            if not rows:
+                continue
+            lat = sorted(r[1] for r in rows)
+            per_op[op] = {
+                "requests": len(rows),
+                "errors": sum(1 for r in rows if r[2] not in (200, 400)),
+                "p50_ms": round(quantile(lat, 0.5) * 1000, 2),
+                "p99_ms": round(quantile(lat, 0.99) * 1000, 2),
+            }
+        if "adjust" in per_op:
+            per_op["adjust"]["insufficient_stock"] = sum(
+                1 for r in results if r[0] == "adjust" and r[2] == 400 and r[3] == "Insufficient stock"
+            )
+        all_lat = sorted(r[1] for r in results)
+        return {
+            "strategy": label,
+            "vendor": connection.vendor,
+            "target": opts["url"] or "test-client",
+            "threads": opts["threads"],
+            "requests": len(results),
+            "errors": sum(1 for r in results if r[2] not in (200, 400)),
+            "seconds": round(elapsed, 3),
+            "req_per_sec": round(len(results) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(quantile(all_lat, 0.5) * 1000, 2),
+            "p99_ms": round(quantile(all_lat, 0.99) * 1000, 2),
+            "lock_waits": sampler.report() if sampler else None,
+            "operations": per_op,
+        }
+
+    def handle(self, *args, **opts):
+        if opts["threads"] < 1 or opts["requests"] < 1:
+            raise CommandError("--threads and --requests must be positive")
+        if opts["hubs"] < 1 or opts["skus"] < 1 or opts["hot_keys"] < 1:
+            raise CommandError("--hubs, --skus and --hot-keys must be positive")
+        if not 0 <= opts["hot_ratio"] <= 1:
+            raise CommandError("--hot-ratio must be between 0 and 1")
+        if opts["url"] and opts["strategy"]:
+            raise CommandError("--strategy only applies in-process; the server's setting is used with --url")
+        mix = _parse_mix(opts["mix"])
+
+        user, _ = get_user_model().objects.get_or_create(username=BENCH_USER)
+        self._cleanup()
+        hub_ids, sku_ids = self._seed(opts["hubs"], opts["skus"], opts["stock"])
+        pairs = [(h, s) for h in hub_ids for s in sku_ids]
+        rng = random.Random(opts["seed"])
+        plan = {
+            "mix": mix,
+            "hub_ids": hub_ids,
+            "pairs": pairs,
+            "hot": rng.sample(pairs, min(opts["hot_keys"], len(pairs))),
+        }
+
+        results = []
+        # Failed requests are counted below; keep django.request from dumping a traceback for each.
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            if opts["url"]:
+                token = str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+                results.append(self._run(
+                    "server", lambda: _HTTPTransport(opts["url"], token), plan, opts,
+                ))
+            else:
+                for strategy in opts["strategy"] or sorted(ADJUST_STRATEGIES):
+                    self._reset_stock(hub_ids, opts["stock"])
+                    with override_settings(INVENTORY_ADJUST_STRATEGY=strategy):
+                        results.append(self._run(strategy, lambda: _TestClientTransport(user), plan, opts))
+        finally:
+            request_logger.setLevel(level)
+            self._cleanup()
+            user.delete()
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for r in results:
+            locks = r["lock_waits"]
+            lock_txt = f"  lock waits {locks['pct_samples_waiting']}% (max {locks['max_waiting']})" if locks else ""
+            self.stdout.write(
+                f"{r['strategy']:<12} {r['req_per_sec']:>9} req/s  p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms  "
+                f"errors {r['errors']}/{r['requests']}{lock_txt}  ({r['vendor']}, {r['target']}, {r['threads']} threads)"
+            )
+            for op, o in r["operations"].items():
+                extra = f"  insufficient stock {o['insufficient_stock']}" if "insufficient_stock" in o else ""
+                self.stdout.write(
+                    f"  {op:<8} {o['requests']:>7} req  p50 {o['p50_ms']} ms  p99 {o['p99_ms']} ms  "
+                    f"errors {o['errors']}{extra}"
+                )
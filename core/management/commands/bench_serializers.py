@@ -0,0 +1,117 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Hub, SKU, Inventory, InventoryLog
+from core.renderers import FastJSONRenderer, orjson
+from core.serializers import (
+    InventorySerializer,
+    InventoryLogSerializer,
+    inventory_log_values,
+    inventory_values,
+)
+
+BENCH_HUB = "BENCH-SER-HUB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure serialization rows/sec of inventory_by_hub and inventory_logs payloads: "
+        "ModelSerializer + JSONRenderer versus the values_list fast path + FastJSONRenderer. "
+        "Fixture rows are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="1000,10000,100000",
+            help="Comma-separated row counts (default 1000,10000,100000).",
+        )
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def _seed(self, n):
+        hub = Hub.objects.create(code=BENCH_HUB, name="Benchmark hub")
+        skus = SKU.objects.bulk_create(
+            [SKU(sku_code=f"BENCH-SER-{i:07d}", name=f"Bench SKU {i:07d}") for i in range(n)],
+            batch_size=5000,
+        )
+        Inventory.objects.bulk_create(
+            [Inventory(hub=hub, sku=s, quantity=i % 97) for i, s in enumerate(skus)], batch_size=5000
+        )
+        InventoryLog.objects.bulk_create(
+            [
+                InventoryLog(hub=hub, sku=s, direction=InventoryLog.IN, delta=1, before_qty=0, after_qty=1)
+                for s in skus
+            ],
+            batch_size=5000,
+        )
+        return hub
+
+    def _time(self, fn):
+        t0 = time.perf_counter()
+        out = fn()
+        return out, time.perf_counter() - t0
+
+    def _case(self, name, n, old_qs, old_ser, values, new_qs):
+        # Warm up both paths (query compilation, imports) on a few rows.
+        old_ser(old_qs[:10], many=True).data
+        values.to_dicts(*values.values_list(new_qs[:10]))
+
+        data, old_ser_t = self._time(lambda: old_ser(old_qs, many=True).data)
+        _, old_render_t = self._time(lambda: JSONRenderer().render(data))
+
+        def fast():
+            names, rows = values.values_list(new_qs)
+            return values.to_dicts(names, rows)
+        data, new_ser_t = self._time(fast)
+        _, new_render_t = self._time(lambda: FastJSONRenderer().render(data))
+
+        def rate(secs):
+            return round(n / secs) if secs else 0
+
+        return {
+            "payload": name,
+            "rows": n,
+            "model_serializer_rows_per_sec": rate(old_ser_t),
+            "values_rows_per_sec": rate(new_ser_t),
+            "model_serializer_with_render_rows_per_sec": rate(old_ser_t + old_render_t),
+            "values_with_render_rows_per_sec": rate(new_ser_t + new_render_t),
+            "speedup_with_render": round((old_ser_t + old_render_t) / (new_ser_t + new_render_t), 2),
+        }
+
+    def handle(self, *args, **opts):
+        try:
+            sizes = [int(x) for x in opts["sizes"].split(",") if x.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+        if not sizes or min(sizes) < 1:
+            raise CommandError("--sizes must be positive")
+
+        results = []
+        for n in sizes:
+            with transaction.atomic():
+                hub = self._seed(n)
+                inv = Inventory.objects.filter(hub=hub).order_by("sku__name", "sku_id")
+                logs = InventoryLog.objects.filter(hub=hub).order_by("-created_at", "-id")
+                results.append(self._case(
+                    "inventory_by_hub", n,
+                    inv.select_related("sku"), InventorySerializer, inventory_values, inv,
+                ))
+                results.append(self._case(
+                    "inventory_logs", n,
+                    logs.select_related("hub", "sku", "actor"), InventoryLogSerializer, inventory_log_values, logs,
+                ))
+                transaction.set_rollback(True)
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"renderer: {'orjson' if orjson else 'stdlib json (orjson not installed)'}")
+        for r in results:
+            self.stdout.write(
+                f"{r['payload']:<17} {r['rows']:>7} rows  serialize {r['model_serializer_rows_per_sec']:>8} -> "
+                f"{r['values_rows_per_sec']:>8} rows/s  with render {r['model_serializer_with_render_rows_per_sec']:>8} -> "
+                f"{r['values_with_render_rows_per_sec']:>8} rows/s  ({r['speedup_with_render']}x)"
+            )
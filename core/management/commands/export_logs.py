@@ -0,0 +1,77 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import exports
+from core.models import Hub, SKU
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream InventoryLog rows to a CSV or NDJSON file (same columns as GET logs/export/), "
+        "oldest first, at constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Output file path, or - for stdout.")
+        parser.add_argument("--format", choices=exports.FORMATS, default=None,
+                            help="Output format (default: from the file extension, else csv).")
+        parser.add_argument("--from", dest="start", help="ISO date or datetime, inclusive.")
+        parser.add_argument("--to", dest="end", help="ISO date or datetime, inclusive (a date covers the whole day).")
+        parser.add_argument("--hub", help="Hub code.")
+        parser.add_argument("--sku", help="SKU code.")
+
+    def handle(self, *args, **opts):
+        out_path = opts["output"]
+        fmt = opts["format"]
+        if fmt is None:
+            fmt = "ndjson" if out_path.endswith((".ndjson", ".jsonl")) else "csv"
+
+        params = {}
+        for key, end_of_day in (("start", False), ("end", True)):
+            if opts[key]:
+                try:
+                    params[key] = exports.parse_bound(opts[key], end_of_day=end_of_day)
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+        if opts["hub"]:
+            hub = Hub.objects.filter(code=opts["hub"]).values_list("pk", flat=True).first()
+            if hub is None:
+                raise CommandError(f"Unknown hub code: {opts['hub']}")
+            params["hub_id"] = hub
+        if opts["sku"]:
+            sku = SKU.objects.filter(sku_code=opts["sku"]).values_list("pk", flat=True).first()
+            if sku is None:
+                raise CommandError(f"Unknown SKU code: {opts['sku']}")
+            params["sku_id"] = sku
+
+        names, rows = exports.log_rows(**params)
+        counted = _Counter(rows)
+        started = time.perf_counter()
+        out = sys.stdout.buffer if out_path == "-" else open(out_path, "wb")
+        try:
+            for block in exports.STREAMERS[fmt](names, counted):
+                out.write(block)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        elapsed = time.perf_counter() - started
+        rate = round(counted.n / elapsed) if elapsed else 0
+        self.stderr.write(f"Exported {counted.n} rows in {elapsed:.1f}s ({rate} rows/s)")
+
+
+class _Counter:
+    """Iterator wrapper that counts what passes through it."""
+
+    def __init__(self, it):
+        self.it = iter(it)
+        self.n = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self.it)
+        self.n += 1
+        return row
@@ -1,16 +1,24 @@
 from __future__ import annotations
-import csv, json, sys
+import csv, json, sys, time
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, Dict, Any
+from typing import Iterable, Iterator, Dict, Any, List
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Upper
 
+from core.catalog_cache import bump_table_version
 from core.models import SKU, Hub, Inventory
+from core.stock import touch_inventory
 
 
 REQUIRED_FIELDS = ("sku_code", "name")
 OPTIONAL_FIELDS = ("color", "size", "barcode", "active")
+UPDATE_FIELDS = ["name", "color", "size", "barcode", "active"]
+
+READ_SIZE = 1 << 16
 
 
 def _normalize_bool(val: Any) -> bool | None:
@@ -33,24 +41,107 @@ def _load_csv(path: Path) -> Iterable[Dict[str, Any]]:
             yield row
 
 
-def _load_json(path: Path) -> Iterable[Dict[str, Any]]:
-    with path.open(encoding="utf-8") as f:
-        data = json.load(f)
-    if not isinstance(data, list):
+def _iter_json_array(f) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array without loading the whole document."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(READ_SIZE)
+        buf, pos = buf[pos:] + chunk, 0
+        eof = not chunk
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    fill()
+    skip_ws()
+    if buf[pos:pos + 1] != "[":
         raise CommandError("JSON must be an array of objects")
-    for obj in data:
-        if not obj.get("sku_code") or not obj.get("name"):
-            raise CommandError("Every object needs sku_code and name")
+    pos += 1
+    skip_ws()
+    if buf[pos:pos + 1] == "]":
+        return
+    while True:
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError("Malformed JSON array")
+            fill()
+            continue
         yield obj
+        pos = end
+        skip_ws()
+        sep = buf[pos:pos + 1]
+        pos += 1
+        if sep == "]":
+            return
+        if sep != ",":
+            raise CommandError("Malformed JSON array")
+        skip_ws()
+
+
+def _load_json(path: Path) -> Iterable[Dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        for obj in _iter_json_array(f):
+            if not isinstance(obj, dict) or not obj.get("sku_code") or not obj.get("name"):
+                raise CommandError("Every object needs sku_code and name")
+            yield obj
+
+
+def _load_ndjson(path: Path) -> Iterable[Dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        for i, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise CommandError(f"Invalid JSON at line {i}: {exc}")
+            if not isinstance(obj, dict) or not obj.get("sku_code") or not obj.get("name"):
+                raise CommandError(f"Missing sku_code/name at line {i}")
+            yield obj
+
+
+LOADERS = {"csv": _load_csv, "json": _load_json, "ndjson": _load_ndjson}
+
+
+def _keyed_skus(upper: bool):
+    """SKUs annotated with the key input codes are matched on: the uppercased code unless --no-upper."""
+    # Uppercased input must still find SKUs created in lower case through the API
+    # (served by sku_code_upper_idx).
+    return SKU.objects.annotate(code_key=Upper("sku_code") if upper else F("sku_code"))
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
 
 
 class Command(BaseCommand):
-    help = "Import or update SKUs from a CSV/JSON file. Creates zeroed Inventory rows for each new SKU across all hubs."
+    help = (
+        "Import or update SKUs from a CSV/JSON/NDJSON file. The file is streamed in chunks; "
+        "each chunk is diffed against existing SKUs and written with bulk inserts/updates, "
+        "then committed. Creates zeroed Inventory rows for each new SKU across all hubs."
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument("path", help="Path to CSV or JSON with SKUs.")
+        parser.add_argument("path", help="Path to CSV, JSON or NDJSON with SKUs.")
+        parser.add_argument(
+            "--format", choices=["csv", "json", "ndjson"], help="Override file format (auto by extension)."
+        )
         parser.add_argument(
-            "--format", choices=["csv", "json"], help="Override file format (auto by extension)."
+            "--chunk-size", type=int, default=2000,
+            help="Rows read, diffed and written per round (default 2000)."
         )
         parser.add_argument(
             "--no-upper", action="store_true",
@@ -58,7 +149,7 @@ class Command(BaseCommand):
         )
         parser.add_argument(
             "--deactivate-missing", action="store_true",
-            help="Set active=False on SKUs not present in the input."
+            help="Set active=False on SKUs not present in the input (keeps every seen code in memory)."
         )
         parser.add_argument(
             "--no-inventory", action="store_true",
@@ -69,113 +160,156 @@ class Command(BaseCommand):
             help="Parse and show counts, but do not write to the database."
         )
 
-    @transaction.atomic
-    def handle(self, *args, **opts):
-        path = Path(opts["path"])
-        if not path.exists():
-            raise CommandError(f"File not found: {path}")
+    def _detect_format(self, path: Path) -> str | None:
+        ext = path.suffix.lower()
+        if ext == ".csv":
+            return "csv"
+        if ext in (".ndjson", ".jsonl"):
+            return "ndjson"
+        if ext == ".json":
+            # A JSON file whose first value is an object rather than an array is NDJSON.
+            with path.open(encoding="utf-8") as f:
+                head = f.read(READ_SIZE).lstrip()
+            return "ndjson" if head.startswith("{") else "json"
+        return None
+
+    def _normalize(self, row: Dict[str, Any], upper: bool) -> Dict[str, Any]:
+        code = str(row.get("sku_code", "")).strip()
+        name = str(row.get("name", "")).strip()
+        if upper:
+            code = code.upper()
+        if not code or not name:
+            raise CommandError("sku_code and name are required for every row")
+        return {
+            "sku_code": code,
+            "name": name,
+            "color": (row.get("color") or "").strip(),
+            "size": (row.get("size") or "").strip(),
+            "barcode": (row.get("barcode") or "").strip(),
+            "active": _normalize_bool(row.get("active")),
+        }
+
+    def _apply(self, sku: SKU, data: Dict[str, Any]) -> set:
+        """Copy differing values onto ``sku``; returns the names of the fields that changed."""
+        changed = set()
+        if sku.name != data["name"]:
+            sku.name = data["name"]; changed.add("name")
+        for field in ("color", "size", "barcode"):
+            if data[field] != "" and getattr(sku, field) != data[field]:
+                setattr(sku, field, data[field]); changed.add(field)
+        if data["active"] is not None and sku.active is not bool(data["active"]):
+            sku.active = bool(data["active"]); changed.add("active")
+        return changed
+
+    def _process_chunk(self, rows, opts, hubs, seen_codes):
+        upper = not opts["no_upper"]
+        items = [self._normalize(row, upper) for row in rows]
+        codes = {d["sku_code"] for d in items}
+        if seen_codes is not None:
+            seen_codes.update(codes)
 
-        fmt = opts.get("format")
-        if not fmt:
-            ext = path.suffix.lower()
-            fmt = "csv" if ext in (".csv",) else "json" if ext in (".json",) else None
-        if fmt not in ("csv", "json"):
-            raise CommandError("Unable to detect format. Use --format csv|json")
-
-        loader = _load_csv if fmt == "csv" else _load_json
-        rows = list(loader(path))
-
-        # Build index of existing SKUs by normalized code
-        existing = { (s.sku_code if opts["no_upper"] else s.sku_code.upper()): s for s in SKU.objects.all() }
-
-        seen_codes = set()
-        created = updated = unchanged = 0
-        new_skus_for_inventory = []
-
-        for row in rows:
-            code = str(row.get("sku_code", "")).strip()
-            name = str(row.get("name", "")).strip()
-            if not opts["no_upper"]:
-                code = code.upper()
-
-            if not code or not name:
-                raise CommandError("sku_code and name are required for every row")
-
-            color  = (row.get("color") or "").strip()
-            size   = (row.get("size") or "").strip()
-            barcode = (row.get("barcode") or "").strip()
-            active_in = _normalize_bool(row.get("active"))
-
-            seen_codes.add(code)
-
-            sku = existing.get(code)
-            if not sku:
-                if opts["dry_run"]:
-                    created += 1
-                    continue
-                sku = SKU.objects.create(
+        existing = {s.code_key: s for s in _keyed_skus(upper).filter(code_key__in=codes)}
+        new: Dict[str, SKU] = {}
+        changed: Dict[str, SKU] = {}
+        changed_fields = set()
+        unchanged = 0
+
+        for data in items:
+            code = data["sku_code"]
+            sku = existing.get(code) or new.get(code)
+            if sku is None:
+                active_in = data["active"]
+                new[code] = SKU(
                     sku_code=code,
-                    name=name,
-                    color=color,
-                    size=size,
-                    barcode=barcode,
+                    name=data["name"],
+                    color=data["color"],
+                    size=data["size"],
+                    barcode=data["barcode"],
                     active=True if active_in is None else bool(active_in),
                 )
-                existing[code] = sku
-                created += 1
-                if not opts["no_inventory"]:
-                    new_skus_for_inventory.append(sku)
                 continue
+            fields = self._apply(sku, data)
+            if fields:
+                if code in existing:
+                    changed[code] = sku
+                    changed_fields |= fields
+            elif code in existing and code not in changed:
+                unchanged += 1
 
-            # Update existing if fields differ
-            changed = False
-            if sku.name != name:
-                sku.name = name; changed = True
-            if color != "" and sku.color != color:
-                sku.color = color; changed = True
-            if size != "" and sku.size != size:
-                sku.size = size; changed = True
-            if barcode != "" and sku.barcode != barcode:
-                sku.barcode = barcode; changed = True
-            if active_in is not None and sku.active is not bool(active_in):
-                sku.active = bool(active_in); changed = True
-
+        ensured_inv = 0
+        if not opts["dry_run"]:
+            created = SKU.objects.bulk_create(new.values())
             if changed:
-                if opts["dry_run"]:
-                    updated += 1
-                else:
-                    sku.save()
-                    updated += 1
-            else:
-                unchanged += 1
+                # Only the columns that differ somewhere in the chunk go into the UPDATE.
+                fields = [f for f in UPDATE_FIELDS if f in changed_fields]
+                SKU.objects.bulk_update(changed.values(), fields, batch_size=500)
+                if "name" in fields:
+                    # The name is part of the inventory payload; let delta-syncing clients see it.
+                    touch_inventory(Inventory.objects.filter(sku__in=list(changed.values())))
+            if created and hubs and not opts["no_inventory"]:
+                if any(s.pk is None for s in created):
+                    created = list(SKU.objects.filter(sku_code__in=new.keys()).only("pk"))
+                inv_rows = [Inventory(hub=hub, sku=sku, quantity=0) for sku in created for hub in hubs]
+                Inventory.objects.bulk_create(inv_rows, ignore_conflicts=True)
+                # ignore_conflicts does not report which rows were inserted.
+                ensured_inv = len(inv_rows)
+
+        return len(new), len(changed), unchanged, ensured_inv
+
+    def handle(self, *args, **opts):
+        path = Path(opts["path"])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        fmt = opts.get("format") or self._detect_format(path)
+        if fmt not in LOADERS:
+            raise CommandError("Unable to detect format. Use --format csv|json|ndjson")
+        if opts["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        hubs = [] if opts["no_inventory"] else list(Hub.objects.all())
+        seen_codes = set() if opts["deactivate_missing"] else None
+
+        created = updated = unchanged = ensured_inv = rows = 0
+        started = time.monotonic()
+
+        for chunk in _chunks(LOADERS[fmt](path), opts["chunk_size"]):
+            # One transaction per chunk, never one for the whole file: Inventory
+            # versions are taken before commit, and delta sync only covers write
+            # transactions shorter than INVENTORY_SYNC_LAG. After a failure, the
+            # chunks already committed come out unchanged when the file is re-run.
+            with transaction.atomic():
+                c, u, n, inv = self._process_chunk(chunk, opts, hubs, seen_codes)
+                # Bulk writes skip model signals; invalidate cached SKU lists by hand.
+                if not opts["dry_run"] and (c or u):
+                    bump_table_version("sku")
+            created += c; updated += u; unchanged += n; ensured_inv += inv
+            rows += len(chunk)
+            if opts["verbosity"] > 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{rows} rows, {rows / elapsed if elapsed else 0:.0f} rows/s")
 
         # Deactivate missing SKUs
         deactivated = 0
-        if opts["deactivate_missing"] and seen_codes:
-            qs = SKU.objects.exclude(sku_code__in=seen_codes)
-            if not opts["no_upper"]:
-                qs = SKU.objects.exclude(sku_code__in=[c for c in seen_codes])
+        if seen_codes:
+            qs = _keyed_skus(upper=not opts["no_upper"]).exclude(code_key__in=seen_codes).filter(active=True)
             if opts["dry_run"]:
-                deactivated = qs.filter(active=True).count()
+                deactivated = qs.count()
             else:
-                deactivated = qs.filter(active=True).update(active=False)
+                with transaction.atomic():
+                    deactivated = qs.update(active=False)
+                    if deactivated:
+                        bump_table_version("sku")
+
+        elapsed = time.monotonic() - started
 
-        # Ensure inventory rows for newly created SKUs across all hubs
-        ensured_inv = 0
-        if new_skus_for_inventory and not opts["dry_run"] and not opts["no_inventory"]:
-            hubs = list(Hub.objects.all())
-            for sku in new_skus_for_inventory:
-                for hub in hubs:
-                    _, was = Inventory.objects.get_or_create(hub=hub, sku=sku, defaults={"quantity": 0})
-                    ensured_inv += int(was)
-
-        # Dry-run rollback
         if opts["dry_run"]:
-            self.stdout.write(self.style.WARNING("Dry run: no changes were written."))  # transaction will rollback
+            self.stdout.write(self.style.WARNING("Dry run: no changes were written."))
 
         self.stdout.write(self.style.SUCCESS(
             f"SKUs → created: {created}, updated: {updated}, unchanged: {unchanged}, "
-            f"deactivated: {deactivated}, inventory_rows_created: {ensured_inv}"
+            f"deactivated: {deactivated}, inventory_rows_ensured: {ensured_inv} "
+            f"({rows} rows in {elapsed:.2f}s, {rows / elapsed if elapsed else 0:.0f} rows/s)"
         ))
 
         if opts["dry_run"]:
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete expired Idempotency-Key records in batches. Safe to run from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows deleted per statement (default 5000).")
+
+    def handle(self, *args, **opts):
+        batch = opts["batch_size"]
+        if batch < 1:
+            raise CommandError("--batch-size must be positive")
+
+        now = timezone.now()
+        expired = IdempotencyKey.objects.filter(expires_at__lte=now).order_by("expires_at")
+        deleted = 0
+        while True:
+            pks = list(expired.values_list("pk", flat=True)[:batch])
+            if not pks:
+                break
+            deleted += IdempotencyKey.objects.filter(pk__in=pks).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Expired idempotency keys deleted: {deleted}"))
@@ -0,0 +1,60 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.models import Hub, InventoryLog
+from core.rollups import rebuild_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute InventoryDailyRollup rows from InventoryLog, one day per transaction. "
+        "Use to backfill history or repair a range; live writes keep the rollups current on their own."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", help="First day (YYYY-MM-DD). Default: the oldest log.")
+        parser.add_argument("--to", dest="end", help="Last day (YYYY-MM-DD), inclusive. Default: the newest log.")
+        parser.add_argument("--hub", action="append", help="Hub code; repeat for several. Default: all hubs.")
+
+    def _day(self, raw, name):
+        day = parse_date(raw)
+        if day is None:
+            raise CommandError(f"--{name} must be YYYY-MM-DD")
+        return day
+
+    def handle(self, *args, **opts):
+        hub_ids = None
+        if opts["hub"]:
+            found = dict(Hub.objects.filter(code__in=opts["hub"]).values_list("code", "pk"))
+            missing = sorted(set(opts["hub"]) - set(found))
+            if missing:
+                raise CommandError(f"Unknown hub code(s): {', '.join(missing)}")
+            hub_ids = list(found.values())
+
+        logs = InventoryLog.objects.all()
+        if hub_ids:
+            logs = logs.filter(hub_id__in=hub_ids)
+        span = logs.aggregate(first=Min("created_at"), last=Max("created_at"))
+        if span["first"] is None and not (opts["start"] and opts["end"]):
+            self.stdout.write("No logs to roll up.")
+            return
+        start = self._day(opts["start"], "from") if opts["start"] else timezone.localdate(span["first"])
+        end = self._day(opts["end"], "to") if opts["end"] else timezone.localdate(span["last"])
+        if end < start:
+            raise CommandError("--to is before --from")
+
+        started = time.perf_counter()
+        day, days, total = start, 0, 0
+        while day <= end:
+            total += rebuild_day(day, hub_ids)
+            days += 1
+            day += timedelta(days=1)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {days} day(s) {start}..{end}: {total} rollup rows in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import exports, reconcile
+from core.models import Hub
+
+
+def _init_worker():
+    # Spawned workers start without Django; forked ones must not reuse the
+    # parent's database connections (they were closed before the fork).
+    django.setup()
+
+
+def _check(hub_id, chain):
+    try:
+        return reconcile.check_hub(hub_id, chain=chain)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that every Inventory.quantity equals the net of its InventoryLog deltas and that each "
+        "(hub, sku) log chain is continuous. Hubs are checked in parallel worker processes and every "
+        "discrepancy goes to a CSV/NDJSON report. --fix logs correcting entries for quantity mismatches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", nargs="?", default="-",
+                            help="Report file path, or - for stdout (default).")
+        parser.add_argument("--format", choices=exports.FORMATS, default=None,
+                            help="Report format (default: from the file extension, else csv).")
+        parser.add_argument("--hub", action="append", help="Hub code; repeat for several. Default: all hubs.")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Worker processes (default: CPU count, at most one per hub; 1 runs in-process).")
+        parser.add_argument("--skip-chain", action="store_true",
+                            help="Only compare quantities; skip the per-log continuity scan.")
+        parser.add_argument("--fix", action="store_true",
+                            help="Log a correcting movement for each quantity mismatch (Inventory is kept).")
+
+    def handle(self, *args, **opts):
+        hubs = Hub.objects.order_by("code")
+        if opts["hub"]:
+            hubs = hubs.filter(code__in=opts["hub"])
+        codes = dict(hubs.values_list("pk", "code"))
+        if opts["hub"]:
+            missing = sorted(set(opts["hub"]) - set(codes.values()))
+            if missing:
+                raise CommandError(f"Unknown hub code(s): {', '.join(missing)}")
+        workers = opts["workers"] or min(os.cpu_count() or 1, len(codes) or 1)
+        if workers < 1:
+            raise CommandError("--workers must be positive")
+
+        out_path = opts["output"]
+        fmt = opts["format"]
+        if fmt is None:
+            fmt = "ndjson" if out_path.endswith((".ndjson", ".jsonl")) else "csv"
+
+        chain = not opts["skip_chain"]
+        started = time.perf_counter()
+        if workers == 1:
+            results = (reconcile.check_hub(hub_id, chain=chain) for hub_id in codes)
+            report = self._collect(results, codes, opts["verbosity"])
+        else:
+            # Children must open their own connections.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                results = pool.map(_check, codes, [chain] * len(codes))
+                report = self._collect(results, codes, opts["verbosity"])
+        elapsed = time.perf_counter() - started
+
+        counts = {}
+        for row in report:
+            counts[row[0]] = counts.get(row[0], 0) + 1
+        out = sys.stdout.buffer if out_path == "-" else open(out_path, "wb")
+        try:
+            for block in exports.STREAMERS[fmt](reconcile.COLUMNS, iter(report), reconcile.report_dicts):
+                out.write(block)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+
+        summary = ", ".join(f"{n} {kind}" for kind, n in sorted(counts.items())) or "no discrepancies"
+        self.stderr.write(f"Checked {len(codes)} hub(s) with {workers} worker(s) in {elapsed:.1f}s: {summary}")
+
+        if opts["fix"]:
+            fixed = 0
+            by_hub = {}
+            for kind, hub_id, sku_id, *_ in report:
+                if kind == reconcile.QUANTITY:
+                    by_hub.setdefault(hub_id, []).append(sku_id)
+            for hub_id, sku_ids in by_hub.items():
+                n = reconcile.fix_hub(hub_id, sku_ids)
+                fixed += n
+                self.stderr.write(f"{codes[hub_id]}: {n} correcting log(s)")
+            self.stderr.write(self.style.SUCCESS(f"Wrote {fixed} correcting log(s)"))
+
+    def _collect(self, results, codes, verbosity):
+        report = []
+        for hub_id, found in results:
+            report.extend(found)
+            if verbosity > 1:
+                self.stderr.write(f"{codes[hub_id]}: {len(found)} discrepancies")
+        return report
+
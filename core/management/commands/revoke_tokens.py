@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.authentication import revoke_tokens
+
+
+class Command(BaseCommand):
+    help = "Revoke every JWT issued so far to the given users (bumps their token version)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="+", help="Usernames whose tokens to revoke.")
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        for username in opts["usernames"]:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                self.stderr.write(f"User {username} not found")
+                continue
+            version = revoke_tokens(user.pk)
+            self.stdout.write(self.style.SUCCESS(f"Revoked tokens for {username} (token version {version})"))
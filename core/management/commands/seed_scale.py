@@ -0,0 +1,216 @@
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, time as dtime, timedelta
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.catalog_cache import bump_table_version
+from core.models import Hub, SKU, Inventory, InventoryDailyRollup, InventoryLog
+
+COLORS = ["black", "white", "navy", "carolina", "hot pink", "purple", "red", "green", "gold", "grey"]
+SIZES = ["XS", "S", "M", "L", "XL", "2XL"]
+NOTES = ["", "", "", "", "cycle count", "restock", "retail transfer", "damaged"]
+
+LOG_COLUMNS = ("hub_id", "sku_id", "direction", "delta", "before_qty", "after_qty", "note", "actor_id", "created_at")
+ROLLUP_COLUMNS = ("hub_id", "sku_id", "day", "in_qty", "out_qty", "moves", "closing_qty")
+
+
+class _Writer:
+    """
+    Appends raw rows to a table: COPY on PostgreSQL (psycopg 3), otherwise
+    ``executemany`` of a plain INSERT. Both bypass the ORM, which would
+    overwrite the backdated ``InventoryLog.created_at`` (``auto_now_add``).
+    """
+
+    def __init__(self, model, columns):
+        qn = connection.ops.quote_name
+        self.table = qn(model._meta.db_table)
+        self.columns = columns
+        self.cols_sql = ", ".join(qn(c) for c in columns)
+        with connection.cursor() as cur:
+            self.use_copy = connection.vendor == "postgresql" and hasattr(cur.cursor, "copy")
+
+    def write(self, rows):
+        if not rows:
+            return
+        with connection.cursor() as cur:
+            if self.use_copy:
+                with cur.cursor.copy(f"COPY {self.table} ({self.cols_sql}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
+                marks = ", ".join(["%s"] * len(self.columns))
+                cur.executemany(f"INSERT INTO {self.table} ({self.cols_sql}) VALUES ({marks})", rows)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic dataset for scale testing: hubs, SKUs, Inventory, a backdated "
+        "InventoryLog history with Zipf-skewed SKU popularity and bursty days, and the matching "
+        "daily rollups. Rows are written in batches with COPY (PostgreSQL) or executemany."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hubs", type=int, default=10, help="Hubs to create (default 10).")
+        parser.add_argument("--skus", type=int, default=20000, help="SKUs to create (default 20000).")
+        parser.add_argument("--logs", type=int, default=1_000_000, help="InventoryLog rows (default 1000000).")
+        parser.add_argument("--days", type=int, default=365, help="History span ending today (default 365).")
+        parser.add_argument("--zipf", type=float, default=1.1,
+                            help="Zipf exponent of SKU popularity; 0 is uniform (default 1.1).")
+        parser.add_argument("--batch-size", type=int, default=20000, help="Rows per write (default 20000).")
+        parser.add_argument("--prefix", default="SCALE", help="Code prefix for generated hubs/SKUs (default SCALE).")
+        parser.add_argument("--reset", action="store_true",
+                            help="Delete previously generated rows with this prefix first.")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed (default 42).")
+
+    # -----------------------------
+    # Catalog
+    # -----------------------------
+    def _catalog(self, opts, rng):
+        prefix = opts["prefix"]
+        hubs = Hub.objects.bulk_create(
+            [Hub(code=f"{prefix}-H{i:03d}", name=f"{prefix} hub {i}", city=f"City {i % 7}")
+             for i in range(opts["hubs"])],
+            batch_size=opts["batch_size"],
+        )
+        skus = SKU.objects.bulk_create(
+            [
+                SKU(
+                    sku_code=f"{prefix}-{i:07d}",
+                    name=f"{rng.choice(COLORS).title()} stripe {i:07d}",
+                    color=rng.choice(COLORS),
+                    size=rng.choice(SIZES),
+                    barcode=f"{200000000000 + i:012d}",
+                )
+                for i in range(opts["skus"])
+            ],
+            batch_size=opts["batch_size"],
+        )
+        if any(o.pk is None for o in [*hubs, *skus]):
+            hubs = list(Hub.objects.filter(code__startswith=f"{prefix}-H").order_by("code"))
+            skus = list(SKU.objects.filter(sku_code__startswith=f"{prefix}-").order_by("sku_code"))
+        return [h.pk for h in hubs], [s.pk for s in skus]
+
+    def _day_counts(self, n_logs, days, rng):
+        """Split ``n_logs`` over ``days``: quieter weekends, lognormal noise, occasional spikes."""
+        today = timezone.localdate()
+        dates = [today - timedelta(days=days - 1 - i) for i in range(days)]
+        weights = []
+        for d in dates:
+            w = (0.4 if d.weekday() >= 5 else 1.0) * rng.lognormvariate(0, 0.5)
+            if rng.random() < 0.05:
+                w *= 3
+            weights.append(w)
+        total = sum(weights)
+        counts = [int(n_logs * w / total) for w in weights]
+        counts[-1] += n_logs - sum(counts)
+        return list(zip(dates, counts))
+
+    # -----------------------------
+    # History
+    # -----------------------------
+    def handle(self, *args, **opts):
+        for name in ("hubs", "skus", "days", "batch_size"):
+            if opts[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive")
+        if opts["logs"] < 0:
+            raise CommandError("--logs must not be negative")
+
+        prefix = opts["prefix"]
+        existing = Hub.objects.filter(code__startswith=f"{prefix}-H")
+        if existing.exists():
+            if not opts["reset"]:
+                raise CommandError(f"{prefix}-* data already exists; pass --reset to replace it")
+            started = time.perf_counter()
+            existing.delete()
+            SKU.objects.filter(sku_code__startswith=f"{prefix}-").delete()
+            self.stdout.write(f"Removed previous {prefix}-* data in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(opts["seed"])
+        started = time.perf_counter()
+        with transaction.atomic():
+            hub_ids, sku_ids = self._catalog(opts, rng)
+        self.stdout.write(f"{len(hub_ids)} hubs, {len(sku_ids)} SKUs in {time.perf_counter() - started:.1f}s")
+
+        sku_cum = list(accumulate(1 / (rank + 1) ** opts["zipf"] for rank in range(len(sku_ids))))
+        hub_cum = list(accumulate(rng.uniform(0.5, 2.0) for _ in hub_ids))
+        ranked_skus = rng.sample(sku_ids, len(sku_ids))  # popularity rank -> SKU
+
+        logs = _Writer(InventoryLog, LOG_COLUMNS)
+        rollups = _Writer(InventoryDailyRollup, ROLLUP_COLUMNS)
+        # Backends without time zone support store naive values in the
+        # connection's zone; shift each day's start once instead of
+        # adapting every row.
+        naive = settings.USE_TZ and not connection.features.supports_timezones
+        adapt_day = connection.ops.adapt_datefield_value
+        qty = defaultdict(int)
+        written = 0
+        started = time.perf_counter()
+
+        for day, n in self._day_counts(opts["logs"], opts["days"], rng):
+            if not n:
+                continue
+            day_start = timezone.make_aware(datetime.combine(day, dtime.min))
+            if naive:
+                day_start = timezone.make_naive(day_start, connection.timezone)
+            offsets = sorted(rng.random() * 86400 for _ in range(n))
+            skus = rng.choices(ranked_skus, cum_weights=sku_cum, k=n)
+            hubs = rng.choices(hub_ids, cum_weights=hub_cum, k=n)
+            notes = rng.choices(NOTES, k=n)
+            rolls = [rng.random() for _ in range(n)]
+            totals = {}
+            batch = []
+            with transaction.atomic():
+                for offset, hub_id, sku_id, note, roll in zip(offsets, hubs, skus, notes, rolls):
+                    key = (hub_id, sku_id)
+                    before = qty[key]
+                    # One uniform draw decides the direction and the size:
+                    # OUT 1-5 with p=0.6 when stock allows, else IN 10-60.
+                    delta = 1 + int(roll * 8.3333) % 5
+                    if roll < 0.6 and before >= delta:
+                        direction, after = InventoryLog.OUT, before - delta
+                    else:
+                        delta = 10 + int(roll * 1000) % 51
+                        direction, after = InventoryLog.IN, before + delta
+                    qty[key] = after
+                    batch.append((hub_id, sku_id, direction, delta, before, after, note, None,
+                                  day_start + timedelta(seconds=offset)))
+                    t = totals.get(key)
+                    if t is None:
+                        t = totals[key] = [0, 0, 0, 0]
+                    t[0 if direction == InventoryLog.IN else 1] += delta
+                    t[2] += 1
+                    t[3] = after
+                    if len(batch) >= opts["batch_size"]:
+                        logs.write(batch)
+                        written += len(batch)
+                        batch = []
+                logs.write(batch)
+                written += len(batch)
+                d = adapt_day(day)
+                rollups.write([(h, s, d, *t) for (h, s), t in totals.items()])
+
+            if opts["verbosity"] > 1:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{day}: {written} logs, {written / elapsed if elapsed else 0:.0f} rows/s")
+
+        log_elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        pairs = ((h, s) for h in hub_ids for s in sku_ids)
+        with transaction.atomic():
+            while chunk := list(islice(pairs, opts["batch_size"])):
+                Inventory.objects.bulk_create([Inventory(hub_id=h, sku_id=s, quantity=qty[(h, s)]) for h, s in chunk])
+        inv_rows = len(hub_ids) * len(sku_ids)
+        inv_elapsed = time.perf_counter() - started
+        bump_table_version("hub", "sku")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} logs in {log_elapsed:.1f}s ({written / log_elapsed if log_elapsed else 0:.0f} rows/s, "
+            f"{'COPY' if logs.use_copy else 'executemany'}); "
+            f"{inv_rows} inventory rows in {inv_elapsed:.1f}s"
+        ))
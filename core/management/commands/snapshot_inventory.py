@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Hub, InventorySnapshot
+from core.snapshots import take_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write InventorySnapshot checkpoints (hub, sku, quantity, taken_at) used by "
+        "inventory/by-hub/<id>/as-of/. Run periodically, e.g. nightly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hub", action="append", help="Hub code to snapshot; repeat for several. Default: all hubs.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert (default 5000).")
+        parser.add_argument(
+            "--prune-days", type=int, default=None,
+            help="Also delete checkpoints older than this many days (the newest one per hub is kept).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        hubs = Hub.objects.order_by("code")
+        if opts["hub"]:
+            hubs = hubs.filter(code__in=opts["hub"])
+            found = set(hubs.values_list("code", flat=True))
+            missing = sorted(set(opts["hub"]) - found)
+            if missing:
+                raise CommandError(f"Unknown hub code(s): {', '.join(missing)}")
+
+        for hub in hubs:
+            n = take_snapshot(hub.pk, batch_size=opts["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"{hub.code}: {n} rows"))
+
+            if opts["prune_days"] is not None:
+                cutoff = timezone.now() - timedelta(days=opts["prune_days"])
+                latest = (
+                    InventorySnapshot.objects.filter(hub=hub)
+                    .order_by("-taken_at").values_list("taken_at", flat=True).first()
+                )
+                if latest is None:
+                    # No Inventory rows, so no checkpoint was written; nothing to prune.
+                    continue
+                old = InventorySnapshot.objects.filter(hub=hub, taken_at__lt=min(cutoff, latest))
+                deleted = old.delete()[0]
+                if deleted:
+                    self.stdout.write(f"{hub.code}: pruned {deleted} old rows")
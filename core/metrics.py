@@ -0,0 +1,154 @@
+# core/metrics.py
+"""
+Per-request timings and rolling per-endpoint latency quantiles.
+
+``TimingMiddleware`` (core.middleware) opens a ``RequestTimings`` for each
+request. SQL is counted by ``sql_wrapper``, which ``install`` adds to every
+database connection; it charges the request whose context is current, so
+queries that async views run in ``sync_to_async`` threads count too. Code that
+wants its own bucket wraps itself in ``span(name)``: the values fast path
+and list serializers use "ser", the JSON renderer "render". With
+``REQUEST_TIMING`` off no timings are open, and ``span`` costs one
+contextvar lookup.
+
+Quantiles come from the last ``METRICS_WINDOW`` samples of each endpoint
+and are kept per process. Each worker reports its own numbers, the way
+Prometheus summaries from separate instances normally are.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    __slots__ = ("sql_count", "sql_ms", "spans")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.spans = defaultdict(float)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.sql_ms += (time.perf_counter() - t0) * 1000
+        timings.sql_count += 1
+
+
+def install(connection, **kwargs):
+    """Add ``sql_wrapper`` to ``connection`` once (also a ``connection_created`` receiver)."""
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+def start():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.spans[name] += (time.perf_counter() - t0) * 1000
+
+
+# -----------------------------
+# Rolling per-endpoint samples
+# -----------------------------
+class _Endpoint:
+    __slots__ = ("durations", "queries", "count", "total_seconds", "total_queries")
+
+    def __init__(self, window):
+        self.durations = deque(maxlen=window)
+        self.queries = deque(maxlen=window)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.total_queries = 0
+
+
+_lock = threading.Lock()
+_endpoints = {}
+
+
+def observe(method, endpoint, seconds, queries):
+    key = (method, endpoint)
+    with _lock:
+        ep = _endpoints.get(key)
+        if ep is None:
+            ep = _endpoints[key] = _Endpoint(settings.METRICS_WINDOW)
+        ep.durations.append(seconds)
+        ep.queries.append(queries)
+        ep.count += 1
+        ep.total_seconds += seconds
+        ep.total_queries += queries
+
+
+def reset():
+    with _lock:
+        _endpoints.clear()
+
+
+def quantile(sorted_vals, q):
+    """Nearest-rank ``q`` quantile (0..1) of an ascending sequence; 0.0 when empty."""
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """Prometheus text exposition (format 0.0.4) of the per-endpoint summaries."""
+    with _lock:
+        snapshot = [
+            (method, endpoint, sorted(ep.durations), sorted(ep.queries),
+             ep.count, ep.total_seconds, ep.total_queries)
+            for (method, endpoint), ep in sorted(_endpoints.items())
+        ]
+
+    lines = [
+        "# HELP tribestock_request_duration_seconds Request duration over the last samples, by endpoint.",
+        "# TYPE tribestock_request_duration_seconds summary",
+    ]
+    queries = [
+        "# HELP tribestock_request_queries SQL queries per request over the last samples, by endpoint.",
+        "# TYPE tribestock_request_queries summary",
+    ]
+    for method, endpoint, durations, counts, n, total_s, total_q in snapshot:
+        labels = f'method="{_label(method)}",endpoint="{_label(endpoint)}"'
+        for q in QUANTILES:
+            lines.append(f'tribestock_request_duration_seconds{{{labels},quantile="{q}"}} {quantile(durations, q):.6f}')
+            queries.append(f'tribestock_request_queries{{{labels},quantile="{q}"}} {quantile(counts, q)}')
+        lines.append(f"tribestock_request_duration_seconds_sum{{{labels}}} {total_s:.6f}")
+        lines.append(f"tribestock_request_duration_seconds_count{{{labels}}} {n}")
+        queries.append(f"tribestock_request_queries_sum{{{labels}}} {total_q}")
+        queries.append(f"tribestock_request_queries_count{{{labels}}} {n}")
+    return "\n".join(lines + queries) + "\n"
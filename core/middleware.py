@@ -0,0 +1,152 @@
+# core/middleware.py
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from . import db_router, metrics
+
+logger = logging.getLogger("core.timing")
+
+
+class TimingMiddleware:
+    """
+    Times each request (SQL count and time, serializer and render spans,
+    total). The numbers go out as a ``Server-Timing`` header and one JSON
+    log line on ``core.timing``, and feed the per-endpoint quantiles behind
+    ``GET metrics/``. A request running more than
+    ``REQUEST_TIMING_QUERY_WARN`` queries is logged at WARNING, which makes
+    N+1 patterns easy to spot.
+
+    Listed first in MIDDLEWARE. It is removed at startup unless
+    ``REQUEST_TIMING`` is on. Works in sync and async chains alike.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(metrics.install)
+        for conn in connections.all():
+            metrics.install(conn)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = metrics.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.stop(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timings, token = metrics.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.stop(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    def _finish(self, request, response, timings, total):
+        match = request.resolver_match
+        endpoint = match.route if match else "unmatched"
+        metrics.observe(request.method, endpoint, total, timings.sql_count)
+
+        parts = [f'db;dur={timings.sql_ms:.1f};desc="{timings.sql_count} queries"']
+        parts += [f"{name};dur={ms:.1f}" for name, ms in timings.spans.items()]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        response["Server-Timing"] = ", ".join(parts)
+
+        record = {
+            "method": request.method,
+            "endpoint": endpoint,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "sql_count": timings.sql_count,
+            "sql_ms": round(timings.sql_ms, 2),
+            **{f"{name}_ms": round(ms, 2) for name, ms in timings.spans.items()},
+        }
+        level = logging.WARNING if timings.sql_count > settings.REQUEST_TIMING_QUERY_WARN else logging.INFO
+        logger.log(level, json.dumps(record))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sends the reads of GET/HEAD/OPTIONS requests to a random read replica,
+    unless the client wrote within ``REPLICA_STICKY_SECONDS``, and marks
+    write responses as sticky. See ``core.db_router``. Removed at startup
+    when ``DATABASE_REPLICA_URLS`` is empty. Works in sync and async chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.replicas = db_router.replica_aliases()
+        if not self.replicas:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = db_router.use_replica(db_router.choose_replica(request, self.replicas))
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.reset(token)
+        return db_router.mark_sticky(request, response)
+
+    async def __acall__(self, request):
+        token = db_router.use_replica(db_router.choose_replica(request, self.replicas))
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_router.reset(token)
+        return db_router.mark_sticky(request, response)
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise that can also sit in an async (ASGI) chain. The stock class
+    is sync-only, so Django would run every async view below it through a
+    thread adapter. Static files are looked up the same way; everything
+    else is awaited directly.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_drop_hubinventory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['hub', '-created_at', '-id'], name='invlog_hub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['sku', '-created_at', '-id'], name='invlog_sku_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['hub', 'sku', '-created_at'], name='invlog_hub_sku_created_idx'),
+        ),
+    ]
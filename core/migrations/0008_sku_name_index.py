@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_usertokenversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sku',
+            index=models.Index(fields=['name', 'id'], name='sku_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_sku_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('hub', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.hub')),
+                ('sku', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.sku')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hub', '-taken_at'], name='snapshot_hub_taken_idx')],
+            },
+        ),
+    ]
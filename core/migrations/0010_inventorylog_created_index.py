@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_inventorysnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['created_at', 'id'], name='invlog_created_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_inventorylog_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('in_qty', models.IntegerField(default=0)),
+                ('out_qty', models.IntegerField(default=0)),
+                ('moves', models.IntegerField(default=0)),
+                ('closing_qty', models.IntegerField(default=0)),
+                ('hub', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.hub')),
+                ('sku', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.sku')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hub', 'day'], name='rollup_hub_day_idx'), models.Index(fields=['day'], name='rollup_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('hub', 'sku', 'day'), name='uniq_rollup_hub_sku_day')],
+            },
+        ),
+    ]
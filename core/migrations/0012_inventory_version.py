@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:32
+
+import core.models
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_inventorydailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='inventory',
+            name='version',
+            field=models.BigIntegerField(default=core.models.next_version),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['hub', 'version'], name='inventory_hub_version_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_inventory_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sku',
+            index=models.Index(fields=['barcode'], name='sku_barcode_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_sku_barcode_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorylog',
+            name='transfer_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:02
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_inventorylog_transfer_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sku',
+            index=models.Index(django.db.models.functions.text.Upper('sku_code'), name='sku_code_upper_idx'),
+        ),
+    ]
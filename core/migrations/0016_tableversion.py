@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:04
+
+import uuid
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_stamps(apps, schema_editor):
+    TableVersion = apps.get_model("core", "TableVersion")
+    now = timezone.now()
+    TableVersion.objects.bulk_create(
+        [TableVersion(table=t, stamp=uuid.uuid4().hex, modified_at=now) for t in ("hub", "sku")],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_sku_code_upper_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('table', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('stamp', models.CharField(max_length=32)),
+                ('modified_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(create_stamps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+# ?q= on skus/ and inventory/by-hub/ matches names with istartswith, which
+# PostgreSQL runs as UPPER(name::text) LIKE 'TERM%'. sku_name_id_idx cannot
+# serve that; a text_pattern_ops index on the same expression can. Other
+# backends have no operator classes and keep scanning.
+INDEX = "sku_name_upper_like_idx"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INDEX} ON core_sku ((UPPER("name"::text)) text_pattern_ops)'
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_tableversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
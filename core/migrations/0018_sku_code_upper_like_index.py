@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# ?q= and the admin search match codes with sku_code__istartswith, which
+# PostgreSQL runs as UPPER(sku_code::text) LIKE 'TERM%'. Neither the unique
+# index nor sku_code_upper_idx (default operator class) can serve LIKE; a
+# text_pattern_ops index on the same expression can. As in 0017, other
+# backends keep scanning.
+INDEX = "sku_code_upper_like_idx"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INDEX} ON core_sku ((UPPER("sku_code"::text)) text_pattern_ops)'
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_sku_name_upper_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
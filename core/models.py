@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -21,17 +23,45 @@ class SKU(models.Model):
     barcode = models.CharField(max_length=64, blank=True)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [
+            # inventory_by_hub orders and pages by (sku name, sku id).
+            models.Index(fields=["name", "id"], name="sku_name_id_idx"),
+            # inventory/scan/ resolves barcodes to SKUs.
+            models.Index(fields=["barcode"], name="sku_barcode_idx"),
+            # import_skus matches existing codes case-insensitively.
+            models.Index(Upper("sku_code"), name="sku_code_upper_idx"),
+        ]
     def __str__(self):
         return f"{self.sku_code} – {self.name}"
 
+def next_version(current=0):
+    """
+    Row version for an Inventory write: the current time in microseconds,
+    or ``current + 1`` if that is higher, so a row's version never goes back.
+    """
+    return max(current + 1, int(timezone.now().timestamp() * 1_000_000))
+
 class Inventory(models.Model):
     hub = models.ForeignKey("Hub", on_delete=models.CASCADE, related_name="inventory")
     sku = models.ForeignKey("SKU", on_delete=models.CASCADE, related_name="inventory")
     quantity = models.IntegerField(default=0)
+    # Bumped by every write (see core.stock); clients delta-sync on it.
+    version = models.BigIntegerField(default=next_version)
+    updated_at = models.DateTimeField(default=timezone.now)
     class Meta:
         constraints = [models.UniqueConstraint(fields=["hub", "sku"], name="uniq_hub_sku")]
+        indexes = [models.Index(fields=["hub", "version"], name="inventory_hub_version_idx")]
     def __str__(self):
         return f"{self.hub.code}:{self.sku.sku_code} = {self.quantity}"
+    def touch(self):
+        self.version = next_version(self.version or 0)
+        self.updated_at = timezone.now()
+    def save(self, *args, **kwargs):
+        self.touch()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "version", "updated_at"}
+        super().save(*args, **kwargs)
 
 class InventoryLog(models.Model):
     IN, OUT = "IN", "OUT"
@@ -44,9 +74,77 @@ class InventoryLog(models.Model):
     after_qty = models.IntegerField()
     note = models.CharField(max_length=240, blank=True)
     actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    # Shared by the OUT and IN rows of an inventory/transfer/ call.
+    transfer_id = models.UUIDField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination on (created_at, id), newest first.
+            models.Index(fields=["hub", "-created_at", "-id"], name="invlog_hub_created_idx"),
+            models.Index(fields=["sku", "-created_at", "-id"], name="invlog_sku_created_idx"),
+            models.Index(fields=["hub", "sku", "-created_at"], name="invlog_hub_sku_created_idx"),
+            # Date-range exports across all hubs, oldest first.
+            models.Index(fields=["created_at", "id"], name="invlog_created_idx"),
+        ]
     def __str__(self):
         sign = "+" if self.direction == self.IN else "-"
         return f"{self.created_at:%Y-%m-%d %H:%M} {self.hub.code} {self.sku.sku_code} {sign}{self.delta} -> {self.after_qty}"
+
+class InventorySnapshot(models.Model):
+    """Checkpoint of a hub's Inventory, replayed forward with InventoryLog for as-of queries."""
+    hub = models.ForeignKey(Hub, on_delete=models.CASCADE, related_name="snapshots")
+    sku = models.ForeignKey(SKU, on_delete=models.CASCADE, related_name="+")
+    quantity = models.IntegerField()
+    taken_at = models.DateTimeField(default=timezone.now)
+    class Meta:
+        indexes = [models.Index(fields=["hub", "-taken_at"], name="snapshot_hub_taken_idx")]
+    def __str__(self):
+        return f"{self.taken_at:%Y-%m-%d %H:%M} {self.hub_id}:{self.sku_id} = {self.quantity}"
+
+class InventoryDailyRollup(models.Model):
+    """Per (hub, sku, local day) movement totals, kept current by core.stock.record_logs."""
+    hub = models.ForeignKey(Hub, on_delete=models.CASCADE, related_name="+")
+    sku = models.ForeignKey(SKU, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    in_qty = models.IntegerField(default=0)
+    out_qty = models.IntegerField(default=0)
+    moves = models.IntegerField(default=0)
+    closing_qty = models.IntegerField(default=0)
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["hub", "sku", "day"], name="uniq_rollup_hub_sku_day")]
+        indexes = [
+            models.Index(fields=["hub", "day"], name="rollup_hub_day_idx"),
+            models.Index(fields=["day"], name="rollup_day_idx"),
+        ]
+    def __str__(self):
+        return f"{self.day} {self.hub_id}:{self.sku_id} +{self.in_qty} -{self.out_qty} -> {self.closing_qty}"
+
+class IdempotencyKey(models.Model):
+    """Stored response for a client-supplied ``Idempotency-Key`` header."""
+    key = models.CharField(max_length=255)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "key"], name="uniq_idempotency_user_key")]
+    def __str__(self):
+        return f"{self.user_id}:{self.key} -> {self.response_status}"
+
+class TableVersion(models.Model):
+    """Stamp replaced by every write to a cached table (``hub``, ``sku``); see core.catalog_cache."""
+    table = models.CharField(max_length=40, primary_key=True)
+    stamp = models.CharField(max_length=32)
+    modified_at = models.DateTimeField()
+    def __str__(self):
+        return f"{self.table} {self.stamp}"
+
+class UserTokenVersion(models.Model):
+    """Bumping ``version`` revokes every JWT issued to the user before the bump."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="+")
+    version = models.PositiveIntegerField(default=0)
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
@@ -0,0 +1,123 @@
+# core/pagination.py
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row on a page, packed into an opaque
+url-safe token. The next page is fetched with a ``WHERE (k1, k2) < (...)``
+predicate, so page N costs the same index range scan as page 1.
+
+List endpoints keep returning a plain JSON array; the token for the next
+page travels in the ``X-Next-Cursor`` header and a ``Link: rel="next"``.
+Lists that were historically unbounded (SKUs, inventory by hub) only page
+when the client sends ``limit`` or ``cursor``.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, types):
+    """Unpack ``token`` and coerce each element with the matching callable in ``types``."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [t(v) for t, v in zip(types, values)]
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+
+
+def after_q(fields, values, descending=False) -> Q:
+    """
+    Row-value comparison ``(f1, f2, ...) > (v1, v2, ...)`` (``<`` when
+    ``descending``) spelled out as OR-ed ANDs so every backend can use the
+    composite index on ``fields``.
+    """
+    op = "lt" if descending else "gt"
+    q = Q()
+    for i, field in enumerate(fields):
+        term = Q(**{f"{field}__{op}": values[i]})
+        for prev, val in zip(fields[:i], values[:i]):
+            term &= Q(**{prev: val})
+        q |= term
+    return q
+
+
+def parse_limit(request, default: int, maximum: int) -> int:
+    try:
+        limit = int(request.GET.get("limit", default))
+    except ValueError:
+        limit = default
+    return min(max(limit, 1), maximum)
+
+
+def paginate(qs, request, fields, types, limit, descending=False, key=None):
+    """
+    Slice ``qs`` (already ordered by ``fields``) to one page after
+    ``?cursor=``. Returns ``(rows, next_cursor)``; ``next_cursor`` is None on
+    the last page. ``key`` extracts the sort values from a row and defaults
+    to attribute access on ``fields`` (pass ``key`` when sorting across a
+    relation).
+    """
+    qs = _after_cursor(qs, request, fields, types, descending)
+    return _cut(list(qs[: limit + 1]), fields, limit, key)
+
+
+async def apaginate(qs, request, fields, types, limit, descending=False, key=None):
+    """``paginate`` for async views."""
+    qs = _after_cursor(qs, request, fields, types, descending)
+    return _cut([row async for row in qs[: limit + 1]], fields, limit, key)
+
+
+def _after_cursor(qs, request, fields, types, descending):
+    token = request.GET.get("cursor")
+    if token:
+        qs = qs.filter(after_q(fields, decode_cursor(token, types), descending))
+    return qs
+
+
+def _cut(rows, fields, limit, key):
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    if key is None:
+        values = [getattr(last, f) for f in fields]
+    else:
+        values = key(last)
+    return rows, encode_cursor(values)
+
+
+def is_paged(request) -> bool:
+    """Lists that used to be unbounded only page when the client asks to."""
+    return "limit" in request.GET or "cursor" in request.GET
+
+
+def next_page_headers(request, next_cursor) -> dict:
+    if not next_cursor:
+        return {}
+    params = request.GET.copy()
+    params["cursor"] = next_cursor
+    url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+    return {"X-Next-Cursor": next_cursor, "Link": f'<{url}>; rel="next"'}
+
+
+def set_next_headers(response, request, next_cursor):
+    for name, value in next_page_headers(request, next_cursor).items():
+        response[name] = value
+    return response
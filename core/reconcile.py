@@ -0,0 +1,148 @@
+# core/reconcile.py
+"""
+Inventory vs. ledger reconciliation, one hub at a time.
+
+Two invariants are checked:
+
+* ``Inventory.quantity`` equals the net of the (hub, sku)'s InventoryLog
+  deltas (IN minus OUT). A missing Inventory row counts as quantity 0.
+  This costs one grouped aggregate per hub.
+* The log chain is continuous: ordered by (created_at, id), each row's
+  ``before_qty`` equals the previous row's ``after_qty`` (0 for the first)
+  and ``after_qty`` is ``before_qty`` plus or minus ``delta``. This is one
+  ordered, chunked scan of the hub's logs on the (hub, sku, created_at)
+  index.
+
+``check_hub`` returns plain tuples, so the ``reconcile_inventory``
+command can run hubs in worker processes; ``report_dicts`` formats them
+for the report. ``fix_hub`` makes the quantity checks pass by logging
+corrections, and leaves Inventory as is.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, When
+
+from .models import Inventory, InventoryLog
+from .stock import lock_inventory, record_logs, touch_inventory
+
+COLUMNS = ["kind", "hub_id", "sku_id", "log_id", "expected", "actual"]
+
+QUANTITY = "quantity"  # expected = ledger net, actual = Inventory.quantity
+CHAIN = "chain"  # expected = previous after_qty, actual = before_qty
+ARITHMETIC = "arithmetic"  # expected = before_qty +/- delta, actual = after_qty
+
+FIX_NOTE = "reconcile: ledger correction"
+FIX_BATCH = 500
+
+_SIGNED = Case(
+    When(direction=InventoryLog.IN, then=F("delta")),
+    default=-F("delta"),
+    output_field=IntegerField(),
+)
+
+
+def ledger_net(hub_id, sku_ids=None) -> dict:
+    """``{sku_id: IN - OUT}`` over the hub's logs, in one grouped query."""
+    qs = InventoryLog.objects.filter(hub_id=hub_id)
+    if sku_ids is not None:
+        qs = qs.filter(sku_id__in=sku_ids)
+    return dict(qs.order_by().values("sku_id").annotate(net=Sum(_SIGNED)).values_list("sku_id", "net"))
+
+
+def last_after_qty(hub_id, sku_ids) -> dict:
+    """``{sku_id: after_qty}`` of the newest log of each (hub, sku) in ``sku_ids`` that has logs."""
+    newest = (
+        InventoryLog.objects.filter(hub_id=hub_id, sku_id=OuterRef("sku_id"))
+        .order_by("-created_at", "-id")
+        .values("after_qty")[:1]
+    )
+    rows = (
+        Inventory.objects.filter(hub_id=hub_id, sku_id__in=sku_ids)
+        .annotate(last=Subquery(newest, output_field=IntegerField()))
+        .values_list("sku_id", "last")
+    )
+    return {sku_id: last for sku_id, last in rows if last is not None}
+
+
+def quantity_mismatches(hub_id):
+    net = ledger_net(hub_id)
+    stock = dict(Inventory.objects.filter(hub_id=hub_id).values_list("sku_id", "quantity"))
+    for sku_id in sorted(net.keys() | stock.keys()):
+        expected, actual = net.get(sku_id, 0), stock.get(sku_id, 0)
+        if expected != actual:
+            yield (QUANTITY, hub_id, sku_id, None, expected, actual)
+
+
+def chain_breaks(hub_id):
+    rows = (
+        InventoryLog.objects.filter(hub_id=hub_id)
+        .order_by("sku_id", "created_at", "id")
+        .values_list("sku_id", "id", "direction", "delta", "before_qty", "after_qty")
+        .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    )
+    prev_sku, prev_after = None, 0
+    for sku_id, log_id, direction, delta, before, after in rows:
+        if sku_id != prev_sku:
+            prev_sku, prev_after = sku_id, 0
+        if before != prev_after:
+            yield (CHAIN, hub_id, sku_id, log_id, prev_after, before)
+        expected = before + delta if direction == InventoryLog.IN else before - delta
+        if after != expected:
+            yield (ARITHMETIC, hub_id, sku_id, log_id, expected, after)
+        prev_after = after
+
+
+def report_dicts(names, rows):
+    """``to_dicts`` for ``COLUMNS`` tuples, for the writers in core.exports."""
+    return [dict(zip(names, row)) for row in rows]
+
+
+def check_hub(hub_id, chain=True):
+    """Returns ``(hub_id, discrepancies)``; each discrepancy is a ``COLUMNS`` tuple."""
+    found = list(quantity_mismatches(hub_id))
+    if chain:
+        found.extend(chain_breaks(hub_id))
+    return hub_id, found
+
+
+def fix_hub(hub_id, sku_ids, actor_id=None) -> int:
+    """
+    Log one correcting movement per (hub, sku) whose ledger net differs from
+    Inventory, moving the net onto the current quantity. Rows are locked and
+    rechecked first, so adjustments made since ``check_hub`` are taken into
+    account. The corrected rows get a version bump for the delta sync.
+    Returns the number of corrections written.
+
+    The correction continues the log chain: ``before_qty`` is the newest
+    log's ``after_qty`` (0 without logs) and ``after_qty`` the current
+    quantity. Its delta is what the net is short of, so on a chain that was
+    already broken its arithmetic is reported by the next check too.
+    """
+    fixed = 0
+    sku_ids = sorted(sku_ids)
+    for i in range(0, len(sku_ids), FIX_BATCH):
+        chunk = sku_ids[i:i + FIX_BATCH]
+        with transaction.atomic():
+            invs = lock_inventory((hub_id, s) for s in chunk)
+            net = ledger_net(hub_id, chunk)
+            last = last_after_qty(hub_id, chunk)
+            logs = []
+            for sku_id in chunk:
+                missing = invs[(hub_id, sku_id)].quantity - net.get(sku_id, 0)
+                if not missing:
+                    continue
+                logs.append(InventoryLog(
+                    hub_id=hub_id,
+                    sku_id=sku_id,
+                    direction=InventoryLog.IN if missing > 0 else InventoryLog.OUT,
+                    delta=abs(missing),
+                    before_qty=last.get(sku_id, 0),
+                    after_qty=invs[(hub_id, sku_id)].quantity,
+                    note=FIX_NOTE,
+                    actor_id=actor_id,
+                ))
+            if logs:
+                record_logs(logs)
+                touch_inventory(Inventory.objects.filter(hub_id=hub_id, sku_id__in=[l.sku_id for l in logs]))
+            fixed += len(logs)
+    return fixed
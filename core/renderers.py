@@ -0,0 +1,81 @@
+# core/renderers.py
+import csv
+import io
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import metrics
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+_fallback = JSONEncoder()
+
+
+def _default(obj):
+    # Whatever orjson can't encode natively (Decimal, lazy strings, ...)
+    # goes through DRF's encoder so the output matches JSONRenderer. So do
+    # raw dates and times; their format has changed between DRF releases
+    # (older ones cut microseconds to milliseconds).
+    return _fallback.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` that encodes with orjson (listed in requirements.txt).
+    Indented output (``?indent=`` / ``Accept: ...; indent=``) and installs
+    without orjson use the stock encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with metrics.span("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    ``text/csv`` for the streaming export views. Those return a
+    ``StreamingHttpResponse`` themselves; this only renders what DRF still
+    builds as a ``Response`` (error bodies), as a header row plus one row.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        names = list(dict.fromkeys(k for row in rows for k in row))
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=names, restval="")
+        writer.writeheader()
+        writer.writerows(rows)
+        return buf.getvalue().encode()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """``application/x-ndjson``: one JSON document per line."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        render = FastJSONRenderer().render
+        return b"".join(render(row) + b"\n" for row in rows)
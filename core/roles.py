@@ -1,9 +1,59 @@
+"""
+Role (auth group) checks.
+
+A user's role names are loaded once with a single query and memoized on the
+user object, which lives for one request. Behind that sits a process-wide
+cache entry with a ``ROLE_CACHE_TTL`` expiry that ``core.signals`` drops
+whenever the user's group membership changes. When ``ROLES_IN_TOKEN`` is
+on, the authentication class seeds the memo from the access-token claim and
+no query runs at all.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _cache_key(user_id) -> str:
+    return f"roles:{user_id}"
+
+
+def get_roles(user) -> frozenset:
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_roles", None)
+    if roles is None:
+        key = _cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = frozenset(user.groups.values_list("name", flat=True))
+            cache.set(key, roles, settings.ROLE_CACHE_TTL)
+        user._roles = roles
+    return roles
+
+
+async def aget_roles(user) -> frozenset:
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_roles", None)
+    if roles is None:
+        key = _cache_key(user.pk)
+        roles = await cache.aget(key)
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.values_list("name", flat=True)])
+            await cache.aset(key, roles, settings.ROLE_CACHE_TTL)
+        user._roles = roles
+    return roles
+
+
+def invalidate_roles(*user_ids) -> None:
+    cache.delete_many([_cache_key(pk) for pk in user_ids])
+
+
 def user_has_role(user, role_name: str) -> bool:
     if not user.is_authenticated:
         return False
     if user.is_superuser:
         return True
-    return user.groups.filter(name=role_name).exists()
+    return role_name in get_roles(user)
 
 def is_admin(user): return user_has_role(user, "Admin") or user.is_superuser
 def is_hub_manager(user): return user_has_role(user, "HubManager")
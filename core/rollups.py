@@ -0,0 +1,121 @@
+# core/rollups.py
+"""
+Daily movement rollups.
+
+Every InventoryLog write folds its movement into ``InventoryDailyRollup``
+(hub, sku, local day) in the same transaction, with one
+``INSERT ... ON CONFLICT DO UPDATE`` that adds to the counters. Analytics
+reads then scan one row per (hub, sku, day) instead of every log.
+
+``closing_qty`` is overwritten with the newest ``after_qty``. That is
+correct because writers of a (hub, sku) pair are serialized by the
+Inventory row lock, which they still hold when the rollup is written.
+
+``rebuild_day`` recomputes a day from the logs. ``rebuild_rollups`` uses it
+for backfills and repairs.
+"""
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import InventoryDailyRollup, InventoryLog
+
+
+def supports_upsert() -> bool:
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 24)
+    return False
+
+
+def _totals(logs):
+    """Fold log rows into {(hub_id, sku_id, day): [in, out, moves, closing]}."""
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    for log in sorted(logs, key=lambda l: (l.created_at, l.pk or 0)):
+        t = totals[(log.hub_id, log.sku_id, timezone.localdate(log.created_at))]
+        if log.direction == InventoryLog.IN:
+            t[0] += log.delta
+        else:
+            t[1] += log.delta
+        t[2] += 1
+        t[3] = log.after_qty
+    return totals
+
+
+def record(logs):
+    """Add saved ``logs`` to their rollup rows. Call inside the writing transaction."""
+    totals = _totals(logs)
+    if not totals:
+        return
+    if supports_upsert():
+        table = connection.ops.quote_name(InventoryDailyRollup._meta.db_table)
+        with connection.cursor() as cur:
+            cur.executemany(
+                f"INSERT INTO {table} AS r (hub_id, sku_id, day, in_qty, out_qty, moves, closing_qty) "
+                f"VALUES (%s, %s, %s, %s, %s, %s, %s) "
+                f"ON CONFLICT (hub_id, sku_id, day) DO UPDATE SET "
+                f"in_qty = r.in_qty + EXCLUDED.in_qty, "
+                f"out_qty = r.out_qty + EXCLUDED.out_qty, "
+                f"moves = r.moves + EXCLUDED.moves, "
+                f"closing_qty = EXCLUDED.closing_qty",
+                [(h, s, connection.ops.adapt_datefield_value(d), *t) for (h, s, d), t in totals.items()],
+            )
+        return
+
+    InventoryDailyRollup.objects.bulk_create(
+        [InventoryDailyRollup(hub_id=h, sku_id=s, day=d) for h, s, d in totals],
+        ignore_conflicts=True,
+    )
+    for (h, s, d), (in_qty, out_qty, moves, closing) in totals.items():
+        InventoryDailyRollup.objects.filter(hub_id=h, sku_id=s, day=d).update(
+            in_qty=F("in_qty") + in_qty,
+            out_qty=F("out_qty") + out_qty,
+            moves=F("moves") + moves,
+            closing_qty=closing,
+        )
+
+
+def day_bounds(day):
+    """Aware [start, end) datetimes of a local calendar day."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+@transaction.atomic
+def rebuild_day(day, hub_ids=None) -> int:
+    """Replace the rollup rows of ``day`` (optionally only ``hub_ids``) from the logs. Returns rows written."""
+    start, end = day_bounds(day)
+    logs = InventoryLog.objects.filter(created_at__gte=start, created_at__lt=end)
+    rollups = InventoryDailyRollup.objects.filter(day=day)
+    if hub_ids:
+        logs = logs.filter(hub_id__in=hub_ids)
+        rollups = rollups.filter(hub_id__in=hub_ids)
+    rollups.delete()
+
+    closing = (
+        InventoryLog.objects.filter(
+            hub_id=OuterRef("hub_id"), sku_id=OuterRef("sku_id"),
+            created_at__gte=start, created_at__lt=end,
+        )
+        .order_by("-created_at", "-id")
+        .values("after_qty")[:1]
+    )
+    rows = (
+        logs.order_by()
+        .values("hub_id", "sku_id")
+        .annotate(
+            in_qty=Sum("delta", filter=Q(direction=InventoryLog.IN), default=0),
+            out_qty=Sum("delta", filter=Q(direction=InventoryLog.OUT), default=0),
+            moves=Count("id"),
+            closing_qty=Subquery(closing, output_field=IntegerField()),
+        )
+    )
+    objs = [InventoryDailyRollup(day=day, **row) for row in rows.iterator()]
+    InventoryDailyRollup.objects.bulk_create(objs, batch_size=5000)
+    return len(objs)
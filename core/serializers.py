@@ -1,21 +1,48 @@
 # core/serializers.py
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from . import metrics
+from .authentication import TOKEN_VERSION_CLAIM, stored_token_version
 from .models import Hub, SKU, Inventory, InventoryLog
+from .roles import get_roles
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """Counts ``many=True`` serialization towards the request's "ser" timing."""
+
+    @property
+    def data(self):
+        with metrics.span("ser"):
+            return super().data
+
+
+class SparseFieldsMixin:
+    """Accepts ``fields=[...]`` to serialize only that subset of ``Meta.fields``."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class HubSerializer(serializers.ModelSerializer):
     class Meta:
         model = Hub
         fields = ["id", "code", "name", "city", "country", "active", "created_at"]
+        list_serializer_class = TimedListSerializer
 
 
-class SKUSerializer(serializers.ModelSerializer):
+class SKUSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = SKU
         fields = ["id", "sku_code", "name", "color", "size", "barcode", "active", "created_at"]
+        list_serializer_class = TimedListSerializer
 
 
-class InventorySerializer(serializers.ModelSerializer):
+class InventorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     sku_id = serializers.IntegerField(source="sku.id", read_only=True)
     sku_code = serializers.CharField(source="sku.sku_code", read_only=True)
     name = serializers.CharField(source="sku.name", read_only=True)
@@ -23,6 +50,62 @@ class InventorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Inventory
         fields = ["sku_id", "sku_code", "name", "quantity"]
+        list_serializer_class = TimedListSerializer
+
+
+class ValuesRows:
+    """
+    Read-only fast path for list endpoints: pulls ``values_list`` tuples and
+    maps them straight to dicts shaped like the matching ModelSerializer's
+    ``.data``, without model instances or per-field DRF machinery.
+
+    ``columns`` maps output names to ORM lookups. Names in ``datetimes`` are
+    formatted like ``serializers.DateTimeField``; names in ``omit_if_none``
+    are dropped when NULL, as DRF does for dotted sources across a null FK.
+    """
+
+    _datetime = serializers.DateTimeField()
+
+    def __init__(self, columns, datetimes=(), omit_if_none=()):
+        self.columns = columns
+        self.datetimes = frozenset(datetimes)
+        self.omit_if_none = frozenset(omit_if_none)
+
+    def values_list(self, qs, fields=None, extra=()):
+        """
+        Returns ``(names, qs.values_list(...))``. ``extra`` lookups (e.g.
+        pagination keys) are appended after the output columns.
+        """
+        names = list(fields or self.columns)
+        return names, qs.values_list(*[self.columns[n] for n in names], *extra)
+
+    def to_dicts(self, names, rows):
+        with metrics.span("ser"):
+            return self._to_dicts(names, rows)
+
+    def _to_dicts(self, names, rows):
+        fmt = self._datetime.to_representation
+        dt_names = [n for n in names if n in self.datetimes]
+        omit = [n for n in names if n in self.omit_if_none]
+        out = []
+        for row in rows:
+            d = dict(zip(names, row))
+            for n in dt_names:
+                if d[n] is not None:
+                    d[n] = fmt(d[n])
+            for n in omit:
+                if d[n] is None:
+                    del d[n]
+            out.append(d)
+        return out
+
+
+inventory_values = ValuesRows({
+    "sku_id": "sku_id",
+    "sku_code": "sku__sku_code",
+    "name": "sku__name",
+    "quantity": "quantity",
+})
 
 
 class InventoryAdjustSerializer(serializers.Serializer):
@@ -37,6 +120,32 @@ class InventoryAdjustSerializer(serializers.Serializer):
         return data
 
 
+class InventoryScanSerializer(InventoryAdjustSerializer):
+    sku_id = None
+    barcode = serializers.CharField(max_length=64)
+
+
+class InventoryBatchAdjustSerializer(serializers.Serializer):
+    lines = InventoryAdjustSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class InventoryTransferLineSerializer(serializers.Serializer):
+    sku_id = serializers.IntegerField()
+    from_hub_id = serializers.IntegerField()
+    to_hub_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    note = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, data):
+        if data["from_hub_id"] == data["to_hub_id"]:
+            raise serializers.ValidationError("from_hub_id and to_hub_id must differ")
+        return data
+
+
+class InventoryTransferSerializer(serializers.Serializer):
+    lines = InventoryTransferLineSerializer(many=True, allow_empty=False, max_length=1000)
+
+
 class InventoryLogSerializer(serializers.ModelSerializer):
     hub_code = serializers.CharField(source="hub.code", read_only=True)
     sku_code = serializers.CharField(source="sku.sku_code", read_only=True)
@@ -58,4 +167,61 @@ class InventoryLogSerializer(serializers.ModelSerializer):
             "note",
             "actor",
             "actor_username",
+            "transfer_id",
         ]
+        list_serializer_class = TimedListSerializer
+
+
+inventory_log_values = ValuesRows(
+    {
+        "id": "id",
+        "created_at": "created_at",
+        "hub": "hub_id",
+        "hub_code": "hub__code",
+        "sku": "sku_id",
+        "sku_code": "sku__sku_code",
+        "direction": "direction",
+        "delta": "delta",
+        "before_qty": "before_qty",
+        "after_qty": "after_qty",
+        "note": "note",
+        "actor": "actor_id",
+        "actor_username": "actor__username",
+        "transfer_id": "transfer_id",
+    },
+    datetimes=["created_at"],
+    omit_if_none=["actor_username"],
+)
+
+
+# One InventoryLog row as seen by the change feed (changes/).
+change_values = ValuesRows(
+    {
+        "id": "id",
+        "hub_id": "hub_id",
+        "sku_id": "sku_id",
+        "direction": "direction",
+        "delta": "delta",
+        "quantity": "after_qty",
+        "created_at": "created_at",
+    },
+    datetimes=["created_at"],
+)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Always stamps the token-version claim; with ``ROLES_IN_TOKEN`` or
+    ``JWT_STATELESS_AUTH`` on, also adds the identity claims
+    (username, is_superuser, roles).
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[TOKEN_VERSION_CLAIM] = stored_token_version(user.pk)
+        if settings.ROLES_IN_TOKEN or settings.JWT_STATELESS_AUTH:
+            token["username"] = user.get_username()
+            token["is_superuser"] = user.is_superuser
+            token["roles"] = sorted(get_roles(user))
+        return token
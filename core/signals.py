@@ -0,0 +1,83 @@
+# core/signals.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import barcodes
+from .authentication import forget_token_version, revoke_tokens
+from .catalog_cache import bump_table_version
+from .models import Hub, SKU, Inventory
+from .roles import invalidate_roles
+from .stock import touch_inventory
+
+User = get_user_model()
+
+
+def _group_member_ids(group_ids):
+    return list(User.objects.filter(groups__in=group_ids).values_list("pk", flat=True).distinct())
+
+
+def _invalidate_roles_on_commit(user_ids):
+    # Dropped inside the transaction, the entry could be re-cached from the
+    # old membership by a concurrent request before the change commits.
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_roles(*user_ids))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear", "post_clear"):
+        return
+    if not reverse:
+        # user.groups.add/remove/clear(...)
+        _invalidate_roles_on_commit([instance.pk])
+    elif action == "pre_clear":
+        # group.user_set.clear(): members are gone by post_clear
+        _invalidate_roles_on_commit(_group_member_ids([instance.pk]))
+    elif pk_set:
+        # group.user_set.add/remove(...)
+        _invalidate_roles_on_commit(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # A rename or delete changes the role names of every member.
+    _invalidate_roles_on_commit(_group_member_ids([instance.pk]))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # Stateless tokens never see is_active; deactivating a user revokes them.
+    if not created and not instance.is_active:
+        revoke_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    # The next token check finds no user and rejects the token.
+    forget_token_version(instance.pk)
+
+
+@receiver(post_save, sender=Hub)
+@receiver(post_delete, sender=Hub)
+def hub_changed(sender, **kwargs):
+    bump_table_version("hub")
+
+
+@receiver(post_save, sender=SKU)
+@receiver(post_delete, sender=SKU)
+def sku_changed(sender, **kwargs):
+    bump_table_version("sku")
+    # Other processes notice the new stamp within BARCODE_STAMP_TTL.
+    transaction.on_commit(barcodes.clear)
+
+
+@receiver(post_save, sender=SKU)
+def sku_saved(sender, instance, created, **kwargs):
+    # sku_code and name are part of the by-hub payload, so an edit counts as a change for delta sync.
+    if not created:
+        touch_inventory(Inventory.objects.filter(sku=instance))
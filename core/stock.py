@@ -0,0 +1,308 @@
+# core/stock.py
+"""
+Set-based inventory writes.
+
+Single adjustments use one conditional ``UPDATE ... RETURNING``: the row
+lock is taken by the write itself, so no SELECT/check/save round trips run
+while other writers of the same (hub, sku) are waiting.
+
+Multi-line operations lock every touched Inventory row in a single
+``SELECT ... FOR UPDATE`` ordered by (hub_id, sku_id). Every writer takes
+its locks in that same order, so two batches touching overlapping rows
+queue up behind each other instead of deadlocking.
+
+Every write path also moves ``Inventory.version`` and ``updated_at``
+forward (``next_version``), which the by-hub delta sync relies on.
+"""
+import sqlite3
+import uuid
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from . import rollups
+from .models import Hub, SKU, Inventory, InventoryLog, next_version
+
+
+class InsufficientStock(Exception):
+    def __init__(self, available):
+        super().__init__("Insufficient stock")
+        self.available = available
+
+
+class BatchRejected(Exception):
+    """Raised when one or more lines of a batch cannot be applied."""
+
+    def __init__(self, errors):
+        super().__init__("Batch rejected")
+        self.errors = errors
+
+
+def _pairs_q(keys):
+    return reduce(or_, (Q(hub_id=h, sku_id=s) for h, s in keys))
+
+
+def lock_inventory(keys):
+    """
+    Ensure an Inventory row exists for every (hub_id, sku_id) in ``keys`` and
+    lock them all with one query, in (hub_id, sku_id) order.
+
+    Returns a dict keyed by (hub_id, sku_id).
+    """
+    keys = sorted(set(keys))
+    Inventory.objects.bulk_create(
+        [Inventory(hub_id=h, sku_id=s, quantity=0) for h, s in keys],
+        ignore_conflicts=True,
+    )
+    rows = (
+        Inventory.objects.select_for_update()
+        .filter(_pairs_q(keys))
+        .order_by("hub_id", "sku_id")
+    )
+    return {(inv.hub_id, inv.sku_id): inv for inv in rows}
+
+
+def missing_refs(lines, hub_fields=("hub_id",)):
+    """Per-line errors for lines that point at a hub or SKU that does not exist."""
+    wanted = {line[f] for line in lines for f in hub_fields}
+    hub_ids = set(Hub.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+    sku_ids = set(SKU.objects.filter(pk__in={l["sku_id"] for l in lines}).values_list("pk", flat=True))
+    errors = []
+    for i, line in enumerate(lines):
+        if any(line[f] not in hub_ids for f in hub_fields):
+            errors.append({"line": i, "detail": "Hub not found"})
+        elif line["sku_id"] not in sku_ids:
+            errors.append({"line": i, "detail": "SKU not found"})
+    return errors
+
+
+def apply_adjustments(lines, actor_id=None):
+    """
+    Apply validated ``InventoryAdjustSerializer`` lines all-or-nothing.
+
+    Must run inside ``transaction.atomic``. Raises ``BatchRejected`` with
+    per-line errors (the caller is expected to roll back); otherwise returns
+    one result dict per line, in input order.
+    """
+    errors = missing_refs(lines)
+    if errors:
+        raise BatchRejected(errors)
+
+    invs = lock_inventory((l["hub_id"], l["sku_id"]) for l in lines)
+
+    logs, results = [], []
+    for i, line in enumerate(lines):
+        inv = invs[(line["hub_id"], line["sku_id"])]
+        qty = line["quantity"]
+        before = inv.quantity
+        if line["action"] == "IN":
+            inv.quantity = before + qty
+            direction = InventoryLog.IN
+        else:
+            if before - qty < 0:
+                errors.append({"line": i, "detail": "Insufficient stock", "available": before})
+                continue
+            inv.quantity = before - qty
+            direction = InventoryLog.OUT
+        inv.touch()
+        logs.append(InventoryLog(
+            hub_id=inv.hub_id,
+            sku_id=inv.sku_id,
+            direction=direction,
+            delta=qty,
+            before_qty=before,
+            after_qty=inv.quantity,
+            note=line.get("note", ""),
+            actor_id=actor_id,
+        ))
+        results.append({"line": i, "hub_id": inv.hub_id, "sku_id": inv.sku_id, "quantity": inv.quantity})
+
+    if errors:
+        raise BatchRejected(errors)
+
+    Inventory.objects.bulk_update(invs.values(), ["quantity", "version", "updated_at"])
+    record_logs(logs)
+    return results
+
+
+def apply_transfers(lines, actor_id=None):
+    """
+    Move validated ``InventoryTransferLineSerializer`` lines from one hub to
+    another, all-or-nothing, under one new transfer id.
+
+    Source and destination rows are locked together by ``lock_inventory``,
+    which keeps the (hub_id, sku_id) order, and written back with one
+    ``bulk_update``. Each line logs an OUT and an IN row that share the
+    transfer id, and all of them are inserted at once. Must run inside
+    ``transaction.atomic``. Raises ``BatchRejected`` like
+    ``apply_adjustments``; otherwise returns ``(transfer_id, results)``.
+    """
+    errors = missing_refs(lines, hub_fields=("from_hub_id", "to_hub_id"))
+    if errors:
+        raise BatchRejected(errors)
+
+    invs = lock_inventory(
+        key for l in lines for key in ((l["from_hub_id"], l["sku_id"]), (l["to_hub_id"], l["sku_id"]))
+    )
+
+    transfer_id = uuid.uuid4()
+    logs, results = [], []
+    for i, line in enumerate(lines):
+        src = invs[(line["from_hub_id"], line["sku_id"])]
+        dst = invs[(line["to_hub_id"], line["sku_id"])]
+        qty = line["quantity"]
+        if src.quantity < qty:
+            errors.append({"line": i, "detail": "Insufficient stock", "available": src.quantity})
+            continue
+        note = line.get("note", "")
+        for inv, direction, after in ((src, InventoryLog.OUT, src.quantity - qty),
+                                      (dst, InventoryLog.IN, dst.quantity + qty)):
+            logs.append(InventoryLog(
+                hub_id=inv.hub_id,
+                sku_id=inv.sku_id,
+                direction=direction,
+                delta=qty,
+                before_qty=inv.quantity,
+                after_qty=after,
+                note=note,
+                actor_id=actor_id,
+                transfer_id=transfer_id,
+            ))
+            inv.quantity = after
+            inv.touch()
+        results.append({
+            "line": i,
+            "sku_id": line["sku_id"],
+            "from_hub_id": src.hub_id,
+            "from_quantity": src.quantity,
+            "to_hub_id": dst.hub_id,
+            "to_quantity": dst.quantity,
+        })
+
+    if errors:
+        raise BatchRejected(errors)
+
+    Inventory.objects.bulk_update(invs.values(), ["quantity", "version", "updated_at"])
+    record_logs(logs)
+    return transfer_id, results
+
+
+def record_logs(logs):
+    """
+    Insert unsaved InventoryLog rows and fold them into the daily rollups.
+    Every stock write logs through here, in its own transaction, while it
+    still holds the Inventory row locks.
+    """
+    InventoryLog.objects.bulk_create(logs)
+    rollups.record(logs)
+    return logs
+
+
+def version_bump(version=None, now=None) -> dict:
+    """``QuerySet.update()`` kwargs that move ``version``/``updated_at`` forward."""
+    return {
+        "version": Greatest(F("version") + 1, Value(version or next_version())),
+        "updated_at": now or timezone.now(),
+    }
+
+
+def touch_inventory(qs) -> int:
+    """Bump the version of every row in ``qs`` (e.g. after its SKU was renamed)."""
+    return qs.update(**version_bump())
+
+
+# -----------------------------
+# Single-line adjustments
+# -----------------------------
+def _signed(action, qty):
+    return qty if action == "IN" else -qty
+
+
+def supports_update_returning() -> bool:
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _conditional_update(hub_id, sku_id, delta):
+    """
+    ``quantity = quantity + delta`` guarded by ``quantity + delta >= 0``.
+    Returns the new quantity, or None when no row matched (missing row or
+    not enough stock).
+    """
+    version, now = next_version(), timezone.now()
+    if supports_update_returning():
+        table = connection.ops.quote_name(Inventory._meta.db_table)
+        with connection.cursor() as cur:
+            cur.execute(
+                f"UPDATE {table} SET quantity = quantity + %s, "
+                f"version = CASE WHEN version >= %s THEN version + 1 ELSE %s END, updated_at = %s "
+                f"WHERE hub_id = %s AND sku_id = %s AND quantity + %s >= 0 "
+                f"RETURNING quantity",
+                [delta, version, version, connection.ops.adapt_datetimefield_value(now),
+                 hub_id, sku_id, delta],
+            )
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    qs = Inventory.objects.filter(hub_id=hub_id, sku_id=sku_id)
+    if delta < 0:
+        qs = qs.filter(quantity__gte=-delta)
+    if not qs.update(quantity=F("quantity") + delta, **version_bump(version, now)):
+        return None
+    # The UPDATE above still holds the row lock, so this read is our own write.
+    return Inventory.objects.filter(hub_id=hub_id, sku_id=sku_id).values_list("quantity", flat=True).get()
+
+
+def adjust_conditional(hub_id, sku_id, action, qty):
+    """
+    Apply one adjustment with a single conditional UPDATE. Hub/SKU existence
+    is only checked when the UPDATE misses, so the hot path is one statement.
+    Returns ``(before, after)``.
+    """
+    delta = _signed(action, qty)
+    after = _conditional_update(hub_id, sku_id, delta)
+    if after is None:
+        get_object_or_404(SKU, pk=sku_id)
+        get_object_or_404(Hub, pk=hub_id)
+        if delta < 0:
+            available = (
+                Inventory.objects.filter(hub_id=hub_id, sku_id=sku_id)
+                .values_list("quantity", flat=True).first() or 0
+            )
+            raise InsufficientStock(available)
+        Inventory.objects.bulk_create(
+            [Inventory(hub_id=hub_id, sku_id=sku_id, quantity=0)], ignore_conflicts=True
+        )
+        after = _conditional_update(hub_id, sku_id, delta)
+    return after - delta, after
+
+
+def adjust_locking(hub_id, sku_id, action, qty):
+    """Lock-read-write variant: SELECT ... FOR UPDATE, check in Python, save."""
+    sku = get_object_or_404(SKU, pk=sku_id)
+    get_object_or_404(Hub, pk=hub_id)  # ensure hub exists
+
+    inv, _ = Inventory.objects.select_for_update().get_or_create(
+        hub_id=hub_id, sku=sku, defaults={"quantity": 0}
+    )
+    before = inv.quantity
+    after = before + _signed(action, qty)
+    if after < 0:
+        raise InsufficientStock(before)
+    inv.quantity = after
+    inv.save(update_fields=["quantity"])
+    return before, after
+
+
+ADJUST_STRATEGIES = {
+    "conditional": adjust_conditional,
+    "locking": adjust_locking,
+}
@@ -1,3 +1,1235 @@
-from django.test import TestCase
+"""
+Behaviour tests per feature, and per-endpoint query budgets.
 
-# Create your tests here.
+The budget tests seed a realistically sized catalog and assert a ceiling on
+the number of SQL queries (and, generously, wall time) for every route in
+api/urls_v1.py. A dropped select_related / values() fast path or a new
+per-row query shows up as a budget failure instead of a slow page in
+production.
+
+Run with ``python manage.py test core`` (SQLite when DATABASE_URL is unset).
+"""
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time as dtime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.core.paginator import EmptyPage
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import async_views, barcodes, db_router, idempotency, metrics, reconcile, snapshots, views
+from .catalog_cache import bump_table_version
+from .admin import EstimatedCountPaginator, InventoryAdmin
+from .authentication import JWTAuthentication, current_token_version, revoke_tokens
+from .middleware import ReplicaRoutingMiddleware
+from .models import Hub, SKU, Inventory, InventoryDailyRollup, InventoryLog, InventorySnapshot, next_version
+from .roles import get_roles
+from .rollups import rebuild_day
+from .renderers import FastJSONRenderer
+from .serializers import ClaimsTokenObtainPairSerializer, InventoryLogSerializer, inventory_log_values
+
+N_HUBS = 4
+N_SKUS = 300
+N_LOGS = 3000
+
+# Seconds per request; generous so only real regressions trip it on slow CI.
+TIME_CEILING = float(os.getenv("QUERY_BUDGET_TIME_CEILING", "2.0"))
+
+
+class ApiTestCase(TestCase):
+    def setUp(self):
+        # Role, token-version, list-payload and barcode caches start cold for every test.
+        cache.clear()
+        barcodes.clear()
+        # Replica routing stays off even with DATABASE_REPLICA_URLS set.
+        patcher = mock.patch.object(db_router, "replica_aliases", return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def client_for(self, user, **headers):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token_for(user)}", **headers)
+        return client
+
+    def token_for(self, user):
+        token = str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+        # Budgets measure the steady state, with the token version cached.
+        current_token_version(user.pk)
+        return token
+
+
+class SmallCatalogTestCase(ApiTestCase):
+    """Two hubs and three SKUs, 10 units of everything."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("clerk", password="x")
+        cls.hubs = Hub.objects.bulk_create([Hub(code="A", name="Hub A"), Hub(code="B", name="Hub B")])
+        cls.skus = SKU.objects.bulk_create([SKU(sku_code=f"T-{i}", name=f"Tee {i}") for i in range(3)])
+        Inventory.objects.bulk_create([Inventory(hub=h, sku=s, quantity=10) for h in cls.hubs for s in cls.skus])
+        cls.hub, cls.sku = cls.hubs[0], cls.skus[0]
+
+    def quantity(self, hub, sku):
+        return Inventory.objects.get(hub=hub, sku=sku).quantity
+
+
+# -----------------------------
+# Behaviour
+# -----------------------------
+class BatchAdjustTests(SmallCatalogTestCase):
+    url = "/api/v1/inventory/adjust/batch/"
+
+    def line(self, sku, action, quantity, hub=None):
+        return {"hub_id": (hub or self.hub).pk, "sku_id": sku.pk, "action": action, "quantity": quantity}
+
+    def test_one_bad_line_rejects_the_batch(self):
+        lines = [
+            self.line(self.skus[0], "OUT", 4),
+            self.line(self.skus[1], "OUT", 11),
+            {"hub_id": self.hub.pk, "sku_id": 999999, "action": "IN", "quantity": 1},
+        ]
+        resp = self.client_for(self.user).post(self.url, {"lines": lines}, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["errors"], [{"line": 2, "detail": "SKU not found"}])
+
+        resp = self.client_for(self.user).post(self.url, {"lines": lines[:2]}, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["errors"], [{"line": 1, "detail": "Insufficient stock", "available": 10}])
+        self.assertEqual(self.quantity(self.hub, self.skus[0]), 10)
+        self.assertFalse(InventoryLog.objects.exists())
+
+    def test_repeated_pairs_accumulate(self):
+        lines = [
+            self.line(self.sku, "IN", 5),
+            self.line(self.sku, "OUT", 12),
+            self.line(self.sku, "OUT", 3),
+            self.line(self.sku, "IN", 1, hub=self.hubs[1]),
+        ]
+        resp = self.client_for(self.user).post(self.url, {"lines": lines}, format="json")
+        self.assertEqual(resp.status_code, 200, resp.json())
+        self.assertEqual([line["quantity"] for line in resp.json()["lines"]], [15, 3, 0, 11])
+        self.assertEqual(self.quantity(self.hub, self.sku), 0)
+        chain = InventoryLog.objects.filter(hub=self.hub, sku=self.sku).order_by("id")
+        self.assertEqual(
+            list(chain.values_list("before_qty", "after_qty")), [(10, 15), (15, 3), (3, 0)],
+        )
+
+        resp = self.client_for(self.user).post(
+            self.url, {"lines": [self.line(self.sku, "IN", 2), self.line(self.sku, "OUT", 3)]}, format="json",
+        )
+        self.assertEqual(resp.json()["errors"], [{"line": 1, "detail": "Insufficient stock", "available": 2}])
+
+
+class IdempotencyTests(SmallCatalogTestCase):
+    url = "/api/v1/inventory/adjust/"
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.user, HTTP_IDEMPOTENCY_KEY="key-1")
+        self.body = {"hub_id": self.hub.pk, "sku_id": self.sku.pk, "action": "IN", "quantity": 2}
+
+    def test_replay(self):
+        first = self.client.post(self.url, self.body, format="json")
+        again = self.client.post(self.url, self.body, format="json")
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+        self.assertEqual(self.quantity(self.hub, self.sku), 12)
+
+    def test_key_reused_for_another_body(self):
+        self.client.post(self.url, self.body, format="json")
+        resp = self.client.post(self.url, {**self.body, "quantity": 3}, format="json")
+        self.assertEqual(resp.status_code, 422)
+        self.assertEqual(self.quantity(self.hub, self.sku), 12)
+
+    def test_losing_a_race_replays_the_winner(self):
+        winner = self.client.post(self.url, self.body, format="json")
+        # The loser looked the key up before the winner committed, ran the
+        # view, then hit the unique constraint storing its response.
+        real = idempotency._stored
+        with mock.patch.object(idempotency, "_stored", side_effect=[None, real(self.user.pk, "key-1")]):
+            loser = self.client.post(self.url, self.body, format="json")
+        self.assertEqual(loser.status_code, 200)
+        self.assertEqual(loser.json(), winner.json())
+        self.assertEqual(loser["Idempotent-Replayed"], "true")
+        self.assertEqual(self.quantity(self.hub, self.sku), 12)
+        self.assertEqual(InventoryLog.objects.count(), 1)
+
+    def test_race_winner_not_visible(self):
+        self.client.post(self.url, self.body, format="json")
+        with mock.patch.object(idempotency, "_stored", return_value=None):
+            resp = self.client.post(self.url, self.body, format="json")
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(self.quantity(self.hub, self.sku), 12)
+
+
+@override_settings(JWT_STATELESS_AUTH=True)
+class TokenAuthTests(SmallCatalogTestCase):
+    def test_stateless_token_skips_the_user_row(self):
+        client = self.client_for(self.user)
+        with self.assertNumQueries(0):
+            resp = client.get("/api/v1/me/")
+        self.assertEqual(resp.json(), {"user": "clerk", "roles": []})
+
+    def test_revoked_tokens_are_rejected(self):
+        old = self.client_for(self.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            revoke_tokens(self.user.pk)
+        # The cached version is only dropped once the revocation commits.
+        self.assertEqual(old.get("/api/v1/me/").status_code, 200)
+        for callback in callbacks:
+            callback()
+        resp = old.get("/api/v1/me/")
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(resp.json()["code"], "token_revoked")
+        self.assertEqual(self.client_for(self.user).get("/api/v1/me/").status_code, 200)
+
+    def test_new_tokens_ignore_a_stale_cached_version(self):
+        self.client_for(self.user)
+        # Revoked by another process: this one still caches version 0.
+        with mock.patch("core.authentication.transaction.on_commit"):
+            revoke_tokens(self.user.pk)
+        self.assertEqual(current_token_version(self.user.pk), 0)
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user)
+        self.assertEqual(token["tv"], 1)
+
+    def test_deactivated_and_deleted_users_are_revoked(self):
+        other = User.objects.create_user("gone", password="x")
+        client, request = self.client_for(other), AsyncRequestFactory().get(
+            "/api/v1/me/", headers={"authorization": f"Bearer {self.token_for(other)}"},
+        )
+        self.assertEqual(client.get("/api/v1/me/").status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(client.get("/api/v1/me/").status_code, 401)
+        with self.assertRaises(AuthenticationFailed):
+            async_to_sync(JWTAuthentication().aauthenticate)(request)
+
+        client = self.client_for(self.user)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(client.get("/api/v1/me/").status_code, 401)
+
+
+class RoleCacheTests(SmallCatalogTestCase):
+    def roles(self, user=None):
+        # A fresh user object, so only the process-wide cache can answer.
+        return get_roles(User.objects.get(pk=(user or self.user).pk))
+
+    def test_membership_changes_drop_cached_roles(self):
+        group = Group.objects.create(name="Retail")
+        self.assertEqual(self.roles(), frozenset())
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.groups.add(group)
+        # Not before commit, or a concurrent read could re-cache the old roles.
+        self.assertEqual(self.roles(), frozenset())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.roles(), {"Retail"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(group)
+        self.assertEqual(self.roles(), frozenset())
+
+        other = User.objects.create_user("other", password="x")
+        with self.captureOnCommitCallbacks(execute=True):
+            group.user_set.add(self.user, other)
+        self.assertEqual(self.roles(), {"Retail"})
+        self.assertEqual(self.roles(other), {"Retail"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            group.user_set.clear()
+        self.assertEqual(self.roles(), frozenset())
+        self.assertEqual(self.roles(other), frozenset())
+
+    def test_group_rename_and_delete_drop_cached_roles(self):
+        group = Group.objects.create(name="Retail")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(group)
+        self.assertEqual(self.roles(), {"Retail"})
+
+        group.name = "Supplier"
+        with self.captureOnCommitCallbacks(execute=True):
+            group.save()
+        self.assertEqual(self.roles(), {"Supplier"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            group.delete()
+        self.assertEqual(self.roles(), frozenset())
+
+
+class CatalogCacheTests(SmallCatalogTestCase):
+    def test_not_modified_until_a_write(self):
+        client = self.client_for(self.user)
+        etag = client.get("/api/v1/hubs/")["ETag"]
+        resp = client.get("/api/v1/hubs/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp["ETag"], etag)
+        # Stamps are in the database, not the per-process cache.
+        cache.clear()
+        self.assertEqual(client.get("/api/v1/hubs/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Hub.objects.create(code="C", name="Hub C")
+        resp = client.get("/api/v1/hubs/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertEqual(len(resp.json()), 3)
+
+    def test_bulk_writes_bump_by_hand(self):
+        client = self.client_for(self.user)
+        first = client.get("/api/v1/skus/")
+        self.assertEqual(client.get("/api/v1/skus/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+
+        SKU.objects.bulk_create([SKU(sku_code="BULK-1", name="Bulk")])
+        self.assertEqual(len(client.get("/api/v1/skus/").json()), 3)
+        bump_table_version("sku")
+        resp = client.get("/api/v1/skus/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()), 4)
+
+
+class SnapshotTests(SmallCatalogTestCase):
+    def log(self, sku, before, after, when):
+        log = InventoryLog.objects.create(
+            hub=self.hub, sku=sku, direction=InventoryLog.IN if after > before else InventoryLog.OUT,
+            delta=abs(after - before), before_qty=before, after_qty=after,
+        )
+        InventoryLog.objects.filter(pk=log.pk).update(created_at=when)
+
+    def test_as_of_replays_logs_after_the_checkpoint(self):
+        now = timezone.now()
+        self.log(self.skus[0], 10, 15, now - timedelta(days=3))
+        InventorySnapshot.objects.bulk_create([
+            InventorySnapshot(hub=self.hub, sku=s, quantity=15 if s == self.skus[0] else 10, taken_at=now - timedelta(days=2))
+            for s in self.skus
+        ])
+        self.log(self.skus[0], 15, 12, now - timedelta(days=1))
+        self.log(self.skus[1], 10, 11, now - timedelta(hours=1))
+
+        items, checkpoint, replayed = snapshots.inventory_as_of(self.hub.pk, now)
+        self.assertEqual(checkpoint, now - timedelta(days=2))
+        self.assertEqual(replayed, 2)
+        self.assertEqual([i["quantity"] for i in items], [12, 11, 10])
+
+        items, checkpoint, _ = snapshots.inventory_as_of(self.hub.pk, now - timedelta(days=2, hours=12))
+        self.assertIsNone(checkpoint)
+        self.assertEqual([(i["sku_code"], i["quantity"]) for i in items], [("T-0", 15)])
+
+        resp = self.client_for(self.user).get(
+            f"/api/v1/inventory/by-hub/{self.hub.pk}/as-of/", {"at": (now - timedelta(hours=2)).isoformat()},
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([i["quantity"] for i in resp.json()["items"]], [12, 10, 10])
+
+    def test_snapshot_and_prune(self):
+        empty = Hub.objects.create(code="E", name="Empty")
+        InventorySnapshot.objects.create(
+            hub=self.hub, sku=self.sku, quantity=1, taken_at=timezone.now() - timedelta(days=40),
+        )
+        out = StringIO()
+        call_command("snapshot_inventory", "--prune-days", "30", stdout=out)
+        self.assertIn("E: 0 rows", out.getvalue())
+        self.assertEqual(InventorySnapshot.objects.filter(hub=self.hub).count(), len(self.skus))
+        self.assertFalse(InventorySnapshot.objects.filter(hub=empty).exists())
+
+        # With a cutoff of now, only the checkpoint just written survives.
+        call_command("snapshot_inventory", "--prune-days", "0", stdout=StringIO())
+        self.assertEqual(InventorySnapshot.objects.filter(hub=self.hub).count(), len(self.skus))
+
+
+class RollupTests(SmallCatalogTestCase):
+    def rollups(self):
+        return {
+            (r.hub_id, r.sku_id, r.day): (r.in_qty, r.out_qty, r.moves, r.closing_qty)
+            for r in InventoryDailyRollup.objects.all()
+        }
+
+    def from_logs(self):
+        expected = {}
+        for log in InventoryLog.objects.order_by("created_at", "id"):
+            key = (log.hub_id, log.sku_id, timezone.localdate(log.created_at))
+            in_qty, out_qty, moves, _ = expected.get(key, (0, 0, 0, 0))
+            if log.direction == InventoryLog.IN:
+                in_qty += log.delta
+            else:
+                out_qty += log.delta
+            expected[key] = (in_qty, out_qty, moves + 1, log.after_qty)
+        return expected
+
+    def test_writes_keep_rollups_equal_to_the_logs(self):
+        client = self.client_for(self.user)
+        for strategy in ("conditional", "locking"):
+            with self.settings(INVENTORY_ADJUST_STRATEGY=strategy):
+                for action, qty in (("IN", 4), ("OUT", 6)):
+                    resp = client.post("/api/v1/inventory/adjust/", {
+                        "hub_id": self.hub.pk, "sku_id": self.sku.pk, "action": action, "quantity": qty,
+                    }, format="json")
+                    self.assertEqual(resp.status_code, 200, resp.json())
+        lines = [
+            {"hub_id": h.pk, "sku_id": s.pk, "action": "OUT", "quantity": 2} for h in self.hubs for s in self.skus
+        ]
+        self.assertEqual(client.post("/api/v1/inventory/adjust/batch/", {"lines": lines}, format="json").status_code, 200)
+        lines = [{"sku_id": s.pk, "from_hub_id": self.hub.pk, "to_hub_id": self.hubs[1].pk, "quantity": 3} for s in self.skus]
+        self.assertEqual(client.post("/api/v1/inventory/transfer/", {"lines": lines}, format="json").status_code, 200)
+
+        expected = self.from_logs()
+        self.assertEqual(len(expected), 6)
+        self.assertEqual(expected[(self.hub.pk, self.sku.pk, timezone.localdate())], (8, 17, 6, 1))
+        self.assertEqual(self.rollups(), expected)
+
+        # Rebuilding from the logs changes nothing.
+        self.assertEqual(rebuild_day(timezone.localdate()), 6)
+        self.assertEqual(self.rollups(), expected)
+
+        resp = client.get("/api/v1/analytics/movements/", {"hub_id": self.hub.pk, "group_by": "sku"})
+        logs = InventoryLog.objects.filter(hub=self.hub)
+        self.assertEqual(
+            [(r["sku_id"], r["in_qty"], r["out_qty"], r["moves"]) for r in resp.json()],
+            [
+                (s.pk, sum(l.delta for l in logs if l.sku_id == s.pk and l.direction == "IN"),
+                 sum(l.delta for l in logs if l.sku_id == s.pk and l.direction == "OUT"),
+                 sum(1 for l in logs if l.sku_id == s.pk))
+                for s in self.skus
+            ],
+        )
+
+    def test_rebuild_day_repairs_a_backdated_day(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        noon = timezone.make_aware(datetime.combine(yesterday, dtime(12)))
+        for i, (before, after) in enumerate([(10, 7), (7, 9)]):
+            log = InventoryLog.objects.create(
+                hub=self.hub, sku=self.sku, direction="OUT" if after < before else "IN",
+                delta=abs(after - before), before_qty=before, after_qty=after,
+            )
+            InventoryLog.objects.filter(pk=log.pk).update(created_at=noon + timedelta(minutes=i))
+        InventoryDailyRollup.objects.create(hub=self.hub, sku=self.sku, day=yesterday, in_qty=99)
+
+        self.assertEqual(rebuild_day(yesterday), 1)
+        self.assertEqual(self.rollups(), self.from_logs())
+        self.assertEqual(self.rollups()[(self.hub.pk, self.sku.pk, yesterday)], (2, 3, 2, 9))
+
+
+class DeltaSyncTests(SmallCatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        # Rows written within INVENTORY_SYNC_LAG are sent again; age the fixture.
+        Inventory.objects.update(version=next_version() - 60_000_000)
+
+    def sync(self, **params):
+        resp = self.client_for(self.user).get(f"/api/v1/inventory/by-hub/{self.hub.pk}/", params)
+        self.assertEqual(resp.status_code, 200, resp.json())
+        return [(r["sku_code"], r["quantity"]) for r in resp.json()], int(resp["X-Inventory-Version"])
+
+    def test_since_version_returns_rows_changed_since(self):
+        rows, mark = self.sync()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(self.sync(since_version=mark)[0], [])
+
+        client = self.client_for(self.user)
+        for hub in self.hubs:
+            client.post("/api/v1/inventory/adjust/", {
+                "hub_id": hub.pk, "sku_id": self.skus[1].pk, "action": "IN", "quantity": 2,
+            }, format="json")
+        rows, new_mark = self.sync(since_version=mark)
+        self.assertEqual(rows, [("T-1", 12)])
+        self.assertGreaterEqual(new_mark, mark)
+
+        resp = self.client_for(self.user).get(f"/api/v1/inventory/by-hub/{self.hub.pk}/", {"since_version": "-1"})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_write_committed_within_the_lag_is_not_skipped(self):
+        # A write takes its version, a client syncs, then the write commits.
+        version = next_version()
+        _, mark = self.sync()
+        Inventory.objects.filter(hub=self.hub, sku=self.sku).update(quantity=7, version=version)
+        self.assertEqual(self.sync(since_version=mark)[0], [("T-0", 7)])
+
+
+@override_settings(CHANGES_GAP_GRACE=5)
+class ChangeFeedTests(SmallCatalogTestCase):
+    url = "/api/v1/changes/"
+
+    def log(self, hub, age=0):
+        log = InventoryLog.objects.create(
+            hub=hub, sku=self.sku, direction=InventoryLog.IN, delta=1, before_qty=10, after_qty=11,
+        )
+        InventoryLog.objects.filter(pk=log.pk).update(created_at=timezone.now() - timedelta(seconds=age))
+        return log.pk
+
+    def changes(self, **params):
+        resp = self.client_for(self.user).get(self.url, params)
+        self.assertEqual(resp.status_code, 200, resp.json())
+        return resp.json()
+
+    def test_stops_at_a_fresh_gap(self):
+        start = self.changes()["last_id"]
+        first = self.log(self.hub)
+        # An id taken by a transaction that has not committed yet.
+        missing = self.log(self.hub)
+        InventoryLog.objects.filter(pk=missing).delete()
+        after = self.log(self.hub)
+
+        feed = self.changes(since_id=start)
+        self.assertEqual([c["id"] for c in feed["changes"]], [first])
+        self.assertEqual(feed["last_id"], first)
+
+        # Once the row after the gap is older than the grace period the gap
+        # counts as a rollback and the feed moves past it.
+        InventoryLog.objects.filter(pk=after).update(created_at=timezone.now() - timedelta(seconds=6))
+        feed = self.changes(since_id=first)
+        self.assertEqual([c["id"] for c in feed["changes"]], [after])
+        self.assertEqual(feed["last_id"], after)
+
+    def test_hub_filter_still_advances(self):
+        start = self.changes()["last_id"]
+        other = self.log(self.hubs[1])
+        mine = self.log(self.hub)
+        feed = self.changes(since_id=start, hub_id=self.hub.pk)
+        self.assertEqual([c["id"] for c in feed["changes"]], [mine])
+        self.assertEqual(feed["last_id"], mine)
+        feed = self.changes(since_id=other - 1, hub_id=self.hubs[1].pk, wait=0)
+        self.assertEqual([c["id"] for c in feed["changes"]], [other])
+
+    @override_settings(CHANGES_MAX_WAIT=1, CHANGES_POLL_INTERVAL=0.05)
+    def test_wait(self):
+        head = self.changes()["last_id"]
+        for wait in ("nan", "inf", "-inf", "soon"):
+            resp = self.client_for(self.user).get(self.url, {"since_id": head, "wait": wait})
+            self.assertEqual(resp.status_code, 400, wait)
+            self.assertEqual(resp.json(), {"detail": "wait must be a number of seconds"})
+
+        started = time.monotonic()
+        self.assertEqual(self.changes(since_id=head, wait="1e9"), {"changes": [], "last_id": head})
+        self.assertLess(time.monotonic() - started, 5)
+
+        token = self.token_for(self.user)
+        request = AsyncRequestFactory().get(
+            self.url, {"since_id": head, "wait": "nan"}, headers={"authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(async_to_sync(async_views.inventory_changes)(request).status_code, 400)
+
+    @override_settings(CHANGES_STREAM_SECONDS=0)
+    def test_stream_needs_asgi(self):
+        resp = self.client_for(self.user).get("/api/v1/changes/stream/")
+        self.assertEqual(resp.status_code, 501)
+
+        head = self.changes()["last_id"]
+        request = AsyncRequestFactory().get(
+            "/api/v1/changes/stream/", headers={"authorization": f"Bearer {self.token_for(self.user)}"},
+        )
+
+        async def read():
+            resp = await views.inventory_changes_stream(request)
+            return resp.status_code, b"".join([chunk async for chunk in resp])
+
+        self.assertEqual(async_to_sync(read)(), (200, b"retry: 2000\nid: %d\n\n" % head))
+
+
+class BarcodeScanTests(SmallCatalogTestCase):
+    url = "/api/v1/inventory/scan/"
+
+    def scan(self, barcode):
+        body = {"hub_id": self.hub.pk, "barcode": barcode, "action": "IN", "quantity": 1}
+        return self.client_for(self.user).post(self.url, body, format="json")
+
+    def test_misses_are_not_cached(self):
+        self.assertEqual(self.scan("4006381333931").status_code, 404)
+        # A write that skips the sku table stamp.
+        SKU.objects.filter(pk=self.sku.pk).update(barcode="4006381333931")
+        resp = self.scan("4006381333931")
+        self.assertEqual(resp.status_code, 200, resp.json())
+        self.assertEqual(resp.json()["sku_id"], self.sku.pk)
+
+    def test_ambiguous_is_not_cached(self):
+        SKU.objects.filter(pk__in=[s.pk for s in self.skus[:2]]).update(barcode="0000000000017")
+        self.assertEqual(self.scan("0000000000017").status_code, 409)
+        SKU.objects.filter(pk=self.skus[1].pk).update(barcode="")
+        self.assertEqual(self.scan("0000000000017").json()["sku_id"], self.skus[0].pk)
+
+    def test_hits_are_cached_until_the_stamp_changes(self):
+        SKU.objects.filter(pk=self.sku.pk).update(barcode="0000000000017")
+        self.assertEqual(barcodes.lookup("0000000000017"), self.sku.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(barcodes.lookup("0000000000017"), self.sku.pk)
+        sku = SKU.objects.get(pk=self.skus[1].pk)
+        sku.barcode = "0000000000017"
+        with self.captureOnCommitCallbacks(execute=True):
+            sku.save()
+        self.assertEqual(barcodes.lookup("0000000000017"), barcodes.AMBIGUOUS)
+
+    @override_settings(BARCODE_STAMP_TTL=0)
+    def test_other_processes_see_the_new_stamp(self):
+        SKU.objects.filter(pk=self.sku.pk).update(barcode="0000000000017")
+        self.assertEqual(barcodes.lookup("0000000000017"), self.sku.pk)
+        # A write in another process: the stamp changes, this LRU is not cleared.
+        SKU.objects.filter(pk=self.sku.pk).update(barcode="")
+        SKU.objects.filter(pk=self.skus[1].pk).update(barcode="0000000000017")
+        bump_table_version("sku")
+        self.assertEqual(barcodes.lookup("0000000000017"), self.skus[1].pk)
+
+
+@override_settings(REQUEST_TIMING=True)
+class ServerTimingTests(SmallCatalogTestCase):
+    def timing(self, resp):
+        """``{metric: (dur, desc)}`` from the Server-Timing header."""
+        out = {}
+        for part in resp["Server-Timing"].split(", "):
+            name, *params = part.split(";")
+            params = dict(p.split("=", 1) for p in params)
+            out[name] = (float(params["dur"]), params.get("desc"))
+        return out
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_header_counts_the_queries(self):
+        client = self.client_for(self.user)
+        with CaptureQueriesContext(connection) as queries, self.assertLogs("core.timing", "INFO") as logs:
+            resp = client.get("/api/v1/hubs/")
+        self.assertEqual(resp.status_code, 200)
+        timing = self.timing(resp)
+        self.assertEqual(list(timing), ["db", "ser", "render", "total"])
+        self.assertEqual(timing["db"][1], f'"{len(queries)} queries"')
+        self.assertGreaterEqual(timing["total"][0], timing["db"][0])
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(
+            (record["endpoint"], record["status"], record["sql_count"]), ("api/v1/hubs/", 200, len(queries)),
+        )
+        self.assertIn('endpoint="api/v1/hubs/",quantile="0.5"', metrics.prometheus_text())
+
+    @override_settings(REQUEST_TIMING_QUERY_WARN=0)
+    def test_warns_over_the_query_threshold(self):
+        with self.assertLogs("core.timing", "WARNING"):
+            self.client_for(self.user).get("/api/v1/me/")
+
+    async def test_async_chain(self):
+        token = await sync_to_async(self.token_for)(self.user)
+        with self.assertLogs("core.timing", "INFO"):
+            resp = await self.async_client.get("/api/v1/me/", headers={"authorization": f"Bearer {token}"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("total", self.timing(resp))
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_off_by_default(self):
+        with self.assertNoLogs("core.timing"):
+            self.assertNotIn("Server-Timing", self.client_for(self.user).get("/api/v1/me/"))
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_matches_json_renderer(self):
+        at = datetime(2025, 6, 30, 17, 0, 0, 123456, tzinfo=timezone.get_fixed_timezone(120))
+        data = {
+            "at": at, "utc": at.astimezone(dt_timezone.utc), "day": at.date(), "time": at.time(),
+            "amount": Decimal("1.50"), "none": None,
+        }
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+
+class LogValuesParityTests(SmallCatalogTestCase):
+    """The values fast path must produce what InventoryLogSerializer would."""
+
+    def test_matches_the_serializer(self):
+        transfer = uuid.uuid4()
+        InventoryLog.objects.bulk_create([
+            InventoryLog(hub=self.hub, sku=self.sku, direction="IN", delta=1, before_qty=10, after_qty=11),
+            InventoryLog(hub=self.hub, sku=self.sku, direction="OUT", delta=2, before_qty=11, after_qty=9,
+                         note="by hand", actor=self.user),
+            InventoryLog(hub=self.hub, sku=self.sku, direction="OUT", delta=3, before_qty=9, after_qty=6,
+                         actor=self.user, transfer_id=transfer),
+            InventoryLog(hub=self.hubs[1], sku=self.sku, direction="IN", delta=3, before_qty=10, after_qty=13,
+                         transfer_id=transfer),
+        ])
+        qs = InventoryLog.objects.order_by("id")
+        render = FastJSONRenderer().render
+        expected = json.loads(render(InventoryLogSerializer(qs, many=True).data))
+        names, rows = inventory_log_values.values_list(qs)
+        self.assertEqual(json.loads(render(inventory_log_values.to_dicts(names, rows))), expected)
+        self.assertEqual(list(reversed(self.client_for(self.user).get("/api/v1/logs/").json())), expected)
+        self.assertEqual([("transfer_id" in d, "actor_username" in d) for d in expected], [
+            (True, False), (True, True), (True, True), (True, False),
+        ])
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class LogExportTests(SmallCatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        notes = ["plain", 'comma, "quoted"', "multi\nline", "", "last"]
+        for i, note in enumerate(notes):
+            InventoryLog.objects.create(
+                hub=self.hubs[i % 2], sku=self.sku, direction=InventoryLog.IN, delta=1,
+                before_qty=10 + i, after_qty=11 + i, note=note, actor=self.user if i % 2 else None,
+            )
+        self.client = self.client_for(self.user)
+
+    def export(self, **params):
+        resp = self.client.get("/api/v1/logs/export/", {"format": "csv", **params})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Disposition"].endswith('.csv"'))
+        return list(csv.DictReader(StringIO(b"".join(resp.streaming_content).decode())))
+
+    def test_csv_matches_the_log_list(self):
+        rows = self.export()
+        listed = list(reversed(self.client.get("/api/v1/logs/").json()))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(list(rows[0]), [
+            "id", "created_at", "hub", "hub_code", "sku", "sku_code", "direction", "delta",
+            "before_qty", "after_qty", "note", "actor", "actor_username", "transfer_id",
+        ])
+        for row, item in zip(rows, listed):
+            self.assertEqual(row, {k: "" if item.get(k) is None else str(item.get(k, "")) for k in row})
+
+    def test_filters(self):
+        self.assertEqual({r["hub_code"] for r in self.export(hub_id=self.hubs[1].pk)}, {"B"})
+        today = timezone.localdate().isoformat()
+        self.assertEqual(len(self.export(to=today)), 5)
+        self.assertEqual(self.export(**{"from": (timezone.localdate() + timedelta(days=1)).isoformat()}), [])
+        resp = self.client.get("/api/v1/logs/export/", {"format": "csv", "hub_id": "x"})
+        self.assertEqual(resp.status_code, 400)
+
+
+class ImportSkusTests(SmallCatalogTestCase):
+    def run_import(self, content, suffix=".csv", *args):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as fh:
+            fh.write(content)
+        self.addCleanup(os.unlink, fh.name)
+        call_command("import_skus", fh.name, "--chunk-size", "2", *args, stdout=StringIO())
+
+    def test_matches_existing_codes_case_insensitively(self):
+        lower = SKU.objects.create(sku_code="abc-1", name="Old name")
+        self.run_import(
+            "sku_code,name,color\nabc-1,New name,red\nT-0,Tee 0,\nnew-2,Fresh,\n", ".csv", "--deactivate-missing",
+        )
+        lower.refresh_from_db()
+        self.assertEqual((lower.sku_code, lower.name, lower.color, lower.active), ("abc-1", "New name", "red", True))
+        self.assertFalse(SKU.objects.filter(sku_code="ABC-1").exists())
+        self.assertEqual(
+            set(SKU.objects.filter(active=False).values_list("sku_code", flat=True)), {"T-1", "T-2"},
+        )
+        fresh = SKU.objects.get(sku_code="NEW-2")
+        self.assertEqual(Inventory.objects.filter(sku=fresh, quantity=0).count(), len(self.hubs))
+
+    def test_commits_per_chunk(self):
+        before = Inventory.objects.get(hub=self.hub, sku=self.sku).version
+        with self.assertRaisesMessage(CommandError, "Missing sku_code/name at CSV line 4"):
+            self.run_import("sku_code,name\nT-0,Renamed 0\nT-1,Renamed 1\nT-2,\n")
+        # The first chunk stays written, its renames visible to delta sync.
+        self.assertEqual(SKU.objects.get(pk=self.sku.pk).name, "Renamed 0")
+        self.assertEqual(SKU.objects.get(sku_code="T-2").name, "Tee 2")
+        self.assertGreater(Inventory.objects.get(hub=self.hub, sku=self.sku).version, before)
+
+    def test_json_array(self):
+        self.run_import('[{"sku_code": "j-1", "name": "J"}, {"sku_code": "T-0", "name": "Renamed"}]', ".json")
+        self.assertTrue(SKU.objects.filter(sku_code="J-1").exists())
+        self.assertEqual(SKU.objects.get(pk=self.sku.pk).name, "Renamed")
+
+
+@override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+class LargeTableAdminTests(SmallCatalogTestCase):
+    def test_pages_past_the_estimate_are_reachable(self):
+        # Six inventory rows; the count stops at four, so two pages of two.
+        paginator = EstimatedCountPaginator(Inventory.objects.order_by("pk"), 2)
+        self.assertEqual((paginator.count, paginator.num_pages), (4, 2))
+        page = paginator.page(2)
+        self.assertTrue(page.has_next())
+        self.assertEqual(paginator.num_pages, 3)
+        page = paginator.page(3)
+        self.assertEqual(len(page), 2)
+        self.assertFalse(page.has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        with mock.patch.object(InventoryAdmin, "list_per_page", 2):
+            resp = self.client.get("/admin/core/inventory/", {"p": 3})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context["cl"].result_list), 2)
+
+    def test_sku_search_ignores_case(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        resp = self.client.get("/admin/core/inventory/", {"q": "t-0"})
+        self.assertEqual({row.sku_id for row in resp.context["cl"].result_list}, {self.sku.pk})
+
+
+# -----------------------------
+# Query budgets
+# -----------------------------
+class SeededTestCase(ApiTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("budget-admin", password="x", is_superuser=True, is_staff=True)
+        cls.user = User.objects.create_user("budget-user", password="x")
+        cls.user.groups.add(Group.objects.create(name="HubManager"))
+
+        cls.hubs = Hub.objects.bulk_create(
+            [Hub(code=f"HUB{i}", name=f"Hub {i}", city="Raleigh") for i in range(N_HUBS)]
+        )
+        cls.skus = SKU.objects.bulk_create(
+            [SKU(sku_code=f"SKU-{i:05d}", name=f"Stripe {i:05d}", color="blue", size="M") for i in range(N_SKUS)]
+        )
+        Inventory.objects.bulk_create(
+            [Inventory(hub=h, sku=s, quantity=100) for h in cls.hubs for s in cls.skus]
+        )
+        InventoryLog.objects.bulk_create([
+            InventoryLog(
+                hub=cls.hubs[i % N_HUBS], sku=cls.skus[i % N_SKUS],
+                direction=InventoryLog.IN, delta=1, before_qty=99, after_qty=100,
+                actor=cls.admin if i % 2 else None,
+            )
+            for i in range(N_LOGS)
+        ])
+        rebuild_day(timezone.localdate())
+        cls.hub = cls.hubs[0]
+        cls.sku = cls.skus[0]
+
+
+class QueryBudgetTests(SeededTestCase):
+    @contextmanager
+    def budget(self, max_queries, label):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            yield
+            elapsed = time.perf_counter() - started
+        sql = "\n".join(q["sql"] for q in ctx.captured_queries)
+        self.assertLessEqual(
+            len(ctx), max_queries,
+            f"{label}: {len(ctx)} queries, budget {max_queries}\n{sql}",
+        )
+        self.assertLess(elapsed, TIME_CEILING, f"{label}: {elapsed:.2f}s")
+
+    def get(self, client, url, max_queries, status=200, **params):
+        with self.budget(max_queries, f"GET {url}"):
+            resp = client.get(url, params)
+        self.assertEqual(resp.status_code, status, getattr(resp, "data", resp))
+        return resp
+
+    def post(self, client, url, body, max_queries, status=200, method="post"):
+        with self.budget(max_queries, f"{method.upper()} {url}"):
+            resp = getattr(client, method)(url, body, format="json")
+        self.assertEqual(resp.status_code, status, getattr(resp, "data", resp))
+        return resp
+
+    # Budgets include authentication: one query for the user row (the token
+    # version is already cached from issuing the token). Inside TestCase
+    # transaction.atomic shows up as SAVEPOINT/RELEASE.
+
+    def test_ping(self):
+        self.get(APIClient(), "/api/v1/ping/", 0)
+
+    def test_me(self):
+        resp = self.get(self.client_for(self.user), "/api/v1/me/", 2)
+        self.assertEqual(resp.json()["roles"], ["HubManager"])
+
+    def test_hubs(self):
+        client = self.client_for(self.user)
+        # User row, table stamp, hubs.
+        resp = self.get(client, "/api/v1/hubs/", 3)
+        self.assertEqual(len(resp.json()), N_HUBS)
+        # Cached payload: only the user row and the stamp are read.
+        self.get(client, "/api/v1/hubs/", 2)
+
+    def test_skus(self):
+        client = self.client_for(self.user)
+        resp = self.get(client, "/api/v1/skus/", 3)
+        self.assertEqual(len(resp.json()), N_SKUS)
+        resp = self.get(client, "/api/v1/skus/", 3, limit=50, fields="id,sku_code")
+        self.assertIn("X-Next-Cursor", resp)
+        self.get(client, "/api/v1/skus/", 3, limit=50, cursor=resp["X-Next-Cursor"])
+        resp = self.get(client, "/api/v1/skus/", 3, q="sku-0000", fields="sku_code")
+        self.assertEqual([row["sku_code"] for row in resp.json()], [f"SKU-{i:05d}" for i in range(10)])
+
+    def test_sku_create_and_detail(self):
+        client = self.client_for(self.admin)
+        resp = self.post(client, "/api/v1/skus/", {"sku_code": "NEW-1", "name": "New"}, 4, status=201)
+        # Writes also replace the sku table stamp (one upsert). PATCH bumps
+        # the SKU's inventory row versions too (one UPDATE).
+        self.post(client, f"/api/v1/skus/{self.sku.pk}/", {"name": "Renamed"}, 5, method="patch")
+        self.post(client, f"/api/v1/skus/{resp.json()['id']}/", None, 8, status=204, method="delete")
+
+    def test_inventory_by_hub(self):
+        client = self.client_for(self.user)
+        url = f"/api/v1/inventory/by-hub/{self.hub.pk}/"
+        resp = self.get(client, url, 2)
+        self.assertEqual(len(resp.json()), N_SKUS)
+        resp = self.get(client, url, 2, limit=100)
+        self.get(client, url, 2, limit=100, cursor=resp["X-Next-Cursor"])
+        self.get(client, url, 2, since_version=resp["X-Inventory-Version"])
+
+    def test_inventory_as_of(self):
+        self.get(self.client_for(self.user), f"/api/v1/inventory/by-hub/{self.hub.pk}/as-of/", 5)
+
+    @override_settings(INVENTORY_ADJUST_STRATEGY="conditional")
+    def test_inventory_adjust_conditional(self):
+        client = self.client_for(self.user)
+        body = {"hub_id": self.hub.pk, "sku_id": self.sku.pk, "action": "OUT", "quantity": 1}
+        # User, SAVEPOINT, UPDATE ... RETURNING, log INSERT, rollup upsert, RELEASE.
+        self.post(client, "/api/v1/inventory/adjust/", body, 6)
+
+    @override_settings(INVENTORY_ADJUST_STRATEGY="locking")
+    def test_inventory_adjust_locking(self):
+        client = self.client_for(self.user)
+        body = {"hub_id": self.hub.pk, "sku_id": self.sku.pk, "action": "IN", "quantity": 1}
+        self.post(client, "/api/v1/inventory/adjust/", body, 9)
+
+    @override_settings(INVENTORY_ADJUST_STRATEGY="conditional")
+    def test_inventory_scan(self):
+        SKU.objects.filter(pk=self.sku.pk).update(barcode="0000000000017")
+        client = self.client_for(self.user)
+        body = {"hub_id": self.hub.pk, "barcode": "0000000000017", "action": "IN", "quantity": 1}
+        # The first lookup in the process also reads the sku table stamp.
+        self.post(client, "/api/v1/inventory/scan/", {**body, "barcode": "nope"}, 5, status=404)
+        # On top of the conditional adjust (6): one barcode query on a miss,
+        # none on a hit.
+        resp = self.post(client, "/api/v1/inventory/scan/", body, 7)
+        self.assertEqual(resp.json()["sku_id"], self.sku.pk)
+        self.post(client, "/api/v1/inventory/scan/", body, 6)
+
+    def test_inventory_adjust_idempotent_replay(self):
+        client = self.client_for(self.user, HTTP_IDEMPOTENCY_KEY="budget-1")
+        body = {"hub_id": self.hub.pk, "sku_id": self.sku.pk, "action": "IN", "quantity": 1}
+        # Adds the key lookup, the key INSERT and its savepoint.
+        self.post(client, "/api/v1/inventory/adjust/", body, 12)
+        resp = self.post(client, "/api/v1/inventory/adjust/", body, 2)
+        self.assertEqual(resp["Idempotent-Replayed"], "true")
+
+    def test_inventory_adjust_batch(self):
+        client = self.client_for(self.user)
+        lines = [
+            {"hub_id": h.pk, "sku_id": s.pk, "action": "IN", "quantity": 2}
+            for h in self.hubs for s in self.skus[:25]
+        ]
+        # Independent of the number of lines (100 here), except that SQLite's
+        # 999-parameter limit splits the 100 log rows into two INSERTs.
+        self.post(client, "/api/v1/inventory/adjust/batch/", {"lines": lines}, 11)
+
+    def test_inventory_transfer(self):
+        client = self.client_for(self.user, HTTP_IDEMPOTENCY_KEY="transfer-1")
+        dest = self.hubs[1]
+        lines = [
+            {"sku_id": s.pk, "from_hub_id": self.hub.pk, "to_hub_id": dest.pk, "quantity": 3}
+            for s in self.skus[:20]
+        ]
+        # Independent of the number of lines, like the batch adjust; includes
+        # the idempotency key lookup, INSERT and savepoints.
+        resp = self.post(client, "/api/v1/inventory/transfer/", {"lines": lines}, 16)
+        transfer_id = resp.json()["transfer_id"]
+        self.assertEqual(resp.json()["lines"][0]["from_quantity"], 97)
+        self.assertEqual(resp.json()["lines"][0]["to_quantity"], 103)
+        self.assertEqual(InventoryLog.objects.filter(transfer_id=transfer_id).count(), 40)
+
+        over = [{"sku_id": self.sku.pk, "from_hub_id": self.hub.pk, "to_hub_id": dest.pk, "quantity": 1000}]
+        resp = self.client_for(self.user).post("/api/v1/inventory/transfer/", {"lines": over}, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["errors"][0]["available"], 97)
+
+    def test_inventory_logs(self):
+        client = self.client_for(self.user)
+        resp = self.get(client, "/api/v1/logs/", 2, limit=200)
+        self.assertEqual(len(resp.json()), 200)
+        self.get(client, "/api/v1/logs/", 2, limit=200, cursor=resp["X-Next-Cursor"], hub_id=self.hub.pk)
+
+    def test_logs_export(self):
+        client = self.client_for(self.user)
+        with self.budget(2, "GET /api/v1/logs/export/"):
+            resp = client.get("/api/v1/logs/export/", {"format": "ndjson"})
+            lines = b"".join(resp.streaming_content).splitlines()
+        self.assertEqual(len(lines), N_LOGS)
+
+    def test_changes(self):
+        client = self.client_for(self.user)
+        head = self.get(client, "/api/v1/changes/", 2).json()["last_id"]
+        self.get(client, "/api/v1/changes/", 2, since_id=head - 500, limit=500)
+
+    def test_analytics_movements(self):
+        client = self.client_for(self.user)
+        self.get(client, "/api/v1/analytics/movements/", 2, hub_id=self.hub.pk)
+        self.get(client, "/api/v1/analytics/movements/", 2, hub_id=self.hub.pk, group_by="sku")
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        # Session, user, estimated count, page rows (with hub/sku/actor
+        # joined) and the hub filter choices.
+        for url in ("/admin/core/inventorylog/", "/admin/core/inventory/"):
+            self.get(self.client, url, 5)
+        self.get(self.client, "/admin/core/inventorylog/", 5, q="SKU-0001", created="7d")
+
+    @override_settings(METRICS_TOKEN="budget-token")
+    def test_metrics(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer budget-token")
+        self.get(client, "/api/v1/metrics/", 0)
+
+
+class ReconcileTests(TestCase):
+    def test_check_and_fix(self):
+        hub = Hub.objects.create(code="R1", name="R1")
+        sku = SKU.objects.create(sku_code="R-1", name="R-1")
+        Inventory.objects.create(hub=hub, sku=sku, quantity=7)
+        InventoryLog.objects.bulk_create([
+            InventoryLog(hub=hub, sku=sku, direction=InventoryLog.IN, delta=5, before_qty=0, after_qty=5),
+            InventoryLog(hub=hub, sku=sku, direction=InventoryLog.OUT, delta=1, before_qty=4, after_qty=2),
+        ])
+        _, found = reconcile.check_hub(hub.pk)
+        self.assertEqual(sorted(row[0] for row in found), ["arithmetic", "chain", "quantity"])
+        self.assertIn(("quantity", hub.pk, sku.pk, None, 4, 7), found)
+
+        self.assertEqual(reconcile.fix_hub(hub.pk, [sku.pk]), 1)
+        self.assertEqual(list(reconcile.quantity_mismatches(hub.pk)), [])
+        fix = InventoryLog.objects.get(note=reconcile.FIX_NOTE)
+        self.assertEqual((fix.direction, fix.delta, fix.before_qty, fix.after_qty), ("IN", 3, 2, 7))
+
+    def test_fix_continues_the_chain(self):
+        hub = Hub.objects.create(code="R1", name="R1")
+        sku = SKU.objects.create(sku_code="R-1", name="R-1")
+        Inventory.objects.create(hub=hub, sku=sku, quantity=1)
+        InventoryLog.objects.bulk_create([
+            InventoryLog(hub=hub, sku=sku, direction=InventoryLog.IN, delta=5, before_qty=0, after_qty=5),
+            InventoryLog(hub=hub, sku=sku, direction=InventoryLog.OUT, delta=1, before_qty=5, after_qty=4),
+        ])
+        self.assertEqual(reconcile.fix_hub(hub.pk, [sku.pk]), 1)
+        fix = InventoryLog.objects.get(note=reconcile.FIX_NOTE)
+        self.assertEqual((fix.direction, fix.delta, fix.before_qty, fix.after_qty), ("OUT", 3, 4, 1))
+        self.assertEqual(reconcile.check_hub(hub.pk), (hub.pk, []))
+
+    def test_report(self):
+        hub = Hub.objects.create(code="R1", name="R1")
+        sku = SKU.objects.create(sku_code="R-1", name="R-1")
+        Inventory.objects.create(hub=hub, sku=sku, quantity=7)
+        log = InventoryLog.objects.create(
+            hub=hub, sku=sku, direction=InventoryLog.IN, delta=5, before_qty=1, after_qty=6,
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("report.csv", "report.ndjson"):
+                path = os.path.join(tmp, name)
+                call_command("reconcile_inventory", path, "--workers", "1", stderr=StringIO())
+                with open(path) as fh:
+                    rows = list(csv.DictReader(fh)) if name.endswith(".csv") else [json.loads(l) for l in fh]
+                none, pk = ("", str) if name.endswith(".csv") else (None, int)
+                self.assertEqual(rows, [
+                    {"kind": "quantity", "hub_id": pk(hub.pk), "sku_id": pk(sku.pk), "log_id": none,
+                     "expected": pk(5), "actual": pk(7)},
+                    {"kind": "chain", "hub_id": pk(hub.pk), "sku_id": pk(sku.pk), "log_id": pk(log.pk),
+                     "expected": pk(0), "actual": pk(1)},
+                ])
+
+
+class AsyncReadViewTests(SeededTestCase):
+    """core.async_views must answer exactly like the DRF views they stand in for."""
+
+    async def compare(self, view, url, *args, **params):
+        token = await sync_to_async(self.token_for)(self.user)
+        client = await sync_to_async(self.client_for)(self.user)
+        expected = await sync_to_async(client.get)(url, params)
+        request = AsyncRequestFactory().get(url, params, headers={"authorization": f"Bearer {token}"})
+        resp = await view(request, *args)
+        self.assertEqual(resp.status_code, expected.status_code)
+        self.assertEqual(json.loads(resp.content), expected.json())
+        for header in ("X-Next-Cursor", "ETag"):
+            self.assertEqual(resp.get(header), expected.get(header), header)
+        return resp
+
+    async def test_matches_sync_views(self):
+        hub = self.hub.pk
+        await self.compare(async_views.me, "/api/v1/me/")
+        await self.compare(async_views.hubs, "/api/v1/hubs/")
+        await self.compare(async_views.skus, "/api/v1/skus/", q="SKU-000", fields="id,sku_code")
+        resp = await self.compare(async_views.skus, "/api/v1/skus/", limit=50)
+        await self.compare(async_views.skus, "/api/v1/skus/", limit=50, cursor=resp["X-Next-Cursor"])
+        url = f"/api/v1/inventory/by-hub/{hub}/"
+        resp = await self.compare(async_views.inventory_by_hub, url, hub, limit=100)
+        await self.compare(async_views.inventory_by_hub, url, hub, limit=100, cursor=resp["X-Next-Cursor"])
+        await self.compare(async_views.inventory_by_hub, url, hub, since_version=resp["X-Inventory-Version"])
+        await self.compare(async_views.inventory_by_hub, url, hub, since_version="x")
+        resp = await self.compare(async_views.inventory_logs, "/api/v1/logs/", limit=200, hub_id=hub)
+        await self.compare(async_views.inventory_logs, "/api/v1/logs/", cursor=resp["X-Next-Cursor"])
+        await self.compare(async_views.inventory_changes, "/api/v1/changes/")
+        await self.compare(async_views.inventory_changes, "/api/v1/changes/", since_id=0, limit=20, hub_id=hub)
+
+    async def test_requires_token(self):
+        resp = await async_views.hubs(AsyncRequestFactory().get("/api/v1/hubs/"))
+        self.assertEqual(resp.status_code, 401)
+        self.assertIn("WWW-Authenticate", resp)
+        bad = AsyncRequestFactory().get("/api/v1/hubs/", headers={"authorization": "Bearer nope"})
+        self.assertEqual((await async_views.hubs(bad)).status_code, 401)
+
+
+@override_settings(REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Which database a request reads from; no queries are run."""
+
+    def routed(self, request, status=200):
+        seen = {}
+
+        def view(req):
+            seen["read"] = db_router.ReplicaRouter().db_for_read(Hub)
+            with db_router.primary():
+                seen["primary"] = db_router.ReplicaRouter().db_for_read(Hub)
+            return HttpResponse(status=status)
+
+        with mock.patch.object(db_router, "replica_aliases", return_value=["replica_1"]):
+            response = ReplicaRoutingMiddleware(view)(request)
+        self.assertEqual(seen["primary"], "default")
+        return seen["read"], response
+
+    def test_reads_and_writes(self):
+        factory = RequestFactory()
+        self.assertEqual(self.routed(factory.get("/api/v1/hubs/"))[0], "replica_1")
+        self.assertEqual(db_router.ReplicaRouter().db_for_read(Hub), "default")
+        self.assertEqual(db_router.ReplicaRouter().db_for_write(Hub), "default")
+
+        read, response = self.routed(factory.post("/api/v1/inventory/adjust/"))
+        self.assertEqual(read, "default")
+        until = response[db_router.STICKY_HEADER]
+        self.assertEqual(response.cookies[db_router.STICKY_COOKIE].value, until)
+        self.assertNotIn(db_router.STICKY_HEADER, self.routed(factory.post("/x/"), status=400)[1])
+
+        factory.cookies[db_router.STICKY_COOKIE] = until
+        self.assertEqual(self.routed(factory.get("/api/v1/hubs/"))[0], "default")
+        del factory.cookies[db_router.STICKY_COOKIE]
+        headers = lambda value: {"headers": {db_router.STICKY_HEADER: value}}
+        self.assertEqual(self.routed(factory.get("/", **headers(until)))[0], "default")
+        self.assertEqual(self.routed(factory.get("/", **headers(str(time.time() - 1))))[0], "replica_1")
+        self.assertEqual(self.routed(factory.get("/", **headers("9999999999")))[0], "replica_1")
+        self.assertEqual(self.routed(factory.get("/", **headers("soon")))[0], "replica_1")
+
+    async def test_async_chain(self):
+        async def view(request):
+            return HttpResponse(db_router.ReplicaRouter().db_for_read(Hub))
+
+        with mock.patch.object(db_router, "replica_aliases", return_value=["replica_1"]):
+            middleware = ReplicaRoutingMiddleware(view)
+        response = await middleware(AsyncRequestFactory().get("/api/v1/hubs/"))
+        self.assertEqual(response.content, b"replica_1")
+
+    def test_off_without_replicas(self):
+        with mock.patch.object(db_router, "replica_aliases", return_value=[]), self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+class SQLiteReplicaTests(TransactionTestCase):
+    """
+    Routing against a real second database: a copy of the test database in
+    a SQLite file, standing in for a replica that stopped applying writes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        barcodes.clear()
+        self.user = User.objects.create_user("clerk", password="x")
+        self.hub = Hub.objects.create(code="A", name="Hub A")
+        self.sku = SKU.objects.create(sku_code="T-0", name="Tee 0")
+        Inventory.objects.create(hub=self.hub, sku=self.sku, quantity=10)
+        # The replica last applied a write a minute ago.
+        Inventory.objects.update(version=next_version() - 60_000_000)
+        self.log = InventoryLog.objects.create(
+            hub=self.hub, sku=self.sku, direction=InventoryLog.IN, delta=10, before_qty=0, after_qty=10,
+        )
+
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        self.addCleanup(os.unlink, self.path)
+        self.copy_to_replica()
+        self.open_replica()
+        self.addCleanup(self.close_replica)
+        patcher = mock.patch.object(db_router, "replica_aliases", return_value=["replica_1"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def copy_to_replica(self):
+        connection.ensure_connection()
+        target = sqlite3.connect(self.path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    def open_replica(self):
+        # Registered on the handler only, not in DATABASES: the test runner
+        # would otherwise set up a test database for it.
+        connections["replica_1"] = type(connections["default"])({**connections.settings["default"], "NAME": self.path}, "replica_1")
+
+    def close_replica(self):
+        connections["replica_1"].close()
+        del connections["replica_1"]
+
+    def write_on_primary(self, seconds_ago):
+        """A write the replica has not applied, committed ``seconds_ago``."""
+        Inventory.objects.filter(hub=self.hub, sku=self.sku).update(
+            quantity=7, version=next_version() - seconds_ago * 1_000_000,
+        )
+        return InventoryLog.objects.create(
+            hub=self.hub, sku=self.sku, direction=InventoryLog.OUT, delta=3, before_qty=10, after_qty=7,
+        )
+
+    def get(self, url, **params):
+        resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, 200)
+        return resp
+
+    def test_reads_go_to_the_replica(self):
+        new = self.write_on_primary(seconds_ago=30)
+        self.assertEqual([r["id"] for r in self.get("/api/v1/logs/").json()], [self.log.pk])
+        export = b"".join(self.get("/api/v1/logs/export/", format="ndjson").streaming_content)
+        self.assertEqual([json.loads(line)["id"] for line in export.splitlines()], [self.log.pk])
+        # The change feed reads the primary.
+        feed = self.get("/api/v1/changes/", since_id=self.log.pk).json()
+        self.assertEqual([c["id"] for c in feed["changes"]], [new.pk])
+
+    def test_delta_sync_mark_comes_from_the_replica(self):
+        self.write_on_primary(seconds_ago=30)
+        resp = self.get(f"/api/v1/inventory/by-hub/{self.hub.pk}/")
+        self.assertEqual([r["quantity"] for r in resp.json()], [10])
+        mark = resp["X-Inventory-Version"]
+
+        request = AsyncRequestFactory().get(
+            f"/api/v1/inventory/by-hub/{self.hub.pk}/", headers={"authorization": f"Bearer {self.token}"},
+        )
+        token = db_router.use_replica("replica_1")
+        try:
+            resp = async_to_sync(async_views.inventory_by_hub)(request, self.hub.pk)
+        finally:
+            db_router.reset(token)
+        self.assertEqual((resp.status_code, resp["X-Inventory-Version"]), (200, mark))
+
+        # Once the replica catches up, the write 30 s back is above the mark.
+        self.close_replica()
+        self.copy_to_replica()
+        self.open_replica()
+        resp = self.get(f"/api/v1/inventory/by-hub/{self.hub.pk}/", since_version=mark)
+        self.assertEqual([r["quantity"] for r in resp.json()], [7])
+
+    def test_migrations_skip_replicas(self):
+        router = db_router.ReplicaRouter()
+        self.assertTrue(router.allow_migrate("default", "core"))
+        self.assertFalse(router.allow_migrate("replica_1", "core"))
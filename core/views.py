@@ -1,24 +1,101 @@
 # core/views.py
+import asyncio
+import hmac
+import math
+from datetime import date, datetime, timedelta
+from time import monotonic, sleep
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
+from django.db.models import F, Max, Q, Sum
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import APIException
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Hub, SKU, Inventory, InventoryLog
+from . import barcodes, changes, db_router, exports, metrics, snapshots
+from .authentication import JWTAuthentication
+from .catalog_cache import cached_list_response
+from .idempotency import idempotent
+from .models import Hub, SKU, Inventory, InventoryDailyRollup, InventoryLog, next_version
 from .serializers import (
     HubSerializer,
     SKUSerializer,
     InventorySerializer,
     InventoryAdjustSerializer,
-    InventoryLogSerializer,
+    InventoryBatchAdjustSerializer,
+    InventoryScanSerializer,
+    InventoryTransferSerializer,
+    inventory_log_values,
+    inventory_values,
+)
+from .pagination import (
+    InvalidCursor,
+    is_paged,
+    next_page_headers,
+    paginate,
+    parse_limit,
+    set_next_headers,
 )
+from .renderers import CSVRenderer, FastJSONRenderer, NDJSONRenderer
+from .roles import is_admin
+from .stock import (
+    ADJUST_STRATEGIES,
+    BatchRejected,
+    InsufficientStock,
+    apply_adjustments,
+    apply_transfers,
+    record_logs,
+)
+
+
+class BadParam(ValueError):
+    pass
+
+
+def _parse_fields(request, allowed):
+    raw = request.GET.get("fields")
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise BadParam(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def _parse_active(request):
+    raw = request.GET.get("active")
+    if raw is None or raw == "":
+        return None
+    val = raw.strip().lower()
+    if val in ("1", "true", "yes"):
+        return True
+    if val in ("0", "false", "no"):
+        return False
+    raise BadParam("active must be true or false")
 
 
-def _is_admin(user) -> bool:
-    return user.is_superuser or user.groups.filter(name="Admin").exists()
+def _sku_filters(request, prefix=""):
+    """``?active=`` and ``?q=`` (sku_code / name prefix) as a Q on SKU fields."""
+    q = Q()
+    active = _parse_active(request)
+    if active is not None:
+        q &= Q(**{f"{prefix}active": active})
+    term = request.GET.get("q", "").strip()
+    if term:
+        # Both prefixes are case-insensitive and index-served on PostgreSQL,
+        # by sku_code_upper_like_idx and sku_name_upper_like_idx.
+        q &= Q(**{f"{prefix}sku_code__istartswith": term}) | Q(**{f"{prefix}name__istartswith": term})
+    return q
 
 
 # -----------------------------
@@ -27,8 +104,10 @@ def _is_admin(user) -> bool:
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def hubs(request):
-    qs = Hub.objects.order_by("code", "name")
-    return Response(HubSerializer(qs, many=True).data, status=200)
+    return cached_list_response(
+        request, ["hub"],
+        lambda: (HubSerializer(Hub.objects.order_by("code", "name"), many=True).data, {}),
+    )
 
 
 # -----------------------------
@@ -37,11 +116,31 @@ def hubs(request):
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
 def skus(request):
+    """
+    GET filters: ?active=true|false, ?q=<sku_code or name prefix>,
+    ?fields=id,sku_code,... Paged by sku_code when ?limit= or ?cursor= is given.
+    """
     if request.method == "GET":
-        qs = SKU.objects.order_by("sku_code")
-        return Response(SKUSerializer(qs, many=True).data)
+        try:
+            fields = _parse_fields(request, SKUSerializer.Meta.fields)
+            qs = SKU.objects.filter(_sku_filters(request)).order_by("sku_code")
+        except BadParam as exc:
+            return Response({"detail": str(exc)}, status=400)
+
+        def build():
+            rows, next_cursor = qs, None
+            if is_paged(request):
+                limit = parse_limit(request, default=100, maximum=1000)
+                rows, next_cursor = paginate(qs, request, ("sku_code",), (str,), limit)
+            data = SKUSerializer(rows, many=True, fields=fields).data
+            return data, next_page_headers(request, next_cursor)
+
+        try:
+            return cached_list_response(request, ["sku"], build)
+        except InvalidCursor as exc:
+            return Response({"detail": str(exc)}, status=400)
 
-    if not _is_admin(request.user):
+    if not is_admin(request.user):
         return Response({"detail": "Admin only"}, status=status.HTTP_403_FORBIDDEN)
 
     ser = SKUSerializer(data=request.data)
@@ -57,7 +156,7 @@ def sku_detail(request, pk: int):
     sku = get_object_or_404(SKU, pk=pk)
 
     if request.method == "PATCH":
-        if not _is_admin(request.user):
+        if not is_admin(request.user):
             return Response({"detail": "Admin only"}, status=403)
         ser = SKUSerializer(sku, data=request.data, partial=True)
         if not ser.is_valid():
@@ -65,7 +164,7 @@ def sku_detail(request, pk: int):
         ser.save()
         return Response(ser.data)
 
-    if not _is_admin(request.user):
+    if not is_admin(request.user):
         return Response({"detail": "Admin only"}, status=403)
     sku.delete()
     return Response(status=204)
@@ -74,19 +173,118 @@ def sku_detail(request, pk: int):
 # -----------------------------
 # Inventory
 # -----------------------------
+BY_HUB_KEYS = ("sku__name", "sku_id")
+
+
+def _sync_version(hub_id, since=0):
+    """
+    High-water mark for delta sync: ``INVENTORY_SYNC_LAG`` seconds behind
+    now, so a write still in flight when we read (its version is taken
+    before it commits) is picked up by the next sync rather than skipped.
+    Rows between the mark and now are sent again next time.
+
+    This only holds for write transactions shorter than the lag: one that
+    commits later can land below a mark a client already holds, and that
+    client never sees it. Stock writes lock and commit a few rows at a
+    time, and import_skus and reconcile_inventory --fix commit per chunk,
+    for that reason.
+
+    On a replica "now" is replaced by the hub's newest version there (one
+    query on the (hub, version) index), since writes it has not applied yet
+    can be older than now minus the lag. Call it before reading the rows.
+    """
+    lag = int(settings.INVENTORY_SYNC_LAG * 1_000_000)
+    newest = next_version()
+    if db_router.read_alias() != "default":
+        newest = min(newest, Inventory.objects.filter(hub_id=hub_id).aggregate(m=Max("version"))["m"] or 0)
+    return max(since, newest - lag)
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def inventory_by_hub(request, hub_id: int):
-    rows = (
-        Inventory.objects.filter(hub_id=hub_id)
-        .select_related("sku")
-        .order_by("sku__name")
+    """
+    Filters: ?active=true|false (SKU), ?q=<sku_code or name prefix>,
+    ?fields=sku_id,sku_code,... Paged by (sku name, sku id) when ?limit= or
+    ?cursor= is given.
+
+    Delta sync: keep the ``X-Inventory-Version`` header of a full load (its
+    first page when paging) and send it back as ``?since_version=`` to get
+    only the rows changed since, plus a new header. Deleted rows are not
+    reported; SKUs are deactivated, not deleted, in normal operation.
+    """
+    try:
+        since, names, rows = _by_hub_rows(request, hub_id)
+    except BadParam as exc:
+        return Response({"detail": str(exc)}, status=400)
+    sync_version = _sync_version(hub_id, since or 0)
+    next_cursor = None
+    if is_paged(request):
+        limit = parse_limit(request, default=100, maximum=1000)
+        try:
+            rows, next_cursor = paginate(rows, request, BY_HUB_KEYS, (str, int), limit, key=lambda r: r[-2:])
+        except InvalidCursor as exc:
+            return Response({"detail": str(exc)}, status=400)
+
+    resp = Response(inventory_values.to_dicts(names, rows), status=200)
+    resp["X-Inventory-Version"] = sync_version
+    return set_next_headers(resp, request, next_cursor)
+
+
+def _by_hub_rows(request, hub_id):
+    """
+    Parses inventory_by_hub's query string (raises ``BadParam``). Returns
+    ``(since_version or None, names, rows)`` with ``rows`` not yet evaluated.
+    """
+    raw_since = request.GET.get("since_version")
+    since = None
+    if raw_since is not None:
+        if not raw_since.isdigit():
+            raise BadParam("since_version must be a non-negative integer")
+        if is_paged(request):
+            raise BadParam("since_version cannot be combined with limit/cursor")
+        since = int(raw_since)
+
+    fields = _parse_fields(request, InventorySerializer.Meta.fields)
+    qs = Inventory.objects.filter(_sku_filters(request, prefix="sku__"), hub_id=hub_id)
+    if since is not None:
+        # Served by the (hub, version) index.
+        names, rows = inventory_values.values_list(qs.filter(version__gt=since).order_by("version"), fields)
+        return since, names, rows
+    names, rows = inventory_values.values_list(qs.order_by(*BY_HUB_KEYS), fields, extra=BY_HUB_KEYS)
+    return None, names, rows
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def inventory_as_of(request, hub_id: int):
+    """
+    ?at=2025-06-30 or ?at=2025-06-30T17:00:00Z. Reads the nearest
+    InventorySnapshot at or before ``at`` plus the logs written after it.
+    """
+    get_object_or_404(Hub, pk=hub_id)
+    raw = request.GET.get("at")
+    try:
+        at = exports.parse_bound(raw, end_of_day=True) if raw else timezone.now()
+    except ValueError:
+        return Response({"detail": "at must be an ISO date or datetime"}, status=400)
+
+    items, checkpoint, replayed = snapshots.inventory_as_of(hub_id, at)
+    return Response(
+        {
+            "hub_id": hub_id,
+            "at": timezone.localtime(at),
+            "checkpoint": checkpoint and timezone.localtime(checkpoint),
+            "logs_replayed": replayed,
+            "items": items,
+        },
+        status=200,
     )
-    return Response(InventorySerializer(rows, many=True).data, status=200)
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent
 @transaction.atomic
 def inventory_adjust(request):
     """
@@ -102,70 +300,391 @@ def inventory_adjust(request):
     ser = InventoryAdjustSerializer(data=request.data)
     if not ser.is_valid():
         return Response(ser.errors, status=400)
+    return _adjust(request, ser.validated_data["sku_id"], ser.validated_data)
 
-    sku_id = ser.validated_data["sku_id"]
-    hub_id = ser.validated_data["hub_id"]
-    qty = ser.validated_data["quantity"]
-    action = ser.validated_data["action"]
-    note = ser.validated_data.get("note", "")
 
-    sku = get_object_or_404(SKU, pk=sku_id)
-    get_object_or_404(Hub, pk=hub_id)  # ensure hub exists
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@idempotent
+@transaction.atomic
+def inventory_scan(request):
+    """
+    Body JSON:
+    {
+      "barcode": "0123456789012",
+      "hub_id": 7,
+      "action": "IN" | "OUT",
+      "quantity": 1,
+      "note": "optional"
+    }
+    Same as inventory/adjust/, keyed by SKU barcode. A cached barcode costs
+    no extra query; a cache miss costs one indexed lookup.
+    """
+    ser = InventoryScanSerializer(data=request.data)
+    if not ser.is_valid():
+        return Response(ser.errors, status=400)
 
-    inv, _ = Inventory.objects.select_for_update().get_or_create(
-        hub_id=hub_id, sku=sku, defaults={"quantity": 0}
-    )
+    sku_id = barcodes.lookup(ser.validated_data["barcode"])
+    if sku_id is None:
+        return Response({"detail": "Unknown barcode"}, status=404)
+    if sku_id == barcodes.AMBIGUOUS:
+        return Response({"detail": "Barcode matches several SKUs; adjust by sku_id"}, status=409)
+    return _adjust(request, sku_id, ser.validated_data)
 
-    before = inv.quantity
-    if action == "IN":
-        inv.quantity = before + qty
-        direction = InventoryLog.IN
-        delta = qty
-    else:
-        if before - qty < 0:
-            return Response({"detail": "Insufficient stock"}, status=400)
-        inv.quantity = before - qty
-        direction = InventoryLog.OUT
-        delta = qty
 
-    inv.save()
+def _adjust(request, sku_id, data):
+    hub_id = data["hub_id"]
+    qty = data["quantity"]
+    action = data["action"]
+    note = data.get("note", "")
+
+    adjust = ADJUST_STRATEGIES[settings.INVENTORY_ADJUST_STRATEGY]
+    try:
+        before, after = adjust(hub_id, sku_id, action, qty)
+    except InsufficientStock:
+        return Response({"detail": "Insufficient stock"}, status=400)
 
-    InventoryLog.objects.create(
+    record_logs([InventoryLog(
         hub_id=hub_id,
-        sku=sku,
-        direction=direction,
-        delta=delta,
+        sku_id=sku_id,
+        direction=InventoryLog.IN if action == "IN" else InventoryLog.OUT,
+        delta=qty,
         before_qty=before,
-        after_qty=inv.quantity,
+        after_qty=after,
         note=note,
-        actor=request.user if request.user.is_authenticated else None,
-    )
+        actor_id=request.user.pk,
+    )])
 
     return Response(
-        {"ok": True, "hub_id": hub_id, "sku_id": sku_id, "quantity": inv.quantity},
+        {"ok": True, "hub_id": hub_id, "sku_id": sku_id, "quantity": after},
         status=200,
     )
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@idempotent
+@transaction.atomic
+def inventory_adjust_batch(request):
+    """
+    Body JSON:
+    {
+      "lines": [
+        {"sku_id": 3, "hub_id": 7, "action": "IN" | "OUT", "quantity": 5, "note": "optional"},
+        ...
+      ]
+    }
+    All lines are applied or none are; errors are reported per line index.
+    """
+    ser = InventoryBatchAdjustSerializer(data=request.data)
+    if not ser.is_valid():
+        return Response(ser.errors, status=400)
+
+    try:
+        results = apply_adjustments(ser.validated_data["lines"], actor_id=request.user.pk)
+    except BatchRejected as exc:
+        transaction.set_rollback(True)
+        return Response({"detail": "Batch rejected", "errors": exc.errors}, status=400)
+
+    return Response({"ok": True, "lines": results}, status=200)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@idempotent
+@transaction.atomic
+def inventory_transfer(request):
+    """
+    Body JSON:
+    {
+      "lines": [
+        {"sku_id": 3, "from_hub_id": 7, "to_hub_id": 9, "quantity": 5, "note": "optional"},
+        ...
+      ]
+    }
+    Moves stock between hubs in one transaction: every line or none, all
+    logged under one ``transfer_id``. Errors are reported per line index.
+    """
+    ser = InventoryTransferSerializer(data=request.data)
+    if not ser.is_valid():
+        return Response(ser.errors, status=400)
+
+    try:
+        transfer_id, results = apply_transfers(ser.validated_data["lines"], actor_id=request.user.pk)
+    except BatchRejected as exc:
+        transaction.set_rollback(True)
+        return Response({"detail": "Transfer rejected", "errors": exc.errors}, status=400)
+
+    return Response({"ok": True, "transfer_id": str(transfer_id), "lines": results}, status=200)
+
+
 # -----------------------------
 # Logs
 # -----------------------------
+LOG_KEYS = ("created_at", "id")
+LOG_KEY_TYPES = (datetime.fromisoformat, int)
+
+
+def _log_rows(request):
+    """``(names, rows)`` for inventory_logs, newest first and not yet evaluated."""
+    qs = InventoryLog.objects.order_by("-created_at", "-id")
+    if request.GET.get("hub_id"):
+        qs = qs.filter(hub_id=request.GET["hub_id"])
+    if request.GET.get("sku_id"):
+        qs = qs.filter(sku_id=request.GET["sku_id"])
+    return inventory_log_values.values_list(qs, extra=LOG_KEYS)
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def inventory_logs(request):
+    """
+    Newest first, keyset-paginated on (created_at, id). Pass the
+    ``X-Next-Cursor`` response header back as ``?cursor=`` for the next page.
+    """
+    names, rows = _log_rows(request)
+    limit = parse_limit(request, default=50, maximum=200)
+    try:
+        rows, next_cursor = paginate(
+            rows, request, LOG_KEYS, LOG_KEY_TYPES, limit, descending=True, key=lambda r: r[-2:],
+        )
+    except InvalidCursor as exc:
+        return Response({"detail": str(exc)}, status=400)
+
+    resp = Response(inventory_log_values.to_dicts(names, rows), status=200)
+    return set_next_headers(resp, request, next_cursor)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@renderer_classes([CSVRenderer, NDJSONRenderer])
+def inventory_logs_export(request):
+    """
+    ?format=csv|ndjson&from=&to=&hub_id=&sku_id=, oldest first. ``from``/``to``
+    take ISO dates or datetimes and are inclusive (a ``to`` date covers the
+    whole day). Unbounded: the body is streamed in chunks, not paged.
+    """
+    params = {}
+    for name in ("hub_id", "sku_id"):
+        raw = request.GET.get(name)
+        if raw:
+            if not raw.isdigit():
+                return Response({"detail": f"{name} must be an integer"}, status=400)
+            params[name] = int(raw)
+    for name, key, end_of_day in (("from", "start", False), ("to", "end", True)):
+        raw = request.GET.get(name)
+        if raw:
+            try:
+                params[key] = exports.parse_bound(raw, end_of_day=end_of_day)
+            except ValueError:
+                return Response({"detail": f"{name} must be an ISO date or datetime"}, status=400)
+
+    fmt = request.accepted_renderer.format
+    names, rows = exports.log_rows(**params, using=db_router.read_alias())
+    resp = StreamingHttpResponse(exports.STREAMERS[fmt](names, rows), content_type=exports.CONTENT_TYPES[fmt])
+    stamp = timezone.localtime().strftime("%Y%m%d-%H%M%S")
+    resp["Content-Disposition"] = f'attachment; filename="inventory-logs-{stamp}.{fmt}"'
+    return resp
+
+
+# -----------------------------
+# Analytics
+# -----------------------------
+ANALYTICS_MAX_DAYS = 366
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def analytics_movements(request):
+    """
+    ?hub_id=&from=YYYY-MM-DD&to=YYYY-MM-DD&group_by=day|sku
+
+    IN/OUT totals from InventoryDailyRollup (never the raw logs). ``from``
+    and ``to`` are inclusive local days; the default is the last 30 days.
+    """
+    group_by = request.GET.get("group_by", "day")
+    if group_by not in ("day", "sku"):
+        return Response({"detail": "group_by must be day or sku"}, status=400)
     hub_id = request.GET.get("hub_id")
-    sku_id = request.GET.get("sku_id")
+    if hub_id and not hub_id.isdigit():
+        return Response({"detail": "hub_id must be an integer"}, status=400)
+
+    today = timezone.localdate()
     try:
-        limit = int(request.GET.get("limit", 50))
+        end = date.fromisoformat(request.GET["to"]) if request.GET.get("to") else today
+        start = date.fromisoformat(request.GET["from"]) if request.GET.get("from") else end - timedelta(days=29)
     except ValueError:
-        limit = 50
-    limit = min(max(limit, 1), 200)
+        return Response({"detail": "from and to must be YYYY-MM-DD"}, status=400)
+    if end < start:
+        return Response({"detail": "to is before from"}, status=400)
+    if (end - start).days >= ANALYTICS_MAX_DAYS:
+        return Response({"detail": f"Range is limited to {ANALYTICS_MAX_DAYS} days"}, status=400)
 
-    qs = InventoryLog.objects.select_related("hub", "sku", "actor").order_by("-created_at")
+    qs = InventoryDailyRollup.objects.filter(day__gte=start, day__lte=end)
     if hub_id:
         qs = qs.filter(hub_id=hub_id)
-    if sku_id:
-        qs = qs.filter(sku_id=sku_id)
-    qs = qs[:limit]
+    totals = dict(in_qty=Sum("in_qty"), out_qty=Sum("out_qty"), moves=Sum("moves"))
+    if group_by == "day":
+        rows = qs.values("day").annotate(**totals).order_by("day")
+    else:
+        rows = (
+            qs.values("sku_id", sku_code=F("sku__sku_code"), name=F("sku__name"))
+            .annotate(**totals)
+            .order_by("sku__name", "sku_id")
+        )
+    data = [dict(row, net=row["in_qty"] - row["out_qty"]) for row in rows]
+    return Response(data, status=200)
+
+
+# -----------------------------
+# Change feed
+# -----------------------------
+def _parse_changes_params(params):
+    """(since_id or None, hub_id or None) from query params; raises BadParam."""
+    out = []
+    for name in ("since_id", "hub_id"):
+        raw = params.get(name)
+        if raw in (None, ""):
+            out.append(None)
+        elif raw.isdigit():
+            out.append(int(raw))
+        else:
+            raise BadParam(f"{name} must be a non-negative integer")
+    return out
+
+
+def _parse_wait(params) -> float:
+    """Long-poll seconds from ``wait``, clamped to [0, CHANGES_MAX_WAIT]; raises BadParam."""
+    try:
+        wait = float(params.get("wait") or 0)
+    except ValueError:
+        wait = math.nan
+    # float() also accepts "nan" and "inf", which would never reach the deadline.
+    if not math.isfinite(wait):
+        raise BadParam("wait must be a number of seconds")
+    return min(max(wait, 0), settings.CHANGES_MAX_WAIT)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def inventory_changes(request):
+    """
+    ?since_id=&hub_id=&wait=&limit=
+
+    Stock movements after ``since_id``, oldest first, as
+    ``{"changes": [...], "last_id": N}``; call again with ``since_id=N``.
+    Without ``since_id`` only the current ``last_id`` is returned: take it
+    *before* loading inventory/by-hub/ so nothing falls in between.
+
+    ``wait`` (seconds, up to CHANGES_MAX_WAIT) long-polls: the request is
+    held until something changes or the time is up. This sync view sleeps
+    in its worker thread meanwhile, so under WSGI every waiting client ties
+    up a worker. Serve long-polling clients under ASGI with
+    ASYNC_READ_VIEWS on, which routes changes/ to
+    core.async_views.inventory_changes.
+    """
+    try:
+        since_id, hub_id = _parse_changes_params(request.GET)
+        wait = _parse_wait(request.GET)
+    except BadParam as exc:
+        return Response({"detail": str(exc)}, status=400)
+    if since_id is None:
+        return Response({"changes": [], "last_id": changes.head_id()}, status=200)
+
+    limit = parse_limit(request, default=500, maximum=1000)
+    deadline = monotonic() + wait
+    while True:
+        rows, last_id = changes.fetch(since_id, hub_id, limit)
+        if rows or last_id != since_id or monotonic() >= deadline:
+            break
+        sleep(settings.CHANGES_POLL_INTERVAL)
+    return Response({"changes": rows, "last_id": last_id}, status=200)
+
+
+async def inventory_changes_stream(request):
+    """
+    Server-Sent Events version of changes/, served under ASGI only. Each
+    event carries one change with ``id:`` set to its log id, so a
+    reconnecting client resumes from ``Last-Event-ID``. Auth is the usual
+    ``Authorization: Bearer`` header. The stream closes after
+    CHANGES_STREAM_SECONDS and the client reconnects.
 
-    return Response(InventoryLogSerializer(qs, many=True).data, status=200)
+    Under WSGI the async body would be buffered to the end and hold a
+    worker for the whole stream, so the answer is a 501 pointing at
+    long-polling changes/ instead.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "changes/stream/ needs an ASGI server; long-poll changes/?wait= instead."}, status=501,
+        )
+    try:
+        auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except APIException as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=401)
+    if auth is None or not auth[0].is_active:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    params = request.GET.copy()
+    if request.headers.get("Last-Event-ID"):
+        params["since_id"] = request.headers["Last-Event-ID"]
+    try:
+        since_id, hub_id = _parse_changes_params(params)
+    except BadParam as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+    if since_id is None:
+        since_id = await sync_to_async(changes.head_id)()
+
+    fetch = sync_to_async(changes.fetch)
+    render = FastJSONRenderer().render
+
+    async def events():
+        cursor = since_id
+        yield f"retry: 2000\nid: {cursor}\n\n".encode()
+        deadline = monotonic() + settings.CHANGES_STREAM_SECONDS
+        quiet_since = monotonic()
+        while monotonic() < deadline:
+            rows, last_id = await fetch(cursor, hub_id)
+            if last_id != cursor:
+                block = b"".join(
+                    b"id: %d\nevent: change\ndata: %s\n\n" % (row["id"], render(row)) for row in rows
+                )
+                if not rows or rows[-1]["id"] != last_id:
+                    block += b"id: %d\n\n" % last_id
+                cursor = last_id
+                quiet_since = monotonic()
+                yield block
+                continue
+            if monotonic() - quiet_since >= 15:
+                quiet_since = monotonic()
+                yield b": keep-alive\n\n"
+            await asyncio.sleep(settings.CHANGES_POLL_INTERVAL)
+
+    resp = StreamingHttpResponse(events(), content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"
+    return resp
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+def metrics_view(request):
+    """
+    Prometheus text for per-endpoint latency and query-count quantiles.
+    Authorized by ``Authorization: Bearer <METRICS_TOKEN>`` (for the
+    scraper) or an admin user's JWT.
+    """
+    header = request.headers.get("Authorization", "")
+    token = settings.METRICS_TOKEN
+    if not (token and hmac.compare_digest(header.encode(), f"Bearer {token}".encode())):
+        try:
+            auth = JWTAuthentication().authenticate(request)
+        except APIException:
+            auth = None
+        if auth is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        if not is_admin(auth[0]):
+            return JsonResponse({"detail": "Admin only"}, status=403)
+    return HttpResponse(metrics.prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")